@@ -1,6 +1,6 @@
 import enum
 from abc import ABC, abstractmethod
-from typing import Union, List, Iterable, TypeVar, Optional, Set, Dict
+from typing import Union, List, Iterable, TypeVar, Optional, Set, Dict, Iterator, Tuple
 
 from .cube import Cube
 from .orientation import Orientation, Side, count_occurrences
@@ -107,16 +107,21 @@ class Turn(Action):
             self.type = side
 
     def perform(self, cube: Cube, orientation: Orientation) -> Orientation:
-        turning_functions = {
-            TurningType.VERTICAL: (cube.turn_vertical, cube.get_side(orientation).columns),
-            TurningType.HORIZONTAL: (cube.turn_horizontal, cube.get_side(orientation).rows),
-            TurningType.SLICE: (cube.turn_slice, cube.get_side(orientation.to_right).columns)
-        }
-        rotate_function, size = turning_functions[self.type]
-        for side in Turn.normalize_indices(self.indices, size):
-            rotate_function(orientation, side, self.turns)
+        if self.type == TurningType.VERTICAL:
+            rotate_function, size = cube.turn_vertical, cube.get_side_shape(orientation)[1]
+        elif self.type == TurningType.HORIZONTAL:
+            rotate_function, size = cube.turn_horizontal, cube.get_side_shape(orientation)[0]
+        else:
+            rotate_function, size = cube.turn_slice, cube.get_side_shape(orientation.to_right)[1]
+        for start, width in Turn.group_layers(Turn.normalize_indices(self.indices, size)):
+            rotate_function(orientation, start, self.turns, width)
         return orientation
 
+    def inverse(self) -> "Turn":
+        """ Returns the turn that undoes this one if performed with the same
+        orientation. """
+        return Turn(self.type, self.indices, 4 - self.turns)
+
     def __repr__(self):
         return f"Turn({self.type}, {self.indices}, {self.turns})"
 
@@ -186,6 +191,21 @@ class Turn(Action):
             -> List[Union[int, type(Ellipsis)]]:
         return [Ellipsis if index == Ellipsis else -index for index in indices]
 
+    @staticmethod
+    def group_layers(layers: Iterable[int]) -> Iterator[Tuple[int, int]]:
+        """ Splits layer indices into blocks of adjacent layers. Yields the
+        first index and the size of each block. """
+        start, width = None, 0
+        for layer in sorted(layers):
+            if start is not None and layer == start + width:
+                width += 1
+                continue
+            if start is not None:
+                yield start, width
+            start, width = layer, 1
+        if start is not None:
+            yield start, width
+
     @staticmethod
     def normalize_indices(indices: List[Union[int, type(Ellipsis)]], width: int) -> Set[int]:
         def to_positive(idx: Union[int, type(Ellipsis)]):
@@ -0,0 +1,81 @@
+import gc
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+from .cube import Cube
+
+PENDING = 0
+SUCCEEDED = 1
+FAILED = 2
+
+
+def _align(size: int) -> int:
+    return (size + 7) // 8 * 8
+
+
+class SharedCubeArena:
+    """ Packed states of cubes of one shape along with the results of running
+    a program on them, kept in a shared memory block. Other processes attach
+    the arena by its name and work with cubes created over the rows of the
+    block directly, so only indices of the rows have to be sent to them.
+
+    The block holds the `state_view` of every cube followed by three arrays
+    indexed by rows: the number of moves, the `Cube.state_hash` of the final
+    state and the status of the row (`PENDING`, `SUCCEEDED` or `FAILED`).
+    Cubes returned by `cube` share memory with the arena and must not be used
+    after it is closed. """
+
+    def __init__(self, shape: Tuple[int, int, int], count: int, name: Optional[str] = None):
+        self.shape: Tuple[int, int, int] = shape
+        self.count: int = count
+        self.state_size: int = 2 * (shape[0] * shape[1] + shape[0] * shape[2] + shape[1] * shape[2])
+        states_end = _align(self.state_size * count)
+        size = states_end + 17 * count
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        else:
+            self.memory = shared_memory.SharedMemory(name)
+            if self.memory.size < size:
+                self.memory.close()
+                raise ValueError("Shared memory block is too small for the arena")
+
+        buffer = self.memory.buf
+        self.states: memoryview = buffer[:self.state_size * count]
+        self.moves: memoryview = buffer[states_end:states_end + 8 * count].cast("q")
+        self.hashes: memoryview = buffer[states_end + 8 * count:states_end + 16 * count].cast("Q")
+        self.status: memoryview = buffer[states_end + 16 * count:states_end + 17 * count]
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    def _row(self, row: int) -> memoryview:
+        if not 0 <= row < self.count:
+            raise IndexError("Arena row is out of range")
+        return self.states[row * self.state_size:(row + 1) * self.state_size]
+
+    def store(self, row: int, cube: Cube) -> None:
+        """ Copies the colors of the cube into the row and resets its results. """
+        if cube.shape != self.shape:
+            raise ValueError("Cube shape does not match the arena")
+        self._row(row)[:] = cube.state_view()
+        self.moves[row], self.hashes[row], self.status[row] = 0, 0, PENDING
+
+    def cube(self, row: int) -> Cube:
+        """ Returns a packed cube whose colors are stored in the row. Turns of
+        the cube change the arena; call `Cube.state_view` after the last turn
+        to store pending rotations of the sides. """
+        return Cube(self.shape, buffer=self._row(row))
+
+    def close(self) -> None:
+        # Cubes and runtimes form reference cycles, so unused cubes of the
+        # arena may still hold its memory until they are collected
+        gc.collect()
+        for view in [self.states, self.moves, self.hashes, self.status]:
+            view.release()
+        self.memory.close()
+
+    def unlink(self) -> None:
+        """ Frees the shared memory block. Must be called once by the process
+        that created the arena. """
+        self.memory.unlink()
@@ -0,0 +1,341 @@
+""" Running one program over many cubes of the same shape.
+
+`run_batch` does not execute the program in lockstep over all cubes. Regrouping
+the cubes at every branch would need vectorized execution of the compiled code,
+and programs compile to plain Python that works on a single cube. Instead, the
+program is traced on one cube and the other cubes replay the trace: turns are
+applied to them as combined permutations and every read is repeated on them.
+Cubes that read something different leave the replay and are traced later.
+This is weaker than true lockstep execution. The program runs once per
+distinct path rather than once per batch, and cubes that leave a replay late
+are restored and run from the start. """
+import os
+from multiprocessing import Pool
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from .actions import Action, Turn
+from .arena import SharedCubeArena, SUCCEEDED, FAILED
+from .compiler import Stack, parser
+from .compiler.code_map import CodeMap
+from .cube import Cube
+from .cube_runtime import CubeRuntime
+from .execution import ExecutionContext, RuntimeError
+from .execution.executor import ITracebackWriter
+from .orientation import Color, Orientation, Side
+from .pattern import Pattern
+from .stdlib import stdlib
+
+
+class CubeBatch:
+    """ Cubes of the same shape that are solved by one program, each with
+    its own orientation. """
+
+    def __init__(self, cubes: Sequence[Cube], orientations: Optional[Sequence[Orientation]] = None):
+        if len(cubes) == 0:
+            raise ValueError("A batch must contain at least one cube")
+        if any(cube.shape != cubes[0].shape for cube in cubes):
+            raise ValueError("All cubes of a batch must have the same shape")
+        if orientations is not None and len(orientations) != len(cubes):
+            raise ValueError("The number of orientations does not match the number of cubes")
+        self.cubes: List[Cube] = list(cubes)
+        self.orientations: List[Orientation] = list(orientations) if orientations is not None \
+            else [Orientation() for _ in cubes]
+
+    def __len__(self) -> int:
+        return len(self.cubes)
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return self.cubes[0].shape
+
+
+class BatchResult(NamedTuple):
+    actions: List[List[Action]]
+    errors: List[Optional[RuntimeError]]
+    # Number of times the program was executed
+    runs: int
+
+
+class _ErrorRecorder(ITracebackWriter):
+    def __init__(self):
+        self.error: Optional[RuntimeError] = None
+
+    def print_traceback(self, error: RuntimeError, code_map: CodeMap) -> None:
+        self.error = error
+
+
+# A turn performed with an orientation or a permutation of the cube's cells
+Change = Union[Tuple[Turn, Orientation], List[int]]
+
+
+class _Read(NamedTuple):
+    """ A read of the cube by a traced run. `probe` repeats the read on the
+    cube and orientation of a runtime, `key` turns its result into a value
+    that can be compared. """
+    probe: Callable[[CubeRuntime], Any]
+    orientation: Orientation
+    key: Callable[[Any], Any]
+    value: Any
+
+
+def _same(value: Any) -> Any:
+    return value
+
+
+def _error_key(error: Exception) -> Tuple[str, type, str]:
+    return "error", type(error), str(error)
+
+
+def _actions_key(actions: Optional[List[Action]]) -> Optional[Tuple[str, ...]]:
+    return None if actions is None else tuple(map(repr, actions))
+
+
+class _TracingRuntime(CubeRuntime):
+    """ Runtime that records the changes of the cube and the results of all
+    reads of the cube in the order they are made. The program is a function
+    of these reads, so it behaves the same for every cube with the same
+    results of them. Memo functions are not cached, so reads made by them
+    are recorded too. """
+
+    def __init__(self, cube: Cube, orientation: Orientation, callback: Callable[[Action], None]):
+        super().__init__(cube, orientation, callback, lambda: None)
+        self.events: List[Union[List[Change], _Read]] = []
+
+    def _change(self, change: Change) -> None:
+        if len(self.events) == 0 or isinstance(self.events[-1], _Read):
+            self.events.append([])
+        self.events[-1].append(change)
+
+    def _read(self, probe: Callable[[CubeRuntime], Any], key: Callable[[Any], Any] = _same,
+              value: Any = None) -> Any:
+        if value is None:
+            try:
+                value = probe(self)
+            except Exception as error:
+                # Other cubes follow the run only if the read fails for them
+                # in the same way
+                self.events.append(_Read(probe, self.orientation, key, _error_key(error)))
+                raise
+        self.events.append(_Read(probe, self.orientation, key, key(value)))
+        return value
+
+    def _turn_cube(self, turn: Turn, orientation: Orientation) -> None:
+        super()._turn_cube(turn, orientation)
+        self._change((turn, orientation))
+
+    def _permute_cube(self, permutation: List[int]) -> None:
+        super()._permute_cube(permutation)
+        self._change(permutation)
+
+    def memoize(self, function: Callable) -> Callable:
+        return function
+
+    def get_color(self, side: Side, i: int, j: int):
+        return self._read(lambda runtime: runtime._read_color(side, i, j), value=super().get_color(side, i, j))
+
+    def perform_orient(self, *args, **kwargs) -> bool:
+        return self._orient_to(self._read(lambda runtime: runtime.cube.orient(runtime.orientation, *args, **kwargs)))
+
+    def _search(self, depth: int, moves: Tuple[Tuple[Tuple[Any, ...], ...], ...],
+                patterns: Dict[str, Any]) -> Optional[List[Action]]:
+        return self._read(lambda runtime: CubeRuntime._search(runtime, depth, moves, patterns), _actions_key)
+
+    def _solve_optimal(self) -> List[Action]:
+        return self._read(CubeRuntime._solve_optimal, _actions_key)
+
+    def _solve(self, max_length: int) -> List[Action]:
+        return self._read(lambda runtime: CubeRuntime._solve(runtime, max_length), _actions_key)
+
+    def find_edge(self, first: Color, second: Color) -> List[Side]:
+        return self._read(lambda runtime: CubeRuntime.find_edge(runtime, first, second))
+
+    def find_corner(self, first: Color, second: Color, third: Color) -> List[Side]:
+        return self._read(lambda runtime: CubeRuntime.find_corner(runtime, first, second, third))
+
+    def face_solved(self, side: Side) -> bool:
+        return self._read(lambda runtime: CubeRuntime.face_solved(runtime, side))
+
+    def count_color(self, side: Side, color: Color) -> int:
+        return self._read(lambda runtime: CubeRuntime.count_color(runtime, side, color))
+
+    def face_equals(self, side: Side, pattern: Pattern) -> bool:
+        return self._read(lambda runtime: CubeRuntime.face_equals(runtime, side, pattern))
+
+    def layer_solved(self, side: Side, depth: int) -> bool:
+        return self._read(lambda runtime: CubeRuntime.layer_solved(runtime, side, depth))
+
+
+def _compile(source: str, shape: Tuple[int, int, int],
+             disabled_passes: Iterable[str]) -> Tuple[ExecutionContext, CubeRuntime]:
+    """ Compiles the program for cubes of the shape. Runtimes that execute it
+    reuse the repeat cache of the returned template runtime. """
+    template = CubeRuntime(Cube(shape), Orientation(), lambda action: None, lambda: None)
+    stack = Stack()
+    stdlib.initialize_stack(stack)
+    template.functions.initialize_stack(stack)
+    context = ExecutionContext({**stdlib.exec_globals, **template.functions.exec_globals}, disabled_passes)
+    context.compile(parser.parse(source, stack))
+    return context, template
+
+
+def _get_permutation(cube: Cube, changes: List[Change]) -> Optional[List[int]]:
+    """ Combines the changes into a single permutation of the cube's cells or
+    returns None if the cube cannot be permuted. """
+    result: Optional[List[int]] = None
+    for change in changes:
+        if isinstance(change, list):
+            permutation = change
+        else:
+            try:
+                permutation = cube.get_permutation([change[0]], change[1])
+            except ValueError:
+                return None
+        result = permutation if result is None else [result[index] for index in permutation]
+    return result
+
+
+def _replay(events: List[Union[List[Change], _Read]], rows: List[int], batch: CubeBatch,
+            probe: CubeRuntime) -> Tuple[List[int], List[int]]:
+    """ Follows the traced run with the cubes of the rows. Each straight run of
+    changes is combined into one permutation that is applied to all of the
+    cubes, and every read is repeated on them. Rows where a read gives another
+    result leave the run. Returns the rows that followed the run to its end
+    and the rows that left it, whose cubes are changed partially. """
+    following, diverged = rows, []
+    for event in events:
+        if len(following) == 0:
+            break
+        if isinstance(event, _Read):
+            kept = []
+            for row in following:
+                probe.cube, probe.orientation = batch.cubes[row], event.orientation
+                try:
+                    value = event.key(event.probe(probe))
+                except Exception as error:
+                    value = _error_key(error)
+                (kept if value == event.value else diverged).append(row)
+            following = kept
+            continue
+
+        permutation = _get_permutation(probe.cube, event) \
+            if len(event) > 1 and probe.cube_size <= CubeRuntime.PERMUTATION_SIZE_LIMIT else None
+        for row in following:
+            cube = batch.cubes[row]
+            if permutation is not None:
+                cube.apply_permutation(permutation)
+                continue
+            for change in event:
+                if isinstance(change, list):
+                    cube.apply_permutation(change)
+                else:
+                    change[0].perform(cube, change[1])
+    return following, diverged
+
+
+def run_batch(source: str, batch: CubeBatch, disabled_passes: Iterable[str] = ()) -> BatchResult:
+    """ Runs the program on every cube of the batch. The program is parsed and
+    compiled once. It is executed on the first pending cube, recording the
+    turns it makes and the reads of the cube it depends on; then the other
+    pending cubes with the same orientation follow this run in lockstep (see
+    `_replay`). Cubes on which all reads give the same results get the actions
+    and the error of the run without executing the program, the rest are
+    restored and executed later. So actions of every row are the same as the
+    ones of an individual run. Permutations of constant `repeat` loops are
+    shared between the runs. Cubes and orientations of the batch are updated
+    to their final states. Compilation errors are raised, runtime errors are
+    reported per row. """
+    context, probe = _compile(source, batch.shape, disabled_passes)
+    actions: List[List[Action]] = [[] for _ in range(len(batch))]
+    errors: List[Optional[RuntimeError]] = [None] * len(batch)
+    pending = list(range(len(batch)))
+    runs = 0
+    while len(pending) > 0:
+        first = pending[0]
+        orientation = batch.orientations[first]
+        rows = [row for row in pending[1:] if batch.orientations[row] == orientation]
+        states = [batch.cubes[row].to_bytes() for row in rows]
+
+        output: List[Action] = []
+        runtime = _TracingRuntime(batch.cubes[first], orientation, output.append)
+        runtime.repeat_cache = probe.repeat_cache
+        recorder = _ErrorRecorder()
+        context.execute(recorder, {**context.globals, **runtime.functions.exec_globals})
+        runtime.finished()
+        runs += 1
+
+        following, diverged = _replay(runtime.events, rows, batch, probe)
+        for row in [first] + following:
+            actions[row] = list(output)
+            errors[row] = recorder.error
+            batch.orientations[row] = runtime.orientation
+        diverged = set(diverged)
+        for row, state in zip(rows, states):
+            if row in diverged:
+                batch.cubes[row] = Cube.from_bytes(state, batch.cubes[row].packed)
+        done = set(following)
+        pending = [row for row in pending[1:] if row not in done]
+    return BatchResult(actions, errors, runs)
+
+
+_worker_arena: Optional[SharedCubeArena] = None
+_worker_context: Optional[ExecutionContext] = None
+_worker_template: Optional[CubeRuntime] = None
+
+
+def _init_worker(source: str, name: str, shape: Tuple[int, int, int], count: int,
+                 disabled_passes: Tuple[str, ...]) -> None:
+    global _worker_arena, _worker_context, _worker_template
+    _worker_arena = SharedCubeArena(shape, count, name)
+    _worker_context, _worker_template = _compile(source, shape, disabled_passes)
+
+
+def _run_row(row: int) -> None:
+    """ Runs the program on a cube of the arena and stores the number of
+    moves, the hash of the final state and the status of the run. """
+    cube = _worker_arena.cube(row)
+    moves = 0
+
+    def count_move(action: Action) -> None:
+        nonlocal moves
+        moves += isinstance(action, Turn)
+
+    runtime = CubeRuntime(cube, Orientation(), count_move, lambda: None)
+    runtime.repeat_cache = _worker_template.repeat_cache
+    recorder = _ErrorRecorder()
+    _worker_context.execute(recorder, {**_worker_context.globals, **runtime.functions.exec_globals})
+    runtime.finished()
+    _worker_arena.moves[row] = moves
+    _worker_arena.hashes[row] = cube.state_hash()
+    _worker_arena.status[row] = SUCCEEDED if recorder.error is None else FAILED
+
+
+def run_shared_batch(source: str, arena: SharedCubeArena, rows: Optional[Iterable[int]] = None,
+                     processes: Optional[int] = None, disabled_passes: Iterable[str] = ()) -> None:
+    """ Runs the program on the cubes stored in the arena (all of its rows by
+    default) in a pool of processes. Every worker attaches the arena and
+    compiles the program once, tasks only carry the indices of the rows.
+    Results are written to the arena. Compilation errors are raised before
+    the pool is started. """
+    rows = list(range(arena.count)) if rows is None else list(rows)
+    disabled_passes = tuple(disabled_passes)
+    _compile(source, arena.shape, disabled_passes)
+    processes = processes or os.cpu_count() or 1
+    arguments = (source, arena.name, arena.shape, arena.count, disabled_passes)
+
+    if processes == 1:
+        _init_worker(*arguments)
+        try:
+            for row in rows:
+                _run_row(row)
+        finally:
+            _release_worker()
+        return
+
+    with Pool(processes, _init_worker, arguments) as pool:
+        pool.map(_run_row, rows, chunksize=len(rows) // (processes * 4) + 1)
+
+
+def _release_worker() -> None:
+    global _worker_arena
+    _worker_arena.close()
+    _worker_arena = None
@@ -3,6 +3,7 @@ from argparse import ArgumentParser, Namespace, ArgumentTypeError
 from .options import formula_type, side_colors_type, integer_type
 from ..actions import Action
 from ..cube import Cube
+from ..cubie import CubieCube, CUBIE_SIZES
 from ..orientation import Orientation, Color, Side
 from ..cube_runtime import CubeRuntime
 from typing import Optional, List, Tuple
@@ -23,9 +24,13 @@ def apply_side(cube: Cube, orientation: Orientation,
             side.colors[i, j] = color
 
 
+PACKED_DIMENSION = 64
+
+
 class CubeBuilder:
-    def __init__(self, size: Tuple[int, int, int]):
-        self.cube = Cube(size)
+    def __init__(self, size: Tuple[int, int, int], packed: bool = False, path: Optional[str] = None,
+                 cubie: bool = False):
+        self.cube = CubieCube(size) if cubie else Cube(size, packed, path)
         self.orientation = Orientation()
 
     def scramble(self, actions: List[Action]) -> "CubeBuilder":
@@ -46,6 +51,12 @@ def init_cube_args_parser(argparse: ArgumentParser):
     group = argparse.add_argument_group("cube options")
     group.add_argument("-d", dest="dimension", help="dimensions of a cube",
                        default=3, metavar="N", type=integer_type(2))
+    group.add_argument("--packed", dest="packed", action="store_true",
+                       help=f"store one byte per cell (always used if N > {PACKED_DIMENSION})")
+    group.add_argument("--mmap", dest="mmap", metavar="FILE", default=None,
+                       help="memory-map the packed cube's state to a file")
+    group.add_argument("--cubie", dest="cubie", action="store_true",
+                       help=f"keep the state as pieces' coordinates (N = {' or '.join(map(str, CUBIE_SIZES))} only)")
     group.add_argument("-s", dest="scramble", help="formula to scramble a cube",
                        default=[], type=formula_type, metavar="FORMULA")
     for name, side in CubeRuntime.SIDE_NAMES.items():
@@ -54,7 +65,9 @@ def init_cube_args_parser(argparse: ArgumentParser):
 
 
 def build_cube(arguments: Namespace):
-    builder = CubeBuilder((arguments.dimension,) * 3)
+    packed = arguments.packed or arguments.dimension > PACKED_DIMENSION
+    cubie = arguments.cubie and arguments.dimension in CUBIE_SIZES
+    builder = CubeBuilder((arguments.dimension,) * 3, packed, arguments.mmap, cubie)
     for name, side in CubeRuntime.SIDE_NAMES.items():
         builder.side(side, getattr(arguments, name))
     return builder.scramble(arguments.scramble).get()
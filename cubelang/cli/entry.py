@@ -1,5 +1,5 @@
 import sys
-from argparse import ArgumentParser
+from argparse import ArgumentParser, Namespace
 
 from lark import UnexpectedCharacters
 from lark.exceptions import LarkError
@@ -7,9 +7,12 @@ from lark.exceptions import LarkError
 from .cube_builder import init_cube_args_parser, build_cube
 from .error_display import ErrorsOutput
 from .options import file_contents_type
-from .postprocessors_builder import init_postprocessors_args_parser, build_postprocessors_chain
+from .postprocessors_builder import init_postprocessors_args_parser, build_postprocessors_chain, \
+    get_postprocessors_flags, print_action
+from .solution_cache import SolutionCache, DEFAULT_MAX_ENTRIES
 from ..compiler import Stack, parser
 from ..compiler.errors import CompileTimeError, FunctionArgumentsError
+from ..compiler.passes import PASS_NAMES
 from ..cube_runtime import CubeRuntime
 from ..execution import ExecutionContext
 from ..stdlib import stdlib
@@ -21,20 +24,47 @@ def main():
     args_parser.add_argument("source", type=file_contents_type,
                              help="program's source")
     args_parser.add_argument("-v", "--version", action="version", version="%(prog)s " + __version__)
+    args_parser.add_argument("--disable-pass", dest="disabled_passes", action="append", default=[],
+                             choices=PASS_NAMES, metavar="PASS",
+                             help="disable the program optimization pass")
+    args_parser.add_argument("--pass-stats", dest="pass_stats", action="store_true",
+                             help="print the statistics of the optimization passes")
+    args_parser.add_argument("--cache", metavar="FILE",
+                             help="reuse the output of previous runs stored in the file")
+    args_parser.add_argument("--cache-size", dest="cache_size", type=int, default=DEFAULT_MAX_ENTRIES,
+                             metavar="N", help="maximal number of outputs stored in the cache")
+    args_parser.add_argument("--cache-stats", dest="cache_stats", action="store_true",
+                             help="print the statistics of the cache")
 
     init_cube_args_parser(args_parser)
     init_postprocessors_args_parser(args_parser)
     args = args_parser.parse_args()
 
     cube, orientation = build_cube(args)
-    postprocessor = build_postprocessors_chain(args)
+    cache, cache_key = None, None
+    if args.cache is not None:
+        cache = SolutionCache(args.cache, args.cache_size)
+        cache_key = SolutionCache.get_key(args.source, cube, get_postprocessors_flags(args))
+        output = cache.get(cache_key)
+        if output is not None:
+            print_action(output)
+            print_cache_statistics(args, cache)
+            return
+
+    outputs = []
+
+    def output_action(action: str) -> None:
+        print_action(action)
+        outputs.append(action)
+
+    postprocessor = build_postprocessors_chain(args, output_action)
     runtime = CubeRuntime(cube, orientation, postprocessor.process, postprocessor.done)
 
     stack = Stack()
     stdlib.initialize_stack(stack)
     runtime.functions.initialize_stack(stack)
     exec_globals = {**stdlib.exec_globals, **runtime.functions.exec_globals}
-    context = ExecutionContext(exec_globals)
+    context = ExecutionContext(exec_globals, args.disabled_passes)
 
     errors = ErrorsOutput(sys.stderr, use_color=True)
     try:
@@ -59,6 +89,23 @@ def main():
         errors.display_code(args.source, e.start_line - 1, e.start_column - 1, end_line - 1, end_column - 1)
         return
 
+    if args.pass_stats:
+        for statistics in context.pass_manager.statistics:
+            print(f"{statistics.name}: {statistics.changes} changes, {statistics.time * 1000:.3f} ms",
+                  file=sys.stderr)
+
     # if not pycode:
-    context.execute(errors)
+    succeeded = context.execute(errors)
     runtime.finished()
+    if cache is not None:
+        if succeeded:
+            cache.put(cache_key, "".join(outputs))
+        print_cache_statistics(args, cache)
+
+
+def print_cache_statistics(args: Namespace, cache: SolutionCache) -> None:
+    if args.cache_stats:
+        statistics = cache.statistics
+        print(f"cache: {statistics.hits} hits, {statistics.misses} misses, {statistics.entries} entries",
+              file=sys.stderr)
+    cache.close()
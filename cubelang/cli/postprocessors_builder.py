@@ -1,4 +1,5 @@
 from argparse import ArgumentParser, Namespace
+from typing import Callable, List
 
 from ..postprocessing import OptimizingPostprocessor, FormattingPostprocessor, \
     OrientationFreezePostprocessor, chain, PostprocessorBase
@@ -15,7 +16,17 @@ def print_action(action: str):
     print(action, end="")
 
 
-def build_postprocessors_chain(args: Namespace) -> PostprocessorBase:
+def get_postprocessors_flags(args: Namespace) -> List[str]:
+    """ Returns the names of the options that change the output. """
+    flags = []
+    if args.freeze_orientation:
+        flags.append("no-rotations")
+    if not args.optimize:
+        flags.append("not-optimize")
+    return flags
+
+
+def build_postprocessors_chain(args: Namespace, output: Callable[[str], None] = print_action) -> PostprocessorBase:
     postprocessors = []
 
     if args.freeze_orientation:
@@ -24,5 +35,5 @@ def build_postprocessors_chain(args: Namespace) -> PostprocessorBase:
         postprocessors.append(OptimizingPostprocessor())
     postprocessors.append(FormattingPostprocessor())
 
-    chain(*postprocessors, print_action)
+    chain(*postprocessors, output)
     return postprocessors[0]
@@ -0,0 +1,94 @@
+import hashlib
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from ..cube import Cube
+from .. import __version__
+
+DEFAULT_MAX_ENTRIES = 10000
+LOCK_TIMEOUT = 30.0
+
+
+class CacheKey(NamedTuple):
+    program: str
+    state: str
+    flags: str
+
+
+class CacheStatistics(NamedTuple):
+    hits: int
+    misses: int
+    entries: int
+
+
+class SolutionCache:
+    """ Output of programs stored in an SQLite database and keyed by the hash
+    of the program's source, the initial state of the cube and the options
+    of the postprocessors. The least recently used entries are removed when
+    the number of entries exceeds the limit. Several processes can use the
+    same file at once: SQLite locks the database while it is written. """
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries: int = max_entries
+        self.connection = sqlite3.connect(path, timeout=LOCK_TIMEOUT, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        with self._transaction():
+            self.connection.execute("CREATE TABLE IF NOT EXISTS solutions (program TEXT, state TEXT, flags TEXT, "
+                                    "output TEXT, last_used REAL, PRIMARY KEY (program, state, flags))")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS solutions_last_used ON solutions (last_used)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS statistics (name TEXT PRIMARY KEY, "
+                                    "value INTEGER)")
+            self.connection.executemany("INSERT OR IGNORE INTO statistics VALUES (?, 0)",
+                                        [("hits",), ("misses",)])
+
+    @staticmethod
+    def get_key(source: str, cube: Cube, flags: Iterable[str]) -> CacheKey:
+        program = hashlib.sha256(f"{__version__}\n{source}".encode("utf-8")).hexdigest()
+        state = "x".join(map(str, cube.shape)) + f":{cube.state_hash():016x}"
+        return CacheKey(program, state, ",".join(sorted(flags)))
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        """ Write transaction that takes the database lock at the start, so
+        concurrent processes wait for each other instead of failing to
+        upgrade their locks. """
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+    def get(self, key: CacheKey) -> Optional[str]:
+        """ Returns the stored output or None, updating the hit and miss
+        counters. """
+        with self._transaction():
+            row = self.connection.execute("SELECT output FROM solutions WHERE program = ? AND state = ? "
+                                          "AND flags = ?", key).fetchone()
+            if row is not None:
+                self.connection.execute("UPDATE solutions SET last_used = ? WHERE program = ? AND state = ? "
+                                        "AND flags = ?", (time.time(), *key))
+            counter = "hits" if row is not None else "misses"
+            self.connection.execute("UPDATE statistics SET value = value + 1 WHERE name = ?", (counter,))
+        return row[0] if row is not None else None
+
+    def put(self, key: CacheKey, output: str) -> None:
+        with self._transaction():
+            self.connection.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?)",
+                                    (*key, output, time.time()))
+            self.connection.execute("DELETE FROM solutions WHERE rowid IN (SELECT rowid FROM solutions "
+                                    "ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    @property
+    def statistics(self) -> CacheStatistics:
+        hits, misses = (self.connection.execute("SELECT value FROM statistics WHERE name = ?", (name,)).fetchone()[0]
+                        for name in ["hits", "misses"])
+        entries = self.connection.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+        return CacheStatistics(hits, misses, entries)
+
+    def close(self) -> None:
+        self.connection.close()
+
@@ -1,13 +1,19 @@
-from typing import Dict
+from typing import Dict, Optional, Tuple
 
 
 class CodeMap:
     def __init__(self):
         self.line_numbers: Dict[int, int] = dict()
+        self.function_names: Dict[int, str] = dict()
+        # Generated lines of the inlined functions' bodies mapped to the name
+        # of the function and the matching line of its declaration
+        self.inlined_lines: Dict[int, Tuple[str, int]] = dict()
+        self._first_lines: Dict[int, int] = dict()
 
     def add(self, python_line: int, source_line: int) -> None:
         if source_line is not None and python_line is not None:
             self.line_numbers[python_line] = source_line
+            self._first_lines.setdefault(source_line, python_line)
 
     def __getitem__(self, index: int):
         while index > 0 and index not in self.line_numbers:
@@ -16,3 +22,30 @@ class CodeMap:
             return self.line_numbers[index]
         else:
             return 0
+
+    def add_function(self, python_line: int, name: str) -> None:
+        self.function_names[python_line] = name
+
+    def get_function_name(self, python_line: int) -> Optional[str]:
+        return self.function_names.get(python_line, None)
+
+    def add_inlined(self, start: int, end: int, call_line: int) -> None:
+        """ Maps the generated lines in the range, which contain the inlined
+        body of a function, to the line of the call. The lines that come from
+        the function's body remember the function and the corresponding line
+        of its declaration, so they are shown as a call in stack traces. """
+        declarations = sorted(self.function_names)
+        for python_line in range(start, end):
+            source_line = self.line_numbers.get(python_line, None)
+            if source_line is None:
+                continue
+            self.line_numbers[python_line] = call_line
+            if source_line == call_line:
+                continue
+            body_line = self._first_lines.get(source_line, python_line)
+            functions = [line for line in declarations if line < body_line]
+            if body_line < start and len(functions) > 0:
+                self.inlined_lines[python_line] = (self.function_names[functions[-1]], body_line)
+
+    def get_inlined_call(self, python_line: int) -> Optional[Tuple[str, int]]:
+        return self.inlined_lines.get(python_line, None)
@@ -1,3 +1,4 @@
+import re
 from typing import List, Optional, Union, Tuple
 
 from .code_map import CodeMap
@@ -6,6 +7,8 @@ from .types import Type, Void, Integer
 
 TemplateType = List[Union[str, int]]
 
+CONSTANT_PATTERN = re.compile(r"^(-?\d+|\.\.\.)$")
+
 
 class VariablesPool:
     class Context:
@@ -47,6 +50,16 @@ class Expression:
             text = [text]
         self.expression: TemplateType = text
 
+    def get_constant(self) -> Optional[str]:
+        """ Returns the text of an integer literal or an ellipsis if the
+        expression is one, or None otherwise. """
+        if len(self.intermediates) > 0 or self.expression is None:
+            return None
+        if not all(isinstance(x, str) for x in self.expression):
+            return None
+        text = "".join(self.expression)
+        return text if CONSTANT_PATTERN.match(text) else None
+
     def add_intermediate(self, expression: "Expression") -> int:
         self.intermediates.append(expression)
         return len(self.intermediates) - 1
@@ -190,7 +203,29 @@ class RepeatLoopExpression(Expression):
         self.times: Expression = times
         self.actions: List[Expression] = actions
 
+    def get_constant_moves(self) -> Optional[List[str]]:
+        """ Returns the descriptions of the moves if the loop consists only of
+        turns and rotations with constant parameters and its iterations count
+        is known at the compile time. """
+        if len(self.actions) == 0 or self.times.get_constant() in {None, "..."}:
+            return None
+        moves = []
+        for action in self.actions:
+            if not isinstance(action, (CubeTurningExpression, CubeRotationExpression)):
+                return None
+            move = action.get_constant_move()
+            if move is None:
+                return None
+            moves.append(move)
+        return moves
+
     def generate(self, temp_pool: VariablesPool, stream: CodeStream, code_map: CodeMap, var_name: Optional[str] = None):
+        moves = self.get_constant_moves()
+        if moves is not None:
+            code_map.add(stream.line_number, self.times.line_number)
+            stream.push_line(f"cube_repeat({self.times.get_constant()}, ({', '.join(moves)},))")
+            return
+
         with temp_pool.allocate(1) as ctr:
             counter, = ctr
             line = self.times.generate_line(temp_pool, stream, code_map)
@@ -246,6 +281,12 @@ class CubeTurningExpression(Expression):
         self.amount: int = amount
         self.indices: List[Union[Expression, type(Ellipsis)]] = [Expression(line_number, Integer, "1")]
 
+    def get_constant_move(self) -> Optional[str]:
+        indices = [index.get_constant() for index in self.indices]
+        if any(index is None for index in indices):
+            return None
+        return f"(\"turn\", {self.side}, {self.amount}, ({', '.join(indices)},))"
+
     def generate(self, temp_pool: VariablesPool, stream: CodeStream, code_map: CodeMap,
                  var_name: Optional[str] = None):
         code_map.add(stream.line_number, self.line_number)
@@ -264,24 +305,55 @@ class CubeRotationExpression(Expression):
         self.side: str = side
         self.twice: bool = twice
 
+    def get_constant_move(self) -> Optional[str]:
+        return f"(\"rotate\", {self.side}, {self.twice})"
+
     def generate(self, temp_pool: VariablesPool, stream: CodeStream, code_map: CodeMap, var_name: Optional[str] = None):
         code_map.add(stream.line_number, self.line_number)
         stream.push_line(f"cube_rotate({self.side}, {self.twice})")
 
 
+class InlineCallExpression(Expression):
+    class Intermediate(Expression):
+        def __init__(self, line_number: int, statements: List[Expression], result: Optional[Expression]):
+            super(InlineCallExpression.Intermediate, self).__init__(line_number, Void)
+            self.statements: List[Expression] = statements
+            self.result: Optional[Expression] = result
+
+        def generate(self, temp_pool: VariablesPool, stream: CodeStream, code_map: CodeMap,
+                     var_name: Optional[str] = None):
+            start = stream.line_number
+            for statement in self.statements:
+                statement.generate(temp_pool, stream, code_map, None)
+            if self.result is not None:
+                self.result.generate(temp_pool, stream, code_map, var_name)
+            elif len(self.statements) == 0:
+                stream.push_line("pass")
+            code_map.add_inlined(start, stream.line_number, self.line_number)
+
+    def __init__(self, line_number: int, return_type: Type, statements: List[Expression],
+                 result: Optional[Expression]):
+        super(InlineCallExpression, self).__init__(line_number, return_type, [0])
+        self.add_intermediate(InlineCallExpression.Intermediate(line_number, statements, result))
+
+
 class FunctionDeclarationExpression(Expression):
     def __init__(self, line_number: int, name: str, symbol_name: str,
-                 return_type: Type, arguments: List[str], clause: List[Expression]):
+                 return_type: Type, arguments: List[str], clause: List[Expression], memo: bool = False):
         super().__init__(line_number, Void)
         self.name: str = name
         self.symbol_name: str = symbol_name
         self.return_type: Type = return_type
         self.arguments: List[str] = arguments
         self.clause: List[Expression] = clause
+        self.memo: bool = memo
 
     def generate(self, temp_pool: VariablesPool, stream: CodeStream, code_map: CodeMap, var_name: Optional[str] = None):
         arguments = ", ".join(self.arguments)
-        stream.push_line(f"@runtime_function(\"{self.symbol_name}\")")
+        # Decorated functions start at the decorator line (see `co_firstlineno`)
+        code_map.add_function(stream.line_number, self.symbol_name)
+        if self.memo:
+            stream.push_line("@cube_memoize")
         stream.push_line(f"def {self.name}({arguments}):")
         stream.indent()
         for expression in self.clause:
@@ -1,15 +1,16 @@
 from collections.abc import Iterable
 from pathlib import Path
-from typing import Union, List, Callable, Dict, IO, Iterator, Tuple
+from typing import Union, List, Callable, Dict, IO, Iterator, Tuple, Optional
 
 from lark import Tree, Lark, Token
 
 from .expression import Expression, ConditionExpression, WhileLoopExpression, \
     DoWhileLoopExpression, RepeatLoopExpression, ForLoopExpression, \
-    CubeTurningExpression, CubeRotationExpression, FunctionDeclarationExpression
+    CubeTurningExpression, CubeRotationExpression, FunctionDeclarationExpression, \
+    InlineCallExpression
 from .operators import BINARY_OPERATORS, BinaryOperator, operator_applicable
-from .stack import Stack
-from .types import Integer, Real, Type, Bool, Set, List as ListType, Void, \
+from .stack import Stack, InlineFunction
+from .types import Integer, Real, Type, Bool, Set, List as ListType, Map, Queue, Void, \
     CollectionType, Function, Color, Side, Pattern
 from .errors import assert_type, ValueTypeError, UnresolvedReferenceError, \
     FunctionArgumentsError, CompileTimeError
@@ -21,7 +22,9 @@ Callback = Callable[[Tree, Stack], Union[Type, Expression]]
 
 RESERVED_NAMES = {"int", "real", "boolean", "side", "color", "pattern", "list",
                   "set", "of", "func", "let", "return", "if", "then", "end",
-                  "while", "do", "repeat", "for", "in", "orient"}
+                  "while", "do", "repeat", "for", "in", "orient", "memo"}
+
+INLINE_SIZE_LIMIT = 48
 
 
 # TODO: Symbols aren't visible inside functions
@@ -104,6 +107,8 @@ for precedence, operators in enumerate(BINARY_OPERATORS):
             expr1: Expression = parser.handle(tree.children[0], stack)
             expr2: Expression = parser.handle(tree.children[1], stack)
             result_type = operator_applicable([expr1.type, expr2.type], op.arguments)
+            if result_type is not None and op.symbol in {"and", "or"} and len(expr2.intermediates) > 0:
+                return short_circuit(tree.line - 1, op.symbol, expr1, expr2)
             if result_type is not None:
                 return Expression.merge(result_type, op.expression, expr1, expr2)
             else:
@@ -112,6 +117,14 @@ for precedence, operators in enumerate(BINARY_OPERATORS):
                 raise CompileTimeError(tree, message)
 
 
+def short_circuit(line_number: int, symbol: str, expr1: Expression, expr2: Expression) -> Expression:
+    """ Evaluates the statements needed by the right operand of `and` or `or`
+    (such as the bodies of inlined functions) only if the operand is used. """
+    if symbol == "and":
+        return ConditionExpression(line_number, [(expr1, [expr2])], [Expression(line_number, Bool, "False")])
+    return ConditionExpression(line_number, [(expr1, [Expression(line_number, Bool, "True")])], [expr2])
+
+
 @parser.handler("int_literal")
 def handle_int_literal(tree: Tree, _stack: Stack) -> Expression:
     return Expression(tree.line - 1, Integer, str(int(tree.children[0])))
@@ -146,13 +159,22 @@ def handle_scalar_type(tree: Tree, _stack: Stack) -> Type:
     return TYPE_NAMES[tree.data]
 
 
-@parser.handler("type_list", "type_set")
+@parser.handler("type_list", "type_set", "type_queue")
 def handle_compound_type(tree: Tree, stack: Stack) -> Type:
-    constructor = {"type_list": ListType, "type_set": Set}[tree.data]
+    constructor = {"type_list": ListType, "type_set": Set, "type_queue": Queue}[tree.data]
     inner_type: Type = parser.handle(tree.children[0], stack)
     return constructor(inner_type)
 
 
+@parser.handler("type_map")
+def handle_map_type(tree: Tree, stack: Stack) -> Type:
+    key_type: Type = parser.handle(tree.children[0], stack)
+    if isinstance(key_type, CollectionType):
+        raise CompileTimeError(tree.children[0], "Collections cannot be used as keys of a map")
+    value_type: Type = parser.handle(tree.children[1], stack)
+    return Map(key_type, value_type)
+
+
 @parser.handler("var_decl")
 def handle_variable_declaration(tree: Tree, stack: Stack) -> List[Expression]:
     var_names: List[str] = []
@@ -293,6 +315,8 @@ def handle_func_call(tree: Tree, stack: Stack):
     return_type = func_type.takes_arguments(arg_types)
     if return_type is None:
         raise FunctionArgumentsError(tree, function_name, func_type, arg_types)
+    if func_data.inline is not None:
+        return inline_function_call(tree, stack, func_data.inline, return_type, arguments)
     if len(arguments) == 0:
         return Expression(tree.line - 1, return_type, [function_name, "()"])
     else:
@@ -449,10 +473,11 @@ def handle_pattern(tree: Tree, _stack: Stack):
     return Expression(tree.line - 1, Pattern, [f"Pattern([{pattern_array}])"])
 
 
-@parser.handler("orient_params")
-def handle_orient_params(tree: Tree, stack: Stack):
+def handle_side_patterns(tree: Tree, stack: Stack, keeping_allowed: bool) -> Tuple[List[Union[str, int]], List[Expression]]:
+    """ Returns the keyword arguments template and the argument expressions
+    of the side constraints of the `orient` and `search` statements. """
     assert len(tree.children) % 2 == 0
-    expression = ["orient("]
+    expression = []
     merging = []
     previous_keys = set()
     patterns_present = False
@@ -466,6 +491,8 @@ def handle_orient_params(tree: Tree, stack: Stack):
         if key in previous_keys:
             raise CompileTimeError(key, f"Key {key} has already been specified")
         elif key == "keeping":
+            if not keeping_allowed:
+                raise CompileTimeError(key, "Key keeping cannot be used in this statement")
             assert_type(tree.children[j + 1], argument, Side)
         else:
             patterns_present = True
@@ -473,14 +500,117 @@ def handle_orient_params(tree: Tree, stack: Stack):
         previous_keys.add(key)
         expression.append(", ")
 
-    expression[-1] = ")"
+    expression.pop()
     if not patterns_present:
         raise CompileTimeError(tree, "No side patterns are present")
-    return Expression.merge(Bool, expression, *merging)
+    return expression, merging
+
+
+@parser.handler("orient_params")
+def handle_orient_params(tree: Tree, stack: Stack):
+    expression, merging = handle_side_patterns(tree, stack, True)
+    return Expression.merge(Bool, ["orient(", *expression, ")"], *merging)
+
+
+@parser.handler("search_params")
+def handle_search_params(tree: Tree, stack: Stack):
+    expression, merging = handle_side_patterns(tree.children[0], stack, False)
+    depth = parser.handle(tree.children[1], stack)
+    assert_type(tree.children[1], depth, Integer, "Search depth must be integer")
+    merging.append(depth)
+
+    template = ["cube_search(", len(merging) - 1, ", ("]
+    for instruction in tree.children[2].children:
+        template.append("(")
+        for action in parser.handle(instruction, stack):
+            if isinstance(action, CubeRotationExpression):
+                template.append(action.get_constant_move())
+            else:
+                template.append(f"(\"turn\", {action.side}, {action.amount}, (")
+                for index in action.indices:
+                    merging.append(index)
+                    template += [len(merging) - 1, ", "]
+                template.append("))")
+            template.append(", ")
+        template.append("), ")
+    template += ["), ", *expression, ")"]
+    return Expression.merge(Bool, template, *merging)
+
+
+def get_inline_function(arguments: List[Tuple[str, Type]], return_type: Type,
+                        clause: Tree) -> Optional[InlineFunction]:
+    """ Returns the description of a function that can be inlined into the
+    call sites, or None if the function is too large or its control flow
+    does not allow inlining. """
+    statements = [x for x in clause.children if isinstance(x, Tree)]
+    result = None
+    if len(statements) > 0 and statements[-1].data == "return_statement":
+        last_statement = statements.pop()
+        if len(last_statement.children) > 0:
+            result = last_statement.children[0]
+
+    size = 0
+    for statement in statements + ([result] if isinstance(result, Tree) else []):
+        for subtree in statement.iter_subtrees():
+            if subtree.data in {"return_statement", "func_decl"}:
+                return None
+            size += 1
+    if size > INLINE_SIZE_LIMIT:
+        return None
+    return InlineFunction(arguments, return_type, statements, result)
+
+
+def inline_function_call(tree: Tree, stack: Stack, function: InlineFunction,
+                         return_type: Type, arguments: List[Expression]) -> Expression:
+    inline_stack = stack.create_inline()
+    statements: List[Expression] = []
+    # Arguments may contain inlined calls that reuse the numbers given to the
+    # parameters here, so all of them are evaluated before any parameter is
+    # assigned
+    names = ["var_" + str(inline_stack.add_variable(name, arg_type)) for name, arg_type in function.arguments]
+    if len(names) > 0:
+        values = [part for index in range(len(names)) for part in ([", ", index] if index > 0 else [index])]
+        statements.append(Expression.merge(Void, [", ".join(names), " = ", *values], *arguments))
+
+    inline_stack.add_frame()
+    statements.extend(flatten(parser.handle(statement, inline_stack) for statement in function.body))
+    if function.result is not None:
+        result = parser.handle(function.result, inline_stack)
+    elif return_type != Void:
+        result = Expression(tree.line - 1, return_type, return_type.default_value())
+    else:
+        result = None
+    inline_stack.pop_frame()
+    inline_stack.pop_frame()
+    return InlineCallExpression(tree.line - 1, return_type, statements, result)
+
+
+def check_memo_function(tree: Tree, stack: Stack, argument_types: List[Type], return_type: Type) -> None:
+    """ Ensures that the function declared with `memo` only reads the cube
+    and that its arguments and result can be stored in the cache. Calls are
+    resolved with the stack of the function's body. """
+    nodes = tree.children[1:len(argument_types) + 2]
+    for node, value_type in zip(nodes, argument_types + [return_type]):
+        if isinstance(value_type, CollectionType):
+            raise CompileTimeError(node, "Collections cannot be passed to or returned from a memo function")
+
+    for subtree in tree.children[-1].iter_subtrees():
+        if subtree.data == "cube_instruction":
+            raise CompileTimeError(subtree, "A memo function cannot turn or rotate the cube")
+        elif subtree.data in {"orient_params", "search_params"}:
+            raise CompileTimeError(subtree, "A memo function cannot change the orientation of the cube")
+        elif subtree.data == "func_call":
+            function = stack.get_variable(subtree.children[0])
+            if function is not None and not function.pure:
+                raise CompileTimeError(subtree, f"Function `{subtree.children[0]}` cannot be called "
+                                                f"from a memo function")
 
 
 @parser.handler("func_decl")
 def handle_function_declaration(tree: Tree, stack: Stack):
+    memo = isinstance(tree.children[0], Token) and tree.children[0].type == "MEMO"
+    if memo:
+        tree = Tree(tree.data, tree.children[1:], tree.meta)
     func_name = tree.children[0]
     argument_names: List[str] = []
     argument_types: List[Type] = []
@@ -501,10 +631,15 @@ def handle_function_declaration(tree: Tree, stack: Stack):
         inner_stack.add_variable(name, type)
 
     func_type = Function((argument_types, return_type))
-    var_num = stack.add_variable(func_name, func_type)
+    if memo:
+        check_memo_function(tree, inner_stack, argument_types, return_type)
+        inline = None
+    else:
+        inline = get_inline_function(list(zip(argument_names, argument_types)), return_type, tree.children[-1])
+    var_num = stack.add_variable(func_name, func_type, inline)
     clause = handle_clause(tree.children[-1], inner_stack)
     return FunctionDeclarationExpression(tree.line - 1, f"var_{var_num}", func_name, return_type,
-                                         [f"var_{i}" for i in range(len(argument_names))], clause)
+                                         [f"var_{i}" for i in range(len(argument_names))], clause, memo)
 
 
 @parser.handler("return_statement")
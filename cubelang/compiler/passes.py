@@ -0,0 +1,578 @@
+import ast
+import re
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Set, Iterator, Iterable, NamedTuple, Callable
+
+VARIABLE_PATTERN = re.compile(r"^(var|tmp|opt)_\d+$")
+
+PURE_FUNCTIONS = frozenset({
+    "cube_get_color", "size", "contains", "index_of", "round", "floor", "ceil",
+    "sqrt", "pow", "max", "min", "sign", "list", "set", "deque", "has_key"
+})
+
+FOLDABLE_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.USub, ast.UAdd,
+                      ast.Not, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+
+SAFE_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.And, ast.Or, ast.Not, ast.USub, ast.UAdd,
+                  ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+
+_NO_VALUE = object()
+
+
+def constant_value(node: ast.AST) -> Any:
+    """ Returns the value of a constant node or `_NO_VALUE` if the node is
+    not a constant. Handles the node types of older Python versions. """
+    if isinstance(node, ast.Constant):
+        return node.value
+    node_type = type(node).__name__
+    if node_type == "Num":
+        return node.n
+    elif node_type == "NameConstant":
+        return node.value
+    return _NO_VALUE
+
+
+def is_constant(node: ast.AST) -> bool:
+    return constant_value(node) is not _NO_VALUE
+
+
+def is_variable(name: str) -> bool:
+    return VARIABLE_PATTERN.match(name) is not None
+
+
+def iterate_scope(node: ast.AST) -> Iterator[ast.AST]:
+    """ Iterates over all nodes of a scope without entering the bodies of
+    nested functions. Arguments and decorators of nested functions belong
+    to the nested function. """
+    for child in ast.iter_child_nodes(node):
+        yield child
+        if not isinstance(child, ast.FunctionDef):
+            yield from iterate_scope(child)
+
+
+def iterate_nodes(roots: Iterable[ast.AST]) -> Iterator[ast.AST]:
+    """ Iterates over the given nodes and their children in the current
+    scope. The nested functions are returned without their contents. """
+    for root in roots:
+        yield root
+        if not isinstance(root, ast.FunctionDef):
+            yield from iterate_scope(root)
+
+
+def iterate_blocks(node: ast.AST) -> Iterator[List[ast.stmt]]:
+    """ Iterates over all statement lists of the tree, including the ones
+    in nested functions. Inner blocks are returned before outer ones. """
+    for field in ("body", "orelse"):
+        block = getattr(node, field, None)
+        if isinstance(block, list):
+            for statement in block:
+                yield from iterate_blocks(statement)
+            yield block
+
+
+def iterate_scopes(tree: ast.Module) -> Iterator[ast.AST]:
+    yield tree
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef):
+            yield node
+
+
+def stored_names(nodes: Iterable[ast.AST]) -> Dict[str, int]:
+    """ Counts the number of times every name is assigned in the nodes. """
+    result: Dict[str, int] = dict()
+
+    def add(name: str):
+        result[name] = result.get(name, 0) + 1
+
+    for node in iterate_nodes(nodes):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            add(node.id)
+        elif isinstance(node, ast.FunctionDef):
+            add(node.name)
+        elif isinstance(node, ast.arg):
+            add(node.arg)
+    return result
+
+
+def loaded_names(nodes: Iterable[ast.AST]) -> Set[str]:
+    return {node.id for node in iterate_nodes(nodes)
+            if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load)}
+
+
+def called_functions(node: ast.AST) -> Iterator[Optional[str]]:
+    """ Yields the names of the functions called in the node. None is
+    yielded for the calls of anything other than a name. """
+    for child in [node, *iterate_scope(node)]:
+        if isinstance(child, ast.Call):
+            yield child.func.id if isinstance(child.func, ast.Name) else None
+
+
+def ensure_body(block: List[ast.stmt], location: ast.AST) -> None:
+    if len(block) == 0:
+        block.append(ast.copy_location(ast.Pass(), location))
+
+
+def get_head(statement: ast.stmt) -> Optional[ast.expr]:
+    """ Returns the expression of the statement that is always evaluated
+    first when the statement is executed. """
+    if isinstance(statement, (ast.Expr, ast.Assign, ast.Return)):
+        return statement.value
+    elif isinstance(statement, ast.If):
+        return statement.test
+    elif isinstance(statement, ast.For):
+        return statement.iter
+    return None
+
+
+class PassContext:
+    def __init__(self, constants: Dict[str, Any], pure_functions: Iterable[str]):
+        self.constants: Dict[str, Any] = constants
+        self.pure_functions: Set[str] = set(pure_functions)
+        self._temporaries: int = 0
+
+    def is_pure(self, node: ast.AST) -> bool:
+        return all(name in self.pure_functions for name in called_functions(node))
+
+    def is_safe(self, node: ast.AST) -> bool:
+        """ Returns True if evaluating the expression cannot fail or have any
+        side effects, so it can be evaluated speculatively or dropped. """
+        for child in [node, *iterate_scope(node)]:
+            if isinstance(child, (ast.Call, ast.Subscript, ast.IfExp, ast.Attribute, ast.Lambda)):
+                if not (isinstance(child, ast.Call) and isinstance(child.func, ast.Name) and
+                        child.func.id in {"list", "set"} and len(child.args) == 0):
+                    return False
+            elif isinstance(child, (ast.operator, ast.unaryop, ast.cmpop, ast.boolop)):
+                if not isinstance(child, SAFE_OPERATORS):
+                    return False
+        return True
+
+    def is_invariant(self, node: ast.AST, stored: Dict[str, int]) -> bool:
+        return all(not isinstance(child, ast.Name) or child.id not in stored
+                   for child in [node, *iterate_scope(node)])
+
+    def new_temporary(self) -> str:
+        self._temporaries += 1
+        return f"opt_{self._temporaries - 1}"
+
+
+class OptimizationPass(ABC):
+    name: str = ""
+    description: str = ""
+
+    @abstractmethod
+    def run(self, tree: ast.Module, context: PassContext) -> int:
+        """ Transforms the tree in place and returns the number of changes. """
+        pass
+
+
+class _ConstantFolder(ast.NodeTransformer):
+    def __init__(self, constants: Dict[str, Any]):
+        self.constants = constants
+        self.changes = 0
+
+    @staticmethod
+    def _evaluate(node: ast.expr) -> Any:
+        try:
+            expression = ast.fix_missing_locations(ast.Expression(body=node))
+            return eval(compile(expression, "<constant>", "eval"), {"__builtins__": {}})
+        except Exception:
+            return _NO_VALUE
+
+    def _replace(self, node: ast.AST, value: Any) -> ast.AST:
+        if value is _NO_VALUE or not isinstance(value, (bool, int, float)):
+            return node
+        self.changes += 1
+        return ast.copy_location(ast.Constant(value=value), node)
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        if isinstance(node.ctx, ast.Load) and node.id in self.constants:
+            return self._replace(node, self.constants[node.id])
+        return node
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> ast.AST:
+        self.generic_visit(node)
+        if isinstance(node.op, FOLDABLE_OPERATORS) and is_constant(node.operand):
+            return self._replace(node, self._evaluate(node))
+        return node
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        self.generic_visit(node)
+        if isinstance(node.op, FOLDABLE_OPERATORS) and is_constant(node.left) and is_constant(node.right):
+            return self._replace(node, self._evaluate(node))
+        return node
+
+    def visit_Compare(self, node: ast.Compare) -> ast.AST:
+        self.generic_visit(node)
+        if all(isinstance(x, FOLDABLE_OPERATORS) for x in node.ops) and \
+                is_constant(node.left) and all(is_constant(x) for x in node.comparators):
+            return self._replace(node, self._evaluate(node))
+        return node
+
+    def visit_BoolOp(self, node: ast.BoolOp) -> ast.AST:
+        self.generic_visit(node)
+        values = node.values
+        while len(values) > 1 and is_constant(values[0]):
+            if bool(constant_value(values[0])) == isinstance(node.op, ast.And):
+                values = values[1:]
+            else:
+                values = values[:1]
+            self.changes += 1
+        if len(values) == 1:
+            return values[0]
+        node.values = values
+        return node
+
+
+class ConstantPropagation(OptimizationPass):
+    """ Replaces known constants and variables that are only assigned a
+    constant value once with their values and folds the operators applied
+    to constants. """
+
+    name = "constant-propagation"
+    description = "fold constant expressions and propagate constant variables"
+
+    def run(self, tree: ast.Module, context: PassContext) -> int:
+        changes = 0
+        while True:
+            folder = _ConstantFolder(context.constants)
+            folder.visit(tree)
+            changes += folder.changes
+            replaced = sum(self._propagate(scope) for scope in iterate_scopes(tree))
+            changes += replaced
+            if replaced == 0:
+                return changes
+
+    @staticmethod
+    def _propagate(scope: ast.AST) -> int:
+        nodes = list(iterate_nodes(scope.body))
+        stored = stored_names(scope.body)
+        if isinstance(scope, ast.FunctionDef):
+            for argument in scope.args.args:
+                stored[argument.arg] = stored.get(argument.arg, 0) + 1
+        values: Dict[str, Any] = dict()
+        for node in nodes:
+            if isinstance(node, ast.Assign) and len(node.targets) == 1 and \
+                    isinstance(node.targets[0], ast.Name) and is_constant(node.value):
+                name = node.targets[0].id
+                if is_variable(name) and stored.get(name, 0) == 1:
+                    values[name] = constant_value(node.value)
+
+        changes = 0
+        for node in nodes:
+            for field, value in ast.iter_fields(node):
+                if isinstance(value, ast.Name) and isinstance(value.ctx, ast.Load) and value.id in values:
+                    setattr(node, field, ast.copy_location(ast.Constant(value=values[value.id]), value))
+                    changes += 1
+                elif isinstance(value, list):
+                    for i, item in enumerate(value):
+                        if isinstance(item, ast.Name) and isinstance(item.ctx, ast.Load) and item.id in values:
+                            value[i] = ast.copy_location(ast.Constant(value=values[item.id]), item)
+                            changes += 1
+        return changes
+
+
+class DeadCodeElimination(OptimizationPass):
+    """ Removes branches that are never executed, statements without any
+    effect, unreachable statements, unused functions and assignments to
+    variables that are never read. """
+
+    name = "dead-code-elimination"
+    description = "remove unreachable code, unused functions and dead stores"
+
+    def run(self, tree: ast.Module, context: PassContext) -> int:
+        changes = 0
+        while True:
+            step = self._eliminate_branches(tree) + \
+                sum(self._eliminate_stores(scope, context) for scope in iterate_scopes(tree))
+            changes += step
+            if step == 0:
+                return changes
+
+    @staticmethod
+    def _eliminate_branches(tree: ast.Module) -> int:
+        changes = 0
+        for block in iterate_blocks(tree):
+            result: List[ast.stmt] = []
+            for statement in block:
+                if isinstance(statement, ast.If) and is_constant(statement.test):
+                    result.extend(statement.body if constant_value(statement.test) else statement.orelse)
+                    changes += 1
+                elif isinstance(statement, ast.While) and is_constant(statement.test) and \
+                        not constant_value(statement.test):
+                    changes += 1
+                elif isinstance(statement, ast.Expr) and isinstance(statement.value, ast.Name) or \
+                        isinstance(statement, ast.Expr) and is_constant(statement.value) or \
+                        isinstance(statement, ast.Pass) and len(block) > 1:
+                    changes += 1
+                else:
+                    result.append(statement)
+                    if isinstance(statement, (ast.Return, ast.Break, ast.Continue)):
+                        break
+            if len(result) == 0 and len(block) > 0:
+                result.append(ast.copy_location(ast.Pass(), block[0]))
+            if result != block:
+                block[:] = result
+        return changes
+
+    @staticmethod
+    def _eliminate_stores(scope: ast.AST, context: PassContext) -> int:
+        body = scope.body
+        loaded = loaded_names(body)
+        changes = 0
+        for block in [body, *DeadCodeElimination._scope_blocks(body)]:
+            result: List[ast.stmt] = []
+            for statement in block:
+                if isinstance(statement, ast.FunctionDef) and statement.name not in loaded or \
+                        isinstance(statement, ast.Assign) and context.is_safe(statement.value) and \
+                        all(isinstance(x, ast.Name) and is_variable(x.id) and x.id not in loaded
+                            for x in statement.targets):
+                    continue
+                result.append(statement)
+            if len(result) < len(block):
+                changes += len(block) - len(result)
+                ensure_body(result, block[0])
+                block[:] = result
+        return changes
+
+    @staticmethod
+    def _scope_blocks(body: List[ast.stmt]) -> Iterator[List[ast.stmt]]:
+        """ Returns the nested blocks of the scope without the blocks of
+        the nested functions. """
+        for statement in body:
+            if not isinstance(statement, ast.FunctionDef):
+                for field in ("body", "orelse"):
+                    block = getattr(statement, field, None)
+                    if isinstance(block, list):
+                        yield block
+                        yield from DeadCodeElimination._scope_blocks(block)
+
+
+class CommonSubexpressionElimination(OptimizationPass):
+    """ Evaluates repeated calls of pure functions with constant arguments
+    (like reading the same sticker color several times) once as long as
+    nothing that can change the state is called between them. """
+
+    name = "common-subexpression-elimination"
+    description = "reuse results of repeated pure calls between state changes"
+
+    def run(self, tree: ast.Module, context: PassContext) -> int:
+        changes = 0
+        for block in list(iterate_blocks(tree)):
+            changes += self._process_block(block, context)
+        return changes
+
+    @staticmethod
+    def _is_candidate(node: ast.AST, context: PassContext) -> bool:
+        return isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and \
+            node.func.id in context.pure_functions and len(node.args) > 0 and len(node.keywords) == 0 and \
+            all(is_constant(x) or isinstance(x, ast.Name) and not is_variable(x.id) for x in node.args)
+
+    @staticmethod
+    def _occurrences(node: ast.AST, conditional: bool, context: PassContext):
+        """ Yields candidate calls in the evaluation order along with the flag
+        showing if they are evaluated conditionally. """
+        if CommonSubexpressionElimination._is_candidate(node, context):
+            yield node, conditional
+            return
+        if isinstance(node, ast.BoolOp):
+            yield from CommonSubexpressionElimination._occurrences(node.values[0], conditional, context)
+            for value in node.values[1:]:
+                yield from CommonSubexpressionElimination._occurrences(value, True, context)
+        elif isinstance(node, ast.IfExp):
+            yield from CommonSubexpressionElimination._occurrences(node.test, conditional, context)
+            yield from CommonSubexpressionElimination._occurrences(node.body, True, context)
+            yield from CommonSubexpressionElimination._occurrences(node.orelse, True, context)
+        elif not isinstance(node, (ast.Lambda, ast.FunctionDef)):
+            for child in ast.iter_child_nodes(node):
+                yield from CommonSubexpressionElimination._occurrences(child, conditional, context)
+
+    def _process_block(self, block: List[ast.stmt], context: PassContext) -> int:
+        changes = 0
+        regions: List[List[int]] = [[]]
+        for index, statement in enumerate(block):
+            head = get_head(statement)
+            if head is not None and context.is_pure(head):
+                regions[-1].append(index)
+            else:
+                regions.append([])
+                continue
+            if not isinstance(statement, (ast.Expr, ast.Assign)) or not context.is_pure(statement):
+                regions.append([])
+
+        insertions: Dict[int, List[ast.stmt]] = dict()
+        for region in regions:
+            first: Dict[str, int] = dict()
+            available: Dict[str, str] = dict()
+            counts: Dict[str, int] = dict()
+            for index in region:
+                for call, conditional in self._occurrences(get_head(block[index]), False, context):
+                    key = ast.dump(call)
+                    counts[key] = counts.get(key, 0) + 1
+                    if key not in first:
+                        first[key] = index if not conditional else -1
+
+            for index in region:
+                head = get_head(block[index])
+                for call, _ in list(self._occurrences(head, False, context)):
+                    key = ast.dump(call)
+                    if counts[key] < 2 or first[key] < 0:
+                        continue
+                    if key not in available:
+                        available[key] = context.new_temporary()
+                        assignment = ast.Assign(targets=[ast.Name(id=available[key], ctx=ast.Store())],
+                                                value=call)
+                        insertions.setdefault(first[key], []).append(ast.copy_location(assignment, block[index]))
+                    self._replace(block[index], call, ast.copy_location(ast.Name(id=available[key], ctx=ast.Load()), call))
+                    changes += 1
+
+        for index in sorted(insertions.keys(), reverse=True):
+            block[index:index] = insertions[index]
+        return changes
+
+    @staticmethod
+    def _replace(root: ast.AST, target: ast.AST, replacement: ast.AST) -> None:
+        for node in [root, *iterate_scope(root)]:
+            for field, value in ast.iter_fields(node):
+                if value is target:
+                    setattr(node, field, replacement)
+                    return
+                elif isinstance(value, list):
+                    for i, item in enumerate(value):
+                        if item is target:
+                            value[i] = replacement
+                            return
+
+
+class LoopInvariantHoisting(OptimizationPass):
+    """ Moves expressions that do not depend on anything changed inside a
+    loop out of the loop. """
+
+    name = "loop-invariant-hoisting"
+    description = "move loop-invariant expressions out of loops"
+
+    def run(self, tree: ast.Module, context: PassContext) -> int:
+        changes = 0
+        for block in list(iterate_blocks(tree)):
+            index = 0
+            while index < len(block):
+                statement = block[index]
+                if isinstance(statement, (ast.While, ast.For)):
+                    hoisted = self._hoist(statement, context)
+                    block[index:index] = hoisted
+                    index += len(hoisted)
+                    changes += len(hoisted)
+                index += 1
+        return changes
+
+    @staticmethod
+    def _mutated_containers(loop: ast.stmt, context: PassContext) -> Optional[Set[str]]:
+        """ Returns the names of the containers that may be changed inside the
+        loop: targets of item assignments and arguments of impure calls. None
+        is returned if the loop does not change any container. """
+        result: Set[str] = set()
+        changes = False
+        for node in [loop, *iterate_scope(loop)]:
+            roots: List[ast.AST] = []
+            if isinstance(node, (ast.Subscript, ast.Attribute)) and isinstance(node.ctx, (ast.Store, ast.Del)):
+                roots.append(node.value)
+            elif isinstance(node, ast.Call) and not all(name in context.pure_functions
+                                                        for name in called_functions(node)):
+                roots.extend(node.args)
+            else:
+                continue
+            changes = True
+            for root in roots:
+                result.update(child.id for child in [root, *iterate_scope(root)] if isinstance(child, ast.Name))
+        return result if changes else None
+
+    def _hoist(self, loop: ast.stmt, context: PassContext) -> List[ast.stmt]:
+        stored = stored_names(loop.body + ([loop.target] if isinstance(loop, ast.For) else []))
+        loop_is_pure = context.is_pure(loop)
+        mutated = self._mutated_containers(loop, context)
+        if mutated is not None:
+            # Items of the containers can be changed through any alias, so
+            # reading an item is never invariant in such loops
+            stored = {**stored, **{name: 1 for name in mutated}}
+        hoisted: List[ast.stmt] = []
+
+        def visit(node: ast.AST, speculative: bool) -> ast.AST:
+            if self._is_candidate(node, stored, speculative, loop_is_pure, context) and \
+                    (mutated is None or not any(isinstance(x, (ast.Subscript, ast.Attribute))
+                                                for x in [node, *iterate_scope(node)])):
+                name = context.new_temporary()
+                assignment = ast.Assign(targets=[ast.Name(id=name, ctx=ast.Store())], value=node)
+                hoisted.append(ast.copy_location(assignment, loop))
+                return ast.copy_location(ast.Name(id=name, ctx=ast.Load()), node)
+            if isinstance(node, (ast.FunctionDef, ast.Lambda)):
+                return node
+            for field, value in ast.iter_fields(node):
+                if isinstance(value, ast.AST):
+                    inner_speculative = speculative or isinstance(node, (ast.BoolOp, ast.IfExp)) and \
+                        value is not getattr(node, "test", None)
+                    setattr(node, field, visit(value, inner_speculative))
+                elif isinstance(value, list):
+                    for i, item in enumerate(value):
+                        if isinstance(item, ast.AST):
+                            inner_speculative = speculative or isinstance(node, ast.BoolOp) and i > 0
+                            value[i] = visit(item, inner_speculative)
+            return node
+
+        if isinstance(loop, ast.While):
+            loop.test = visit(loop.test, False)
+        for statement in loop.body:
+            visit(statement, True)
+        return hoisted
+
+    @staticmethod
+    def _is_candidate(node: ast.AST, stored: Dict[str, int], speculative: bool,
+                      loop_is_pure: bool, context: PassContext) -> bool:
+        if not isinstance(node, (ast.BinOp, ast.Compare, ast.BoolOp, ast.UnaryOp, ast.Call)):
+            return False
+        if isinstance(node, ast.UnaryOp) and isinstance(node.operand, ast.Name):
+            return False
+        if not any(isinstance(x, (ast.Name, ast.Call)) for x in iterate_scope(node)):
+            return False
+        if not context.is_pure(node) or not context.is_invariant(node, stored):
+            return False
+        if any(isinstance(x, ast.Call) for x in [node, *iterate_scope(node)]) and not loop_is_pure:
+            return False
+        return not speculative or context.is_safe(node)
+
+
+PASSES: List[Callable[[], OptimizationPass]] = [
+    ConstantPropagation, DeadCodeElimination, CommonSubexpressionElimination, LoopInvariantHoisting
+]
+
+PASS_NAMES = [x.name for x in PASSES]
+
+
+class PassStatistics(NamedTuple):
+    name: str
+    changes: int
+    time: float
+
+
+class PassManager:
+    """ Runs optimization passes over the tree of the generated module. The
+    tree keeps the line numbers of the generated code, so the code map is
+    still valid after the transformations. """
+
+    def __init__(self, disabled: Iterable[str] = ()):
+        disabled = set(disabled)
+        unknown = disabled.difference(PASS_NAMES)
+        if len(unknown) > 0:
+            raise ValueError(f"Unknown optimization passes: {', '.join(sorted(unknown))}")
+        self.passes: List[OptimizationPass] = [x() for x in PASSES if x.name not in disabled]
+        self.statistics: List[PassStatistics] = []
+
+    def run(self, tree: ast.Module, constants: Dict[str, Any],
+            pure_functions: Iterable[str] = PURE_FUNCTIONS) -> ast.Module:
+        context = PassContext(constants, pure_functions)
+        self.statistics = []
+        for optimization in self.passes:
+            start = time.perf_counter()
+            changes = optimization.run(tree, context)
+            self.statistics.append(PassStatistics(optimization.name, changes,
+                                                  time.perf_counter() - start))
+        return ast.fix_missing_locations(tree)
@@ -1,54 +1,79 @@
-from typing import Dict, NamedTuple, Optional
+from typing import Dict, NamedTuple, Optional, List, Tuple, Any
 
 from .expression import VariablesPool
 from .types import Type
 
 
+class InlineFunction(NamedTuple):
+    arguments: List[Tuple[str, Type]]
+    return_type: Type
+    body: List[Any]
+    result: Optional[Any]
+
+
 class VariableDefinition(NamedTuple):
     type: Type
     number: int
-
-
-class StackFrame:
-    def __init__(self, top_frame: Optional["StackFrame"]):
-        self.variables: Dict[str, VariableDefinition] = dict()
-        self.top_frame: Optional[StackFrame] = top_frame
+    inline: Optional[InlineFunction] = None
+    pure: bool = True
 
 
 class Stack:
+    """ Symbol table of the compiler. Every name has its own stack of
+    bindings, and every frame keeps the list of names declared in it, so
+    that looking up, declaring and removing a frame do not depend on the
+    depth of nesting. """
+
     def __init__(self, return_type: Optional[Type] = None):
         self.globals: Dict[str, VariableDefinition] = {}
-        self.stack_top: StackFrame = StackFrame(None)
+        self.bindings: Dict[str, List[Tuple[int, VariableDefinition]]] = {}
+        self.frames: List[List[str]] = [[]]
         self.pool: VariablesPool = VariablesPool()
         self.context_return_type: Optional[Type] = return_type
 
     def add_frame(self) -> None:
-        self.stack_top = StackFrame(self.stack_top)
+        self.frames.append([])
 
     def pop_frame(self) -> None:
-        self.pool.deallocate(len(self.stack_top.variables))
-        self.stack_top = self.stack_top.top_frame
-
-    def get_variable(self, name: str, ) -> Optional[VariableDefinition]:
-        frame = self.stack_top
-        while frame is not None:
-            if name in frame.variables:
-                return frame.variables[name]
-            frame = frame.top_frame
-        if name in self.globals:
-            return self.globals[name]
-        return None
-
-    def add_variable(self, name: str, var_type: Type) -> int:
+        names = self.frames.pop()
+        self.pool.deallocate(len(names))
+        for name in names:
+            bindings = self.bindings[name]
+            bindings.pop()
+            if len(bindings) == 0:
+                del self.bindings[name]
+
+    def get_variable(self, name: str) -> Optional[VariableDefinition]:
+        bindings = self.bindings.get(name, None)
+        if bindings is not None:
+            return bindings[-1][1]
+        return self.globals.get(name, None)
+
+    def add_variable(self, name: str, var_type: Type, inline: Optional[InlineFunction] = None) -> int:
         number = self.pool.allocate_single()
-        definition = VariableDefinition(var_type, number)
-        self.stack_top.variables[name] = definition
+        definition = VariableDefinition(var_type, number, inline)
+        depth = len(self.frames)
+        bindings = self.bindings.setdefault(name, [])
+        if len(bindings) > 0 and bindings[-1][0] == depth:
+            bindings[-1] = (depth, definition)
+        else:
+            bindings.append((depth, definition))
+            self.frames[-1].append(name)
         return number
 
-    def add_global(self, name: str, var_type: Type) -> None:
-        self.globals[name] = VariableDefinition(var_type, -1)
+    def add_global(self, name: str, var_type: Type, pure: bool = True) -> None:
+        self.globals[name] = VariableDefinition(var_type, -1, None, pure)
 
     def create_inner(self, return_type: Optional[Type]) -> "Stack":
         stack = Stack(return_type)
         stack.globals = self.globals
         return stack
+
+    def create_inline(self) -> "Stack":
+        """ Creates a stack for the body of an inlined function: only globals
+        are visible in it, but the variables are numbered in the caller's
+        pool so that they do not clash with the caller's variables. """
+        stack = Stack(None)
+        stack.globals = self.globals
+        stack.pool = self.pool
+        return stack
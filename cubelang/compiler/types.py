@@ -45,6 +45,8 @@ class GenericTypeVar(Type):
 
 
 T = GenericTypeVar("T")
+K = GenericTypeVar("K")
+V = GenericTypeVar("V")
 
 Integer = Type("Integer", "int", "0")
 
@@ -58,13 +60,27 @@ Pattern = Type("Pattern", "pattern", "None")
 
 
 class CollectionType(Type):
+    _interned: typing.Dict[typing.Tuple[typing.Any, ...], "CollectionType"] = dict()
+
+    def __new__(cls, *args):
+        """ Collection types are interned: constructing a type with the same
+        item type returns the same instance, so they can be compared by
+        identity. """
+        key = (cls, *args)
+        instance = CollectionType._interned.get(key, None)
+        if instance is None:
+            instance = super().__new__(cls)
+            CollectionType._interned[key] = instance
+        return instance
+
     def __init__(self, name: str, lang_name: str,
                  item_type: typing.Union[Type, GenericTypeVar], default: str):
         super().__init__(name, lang_name, default)
         self.item_type = item_type
+        self._hash = hash((name, hash(item_type)))
 
     def __eq__(self, other):
-        return type(self) == type(other) and self.item_type == other.item_type
+        return self is other or (type(self) == type(other) and self.item_type == other.item_type)
 
     def __str__(self):
         return f"{self.lang_name} of {self.item_type}"
@@ -73,7 +89,7 @@ class CollectionType(Type):
         return f"{self.name}({self.item_type!r})"
 
     def __hash__(self):
-        return hash((self.name, hash(self.item_type)))
+        return self._hash
 
     def get_generic_vars(self, fr: "Type"):
         if type(self) != type(fr):
@@ -98,6 +114,55 @@ class Set(CollectionType):
         return Set(self.item_type.substitute_generic(generic_arguments))
 
 
+class Queue(CollectionType):
+    """ Sequence with constant time insertion and removal at both ends. """
+
+    def __init__(self, item_type: Type):
+        super().__init__("Queue", "queue", item_type, "deque()")
+
+    def substitute_generic(self, generic_arguments: typing.Dict[str, "Type"]):
+        return Queue(self.item_type.substitute_generic(generic_arguments))
+
+
+class Map(CollectionType):
+    """ Mapping from keys to values. Iterating over a map yields its keys, so
+    the type of the keys is the item type of the collection. """
+
+    def __init__(self, key_type: Type, value_type: Type):
+        super().__init__("Map", "map", key_type, "dict()")
+        self.value_type = value_type
+        self._hash = hash((self.name, hash(key_type), hash(value_type)))
+
+    def __eq__(self, other):
+        return self is other or (type(self) == type(other) and self.item_type == other.item_type and
+                                 self.value_type == other.value_type)
+
+    def __hash__(self):
+        return self._hash
+
+    def __str__(self):
+        return f"{self.lang_name} of {self.item_type} to {self.value_type}"
+
+    def __repr__(self):
+        return f"{self.name}({self.item_type!r}, {self.value_type!r})"
+
+    def get_generic_vars(self, fr: "Type"):
+        if type(self) != type(fr):
+            return None
+        fr: Map
+        keys = self.item_type.get_generic_vars(fr.item_type)
+        values = self.value_type.get_generic_vars(fr.value_type)
+        if keys is None or values is None:
+            return None
+        if any(name in keys and keys[name] != value for name, value in values.items()):
+            return None
+        return {**keys, **values}
+
+    def substitute_generic(self, generic_arguments: typing.Dict[str, "Type"]):
+        return Map(self.item_type.substitute_generic(generic_arguments),
+                   self.value_type.substitute_generic(generic_arguments))
+
+
 def type_annotation_to_type(annotation: typing.Any) -> Type:
     if annotation == int:
         return Integer
@@ -112,6 +177,11 @@ def type_annotation_to_type(annotation: typing.Any) -> Type:
         return List(type_annotation_to_type(annotation.__args__[0]))
     elif r.startswith(repr(typing.Set)):
         return Set(type_annotation_to_type(annotation.__args__[0]))
+    elif r.startswith(repr(typing.Deque)):
+        return Queue(type_annotation_to_type(annotation.__args__[0]))
+    elif r.startswith(repr(typing.Dict)):
+        return Map(type_annotation_to_type(annotation.__args__[0]),
+                   type_annotation_to_type(annotation.__args__[1]))
     else:
         raise ValueError(f"Unsupported annotation: {annotation!r}")
 
@@ -124,9 +194,11 @@ class Function(Type):
     def __init__(self, *overloads: typing.Tuple[typing.List[Type], Type]):
         super().__init__("Function", "func", "")
         self.overloads = [Function.FunctionOverload(*x) for x in overloads]
+        self._resolved: typing.Dict[typing.Tuple[Type, ...], typing.Optional[Type]] = dict()
 
     def prepend_overload(self, arguments: typing.List[Type], return_type: Type):
         self.overloads.insert(0, self.FunctionOverload(arguments, return_type))
+        self._resolved.clear()
 
     def __hash__(self):
         return hash(tuple((tuple(x.arguments), x.return_type) for x in self.overloads))
@@ -157,6 +229,14 @@ class Function(Type):
         return result if len(result) == number else None
 
     def takes_arguments(self, arguments: typing.List[Type]) -> typing.Optional[Type]:
+        key = tuple(arguments)
+        if key in self._resolved:
+            return self._resolved[key]
+        result = self._resolve_overload(arguments)
+        self._resolved[key] = result
+        return result
+
+    def _resolve_overload(self, arguments: typing.List[Type]) -> typing.Optional[Type]:
         for overload in self.overloads:
             func_arguments = Function.expand_variadic(overload.arguments, len(arguments))
             if func_arguments is None:
@@ -1,8 +1,15 @@
-from typing import Tuple, Dict, List, Generic, TypeVar, Iterator, Optional
+import hashlib
+import mmap
+import struct
+from typing import Tuple, Dict, List, Generic, TypeVar, Iterator, Optional, Iterable, Union, TYPE_CHECKING
 from .orientation import Side, Color, Orientation
-from .sides import CubeSide, ICubeSide, CubeSideView
+from .sides import CubeSide, ICubeSide, PackedCubeSide, COLORS_BY_CODE, Component
 from .pattern import Pattern
 
+if TYPE_CHECKING:
+    from .actions import Action
+    from .pieces import PieceIndex
+
 T = TypeVar("T")
 
 
@@ -10,17 +17,162 @@ def shift_list(list: List[T], amount: int = 1) -> List[T]:
     return list[amount:] + list[:amount]
 
 
+def power_permutation(permutation: List[int], power: int) -> List[int]:
+    """ Raises a permutation to a power by shifting each of its cycles, so the
+    cost does not depend on the exponent. Negative powers give powers of the
+    inverse permutation. """
+    result = [0] * len(permutation)
+    visited = [False] * len(permutation)
+    for start in range(len(permutation)):
+        if visited[start]:
+            continue
+        cycle = []
+        index = start
+        while not visited[index]:
+            visited[index] = True
+            cycle.append(index)
+            index = permutation[index]
+        shift = power % len(cycle)
+        for k, index in enumerate(cycle):
+            result[index] = cycle[(k + shift) % len(cycle)]
+    return result
+
+
+def _color_codes(cells: Union[bytes, List[Component]]) -> bytes:
+    """ Returns color codes of a row, a column or all cells of a side. """
+    if isinstance(cells, bytes):
+        return cells
+    return bytes(cell.color.value for cell in cells)
+
+
+def _has_single_color(cells: Union[bytes, List[Component]]) -> bool:
+    codes = _color_codes(cells)
+    return codes.count(codes[0]) == len(codes)
+
+
+INITIAL_COLORS = {Side.FRONT: Color.RED, Side.BACK: Color.ORANGE, Side.LEFT: Color.BLUE,
+                  Side.RIGHT: Color.GREEN, Side.TOP: Color.YELLOW, Side.BOTTOM: Color.WHITE}
+
+STATE_HEADER = struct.Struct("<2sBIII")
+STATE_MAGIC = b"CL"
+STATE_VERSION = 1
+
+
 class Cube(Generic[T]):
-    def __init__(self, shape: Tuple[int, int, int]):
+    """ Cube of the given shape. By default, every cell of the cube is a
+    `Component` object that can carry additional data. A packed cube stores
+    only colors, one byte per cell, in a single buffer (6 * N^2 bytes for an
+    N x N x N cube) that can optionally be memory-mapped to a file. A packed
+    cube can also be created over an existing buffer (for example, a part of
+    shared memory) containing a `state_view` of a cube; it keeps the colors
+    stored in the buffer. """
+
+    def __init__(self, shape: Tuple[int, int, int], packed: bool = False, path: Optional[str] = None,
+                 buffer: Optional[memoryview] = None):
         self.shape: Tuple[int, int, int] = shape
-        self.sides: Dict[Side, CubeSide[T]] = {
-            Side.FRONT: CubeSide[T](shape[0], shape[2], Color.RED),
-            Side.LEFT: CubeSide[T](shape[1], shape[2], Color.BLUE),
-            Side.BACK: CubeSide[T](shape[0], shape[2], Color.ORANGE),
-            Side.RIGHT: CubeSide[T](shape[1], shape[2], Color.GREEN),
-            Side.TOP: CubeSide[T](shape[0], shape[1], Color.YELLOW),
-            Side.BOTTOM: CubeSide[T](shape[0], shape[1], Color.WHITE)
-        }
+        self.packed: bool = packed or path is not None or buffer is not None
+        self.buffer: Optional[memoryview] = None
+        # Index of the pieces' locations (see `pieces.get_piece_index`)
+        self.piece_index: Optional["PieceIndex"] = None
+
+        sides = [
+            (Side.FRONT, shape[0], shape[2]),
+            (Side.BACK, shape[0], shape[2]),
+            (Side.LEFT, shape[1], shape[2]),
+            (Side.RIGHT, shape[1], shape[2]),
+            (Side.TOP, shape[0], shape[1]),
+            (Side.BOTTOM, shape[0], shape[1])
+        ]
+        sides = [(side, rows, columns, INITIAL_COLORS[side]) for side, rows, columns in sides]
+        self.sides: Dict[Side, CubeSide[T]] = dict()
+        if not self.packed:
+            for side, rows, columns, color in sides:
+                self.sides[side] = CubeSide[T](rows, columns, color, side.value)
+            return
+
+        size = sum(rows * columns for _, rows, columns, _ in sides)
+        if buffer is not None:
+            if len(buffer) != size:
+                raise ValueError("Buffer size does not match the shape of the cube")
+            self.buffer = buffer
+        elif path is None:
+            self.buffer = memoryview(bytearray(size))
+        else:
+            with open(path, "w+b") as file:
+                file.truncate(size)
+                self.buffer = memoryview(mmap.mmap(file.fileno(), size))
+        initialize = buffer is None
+        offset = 0
+        for side, rows, columns, color in sides:
+            buffer = self.buffer[offset:offset + rows * columns]
+            self.sides[side] = PackedCubeSide(rows, columns, color, buffer, side.value, initialize)
+            offset += rows * columns
+
+    def state_view(self) -> memoryview:
+        """ Returns colors of all cells, one byte per cell, side by side in
+        the order of `Side` and row by row. The view shares memory with a
+        packed cube, so it changes with the cube. """
+        if not self.packed:
+            return memoryview(self._pack_colors())
+        for side in self.sides.values():
+            side.normalize()
+        return self.buffer.toreadonly()
+
+    def _pack_colors(self) -> bytes:
+        return bytes(cell.color.value
+                     for side in Side
+                     for i in range(self.sides[side].rows)
+                     for cell in self.sides[side].get_row(i))
+
+    def to_bytes(self) -> bytes:
+        """ Encodes the cube's state as a header with its shape followed by
+        the contents of `state_view`. """
+        return STATE_HEADER.pack(STATE_MAGIC, STATE_VERSION, *self.shape) + bytes(self.state_view())
+
+    @staticmethod
+    def from_bytes(data: bytes, packed: bool = False) -> "Cube":
+        magic, version, *shape = STATE_HEADER.unpack_from(data)
+        if magic != STATE_MAGIC or version != STATE_VERSION:
+            raise ValueError("Unsupported cube state format")
+        cube = Cube(tuple(shape), packed)
+        body = memoryview(data)[STATE_HEADER.size:]
+        if len(body) != sum(side.rows * side.columns for side in cube.sides.values()):
+            raise ValueError("Cube state size does not match its shape")
+        if not set(bytes(body)).issubset(color.value for color in Color):
+            raise ValueError("Cube state contains unknown colors")
+
+        if packed:
+            cube.buffer[:] = body
+        else:
+            colors = iter(body)
+            for face, i, j in cube._iterate_positions():
+                face.set_color(i, j, COLORS_BY_CODE[next(colors)])
+        return cube
+
+    def state_hash(self) -> int:
+        """ Returns a 64-bit hash of the cube's colors that is the same in
+        every process. """
+        return int.from_bytes(hashlib.blake2b(self.state_view(), digest_size=8).digest(), "little")
+
+    @property
+    def zobrist_hash(self) -> int:
+        """ 64-bit Zobrist hash of the cube's colors. Unlike `state_hash`, it
+        is maintained incrementally: once requested, every turn only updates
+        it for the cells that have moved. Keys are derived from a fixed seed,
+        so the hash is also the same in every process. Different states may
+        have the same hash, so it is only suitable for finding candidates that
+        are then compared by `state_view`. """
+        result = 0
+        for side in self.sides.values():
+            result ^= side.zobrist_hash
+        return result
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Cube):
+            return NotImplemented
+        return self.shape == other.shape and self.state_view() == other.state_view()
+
+    __hash__ = None
 
     def get_side(self, orientation: Orientation) -> ICubeSide[T]:
         rotation = orientation.get_side_rotation()
@@ -28,7 +180,15 @@ class Cube(Generic[T]):
         if rotation == 0:
             return self.sides[orientation.front]
         else:
-            return CubeSideView(self.sides[orientation.front], rotation)
+            return self.sides[orientation.front].create_view(rotation)
+
+    def get_side_shape(self, orientation: Orientation) -> Tuple[int, int]:
+        """ Returns the numbers of rows and columns of the side seen with the
+        orientation. """
+        side = self.sides[orientation.front]
+        if orientation.get_side_rotation() % 2 == 0:
+            return side.rows, side.columns
+        return side.columns, side.rows
 
     @staticmethod
     def _fix_index(index: int, items_count: int) -> int:
@@ -41,37 +201,87 @@ class Cube(Generic[T]):
             index = items_count + 1 + index
         return index - 1
 
-    def turn_vertical(self, orientation: Orientation, index: int, turns: int) -> None:
+    def turn_vertical(self, orientation: Orientation, index: int, turns: int, width: int = 1) -> None:
+        """ Turns `width` adjacent layers starting from the `index`-th one
+        as a single block. """
         faces: List[ICubeSide] = []
         for i in range(4):
             faces.append(self.get_side(orientation))
             orientation = orientation.to_top
 
-        index = self._fix_index(index, faces[0].columns)
-        columns = [face.get_column(index) for face in faces]
-        columns = shift_list(columns, 4 - turns)
-        for face, column in zip(faces, columns):
-            face.set_column(index, column)
+        columns_count = faces[0].columns
+        index = self._fix_index(index, columns_count)
+        if width < 1 or index + width > columns_count:
+            raise ValueError(f"Cannot turn {width} layers starting from {index + 1}. "
+                             f"{columns_count} is an upper limit")
+        layers = range(index, index + width)
+        blocks = [[face.get_column(j) for j in layers] for face in faces]
+        blocks = shift_list(blocks, 4 - turns)
+        for face, block in zip(faces, blocks):
+            for j, column in zip(layers, block):
+                face.set_column(j, column)
 
         if index == 0:
             left_face = self.get_side(orientation.to_left)
             left_face.rotate(4 - turns)
-        elif index == faces[0].columns - 1:
+        if layers[-1] == columns_count - 1:
             right_face = self.get_side(orientation.to_right)
             right_face.rotate(turns)
+        if self.piece_index is not None:
+            self.piece_index.turn(orientation, layers[0] + 1, turns, width)
 
-    def turn_horizontal(self, orientation: Orientation, index: int, turns: int) -> None:
+    def turn_horizontal(self, orientation: Orientation, index: int, turns: int, width: int = 1) -> None:
         orientation = orientation.rotate_counterclockwise()
-        self.turn_vertical(orientation, index, turns)
+        self.turn_vertical(orientation, index, turns, width)
 
-    def turn_slice(self, orientation: Orientation, index: int, turns: int) -> None:
+    def turn_slice(self, orientation: Orientation, index: int, turns: int, width: int = 1) -> None:
         orientation = orientation.to_right
-        self.turn_vertical(orientation, index, 4 - turns)
+        self.turn_vertical(orientation, index, 4 - turns, width)
+
+    def count_color(self, orientation: Orientation, color: Color) -> int:
+        """ Returns the number of cells of the color on the front side. """
+        side = self.sides[orientation.front]
+        return _color_codes(side.cells[0:len(side.cells)]).count(color.value)
+
+    def is_side_solved(self, orientation: Orientation) -> bool:
+        """ Checks that all cells of the front side have the same color. """
+        side = self.sides[orientation.front]
+        return _has_single_color(side.cells[0:len(side.cells)])
+
+    def get_side_color(self, side: Side) -> Color:
+        """ Returns the color the side has when the cube is solved: the color
+        of its center, or, if the side has no center, its most common color
+        (the initial color of the side wins ties). """
+        cells = self.sides[side]
+        if cells.rows % 2 == 1 and cells.columns % 2 == 1:
+            return cells.get_color(cells.rows // 2, cells.columns // 2)
+        codes = _color_codes(cells.cells[0:len(cells.cells)])
+        initial = INITIAL_COLORS[side].value
+        return COLORS_BY_CODE[max(set(codes), key=lambda code: (codes.count(code), code == initial))]
+
+    def is_layer_solved(self, orientation: Orientation, depth: int) -> bool:
+        """ Checks that the cells of the layer at the depth (starting from 1,
+        negative values count from the back side) below the front side have
+        the colors of their sides (see `get_side_color`). The outer layers
+        include the front or the back side, so it must be solved as well. """
+        ring = orientation.to_right
+        layers_count = self.get_side(ring).columns
+        index = self._fix_index(depth, layers_count)
+        for _ in range(4):
+            codes = _color_codes(self.get_side(ring).get_column(index))
+            if codes.count(self.get_side_color(ring.front).value) != len(codes):
+                return False
+            ring = ring.to_top
+        if index == 0 and not self.is_side_solved(orientation):
+            return False
+        return index < layers_count - 1 or self.is_side_solved(orientation.to_left.to_left)
 
     def get_data(self, orientation: Orientation, i: int, j: int) -> Optional[T]:
         return self.get_side(orientation)[i, j].data
 
     def set_data(self, orientation: Orientation, i: int, j: int, value: Optional[T]) -> None:
+        if self.packed:
+            raise ValueError("Packed cubes cannot store data")
         front = self.get_side(orientation)
         front[i, j].data = value
 
@@ -89,6 +299,32 @@ class Cube(Generic[T]):
             bottom = self.get_side(orientation.to_bottom)
             bottom[0, j].data = value
 
+    def _iterate_positions(self) -> Iterator[Tuple[CubeSide[T], int, int]]:
+        for side in Side:
+            face = self.sides[side]
+            for i in range(face.rows):
+                for j in range(face.columns):
+                    yield face, i, j
+
+    def get_permutation(self, actions: Iterable["Action"], orientation: Orientation) -> List[int]:
+        """ Computes the permutation of the cube's components performed by the
+        sequence of actions. The value at index `k` is the index of the position
+        from which the component at position `k` is moved. """
+        scratch = Cube(self.shape)
+        for index, (face, i, j) in enumerate(scratch._iterate_positions()):
+            face[i, j].data = index
+        for action in actions:
+            orientation = action.perform(scratch, orientation)
+        return [face[i, j].data for face, i, j in scratch._iterate_positions()]
+
+    def apply_permutation(self, permutation: List[int]) -> None:
+        positions = list(self._iterate_positions())
+        components = [face[i, j] for face, i, j in positions]
+        for (face, i, j), source in zip(positions, permutation):
+            face[i, j] = components[source]
+        if self.piece_index is not None:
+            self.piece_index.permute(permutation)
+
     def iterate_components(self) -> Iterator[Tuple[Side, int, int]]:
         for i in range(self.shape[2]):
             for j in range(self.shape[0]):
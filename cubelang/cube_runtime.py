@@ -1,16 +1,30 @@
-from typing import Callable, Optional, List, Union
-from collections import deque
+from typing import Callable, Optional, List, Union, Tuple, Dict, Any, NamedTuple
+from collections import deque, OrderedDict
 import sys
 
 from .actions import Turn, Action, Rotate
 from .compiler import types
-from .cube import Cube
+from .cube import Cube, power_permutation
 from .orientation import Orientation, Side, Color
 from .pattern import Pattern
+from .pieces import get_piece_index
+from .search import get_goal, search
+from .solvers import pocket_cube, two_phase
 from .stdlib import Library
 from .execution.rt_error import TerminateExecutionError
 
 
+class Checkpoint(NamedTuple):
+    """ State saved by `checkpoint()`. Turns performed after it are logged
+    with their inverses, so `rollback()` costs as much as the turns did.
+    Actions are not sent to the callback until the checkpoint is committed. """
+    orientation: Orientation
+    orientations_stack: deque
+    suspended_orientation: Optional[Orientation]
+    undo_log: List[Union[Tuple[Turn, Orientation], List[int]]]
+    actions: List[Action]
+
+
 class CubeRuntime:
 
     SIDE_NAMES = {
@@ -24,15 +38,35 @@ class CubeRuntime:
         "white": Color.WHITE, "yellow": Color.YELLOW, "orange": Color.ORANGE
     }
 
+    PERMUTATION_SIZE_LIMIT = 6 * 64 * 64
+    STATE_CACHE_SIZE_LIMIT = 6 * 64 * 64
+    STATES_CACHED = 64
+    MEMO_CACHE_SIZE = 1024
+
     EXPORTED_FUNCTIONS = [
         ("push_orientation", "push_orientation", [], types.Void),
         ("pop_orientation", "pop_orientation", [], types.Void),
         ("suspend_rotations", "suspend_rotations", [], types.Void),
         ("resume_rotations", "resume_rotations", [], types.Void),
         ("exit", "perform_exit", [], types.Void),
+        ("checkpoint", "checkpoint", [], types.Void),
+        ("rollback", "rollback", [], types.Void),
+        ("commit", "commit", [], types.Void),
+        ("solve_optimal", "solve_optimal", [], types.Void),
+        ("solve", "solve", [], types.Void),
+        ("solve", "solve", [types.Integer], types.Void),
+        ("find_edge", "find_edge", [types.Color, types.Color], types.List(types.Side)),
+        ("find_corner", "find_corner", [types.Color, types.Color, types.Color], types.List(types.Side)),
+        ("face_solved", "face_solved", [types.Side], types.Bool),
+        ("count_color", "count_color", [types.Side, types.Color], types.Integer),
+        ("face_equals", "face_equals", [types.Side, types.Pattern], types.Bool),
+        ("layer_solved", "layer_solved", [types.Side, types.Integer], types.Bool),
         ("print", "debug_print", [types.T, ...], types.Void)
     ]
 
+    # Exported functions that only read the cube
+    READING_FUNCTIONS = {"find_edge", "find_corner", "face_solved", "count_color", "face_equals", "layer_solved"}
+
     def __init__(self, cube: Cube, orientation: Orientation,
                  callback: Callable[[Action], None],
                  done_callback: Callable[[], None]):
@@ -42,43 +76,184 @@ class CubeRuntime:
         self.suspended_orientation: Optional[Orientation] = None
         self.callback = callback
         self.done_callback = done_callback
+        self.repeat_cache: Dict[Tuple[Tuple, Orientation], Tuple[Tuple[Action, ...], int, Optional[List[int]]]] = dict()
+        self.state_version: int = 0
+        self.colors_version: int = 0
+        self.checkpoints: List[Checkpoint] = []
+        self.colors_cache: Dict[Tuple[Side, int, int], Color] = dict()
+        self.states_cache: Optional[OrderedDict] = OrderedDict() \
+            if self.cube_size <= CubeRuntime.STATE_CACHE_SIZE_LIMIT else None
 
         self.functions = Library()
         for name, local_name, argument_types, return_type in CubeRuntime.EXPORTED_FUNCTIONS:
             self.functions.add_function(name, getattr(self, local_name),
-                                        argument_types, return_type)
+                                        argument_types, return_type,
+                                        pure=name in CubeRuntime.READING_FUNCTIONS)
 
         self.functions.exec_globals["cube_turn"] = self.perform_turn
         self.functions.exec_globals["cube_rotate"] = self.perform_rotate
+        self.functions.exec_globals["cube_repeat"] = self.perform_repeat
         self.functions.exec_globals["cube_get_color"] = self.get_color
         self.functions.exec_globals["orient"] = self.perform_orient
+        self.functions.exec_globals["cube_search"] = self.perform_search
+        self.functions.exec_globals["cube_memoize"] = self.memoize
         self.functions.exec_globals["Pattern"] = Pattern
 
         for name, side in CubeRuntime.SIDE_NAMES.items():
             self.functions.add_value(name, types.Side, side)
         for name, color in CubeRuntime.COLOR_NAMES.items():
             self.functions.add_value(name, types.Color, color)
+        self.update_state()
 
     def yield_action(self, action: Action) -> None:
-        if self.suspended_orientation is None:
+        if self.suspended_orientation is not None:
+            if not isinstance(action, Turn):
+                return
+            action = action.from_orientation(self.orientation, self.suspended_orientation)
+        if len(self.checkpoints) > 0:
+            self.checkpoints[-1].actions.append(action)
+        else:
             self.callback(action)
-        elif isinstance(action, Turn):
-            self.callback(action.from_orientation(self.orientation,
-                                                  self.suspended_orientation))
+
+    def perform_action(self, action: Action) -> None:
+        """ Performs the action on the cube, logging its inverse if there is
+        an active checkpoint. """
+        if isinstance(action, Turn):
+            if len(self.checkpoints) > 0:
+                self.checkpoints[-1].undo_log.append((action.inverse(), self.orientation))
+            self._turn_cube(action, self.orientation)
+        else:
+            self.orientation = action.perform(None, self.orientation)
+
+    def _turn_cube(self, turn: Turn, orientation: Orientation) -> None:
+        """ Performs the turn on the cube. All changes of the cube are made
+        either here or by `_permute_cube`. """
+        turn.perform(self.cube, orientation)
+
+    def _permute_cube(self, permutation: List[int]) -> None:
+        self.cube.apply_permutation(permutation)
+
+    def perform_actions(self, actions: List[Action]) -> None:
+        for action in actions:
+            self.perform_action(action)
+            self.yield_action(action)
+        self.update_state()
+
+    @property
+    def cube_size(self) -> int:
+        return sum(side.rows * side.columns for side in self.cube.sides.values())
+
+    def update_state(self) -> None:
+        """ Must be called after every change of the cube or its orientation.
+        It only bumps the state version, the colors cache of the new state is
+        looked up by `_get_colors_cache` when a color is read. """
+        self.state_version += 1
+
+    def _get_colors_cache(self) -> Dict[Tuple[Side, int, int], Color]:
+        """ Returns the colors cache of the current state version. Color caches
+        of recently seen states are looked up by the cube's Zobrist hash, so
+        returning to a state (e.g. after a move and its inverse) reuses the
+        colors that were read in it before. The hash is not collision-free
+        (see `zobrist`), so a cache is only reused if the state it was filled
+        in has exactly the same colors. """
+        if self.colors_version == self.state_version:
+            return self.colors_cache
+        self.colors_version = self.state_version
+        if self.states_cache is None:
+            self.colors_cache = dict()
+            return self.colors_cache
+        key = (self.cube.zobrist_hash, self.orientation)
+        state = bytes(self.cube.state_view())
+        entry = self.states_cache.pop(key, None)
+        if entry is None or entry[0] != state:
+            entry = (state, dict())
+            if len(self.states_cache) >= CubeRuntime.STATES_CACHED:
+                self.states_cache.popitem(last=False)
+        self.states_cache[key] = entry
+        self.colors_cache = entry[1]
+        return self.colors_cache
+
+    def memoize(self, function: Callable) -> Callable:
+        """ Wraps a `memo func`. The compiler ensures that it only reads the
+        cube, so its results are reused while the cube and the orientation are
+        the same. Results are looked up by the cube's Zobrist hash and then
+        checked against the full state, since different states may share the
+        hash. """
+        cache: OrderedDict = OrderedDict()
+
+        def wrapper(*args):
+            key = (args, self.cube.zobrist_hash, self.orientation)
+            state = bytes(self.cube.state_view())
+            entry = cache.get(key)
+            if entry is not None and entry[0] == state:
+                cache.move_to_end(key)
+                return entry[1]
+            result = function(*args)
+            cache[key] = (state, result)
+            cache.move_to_end(key)
+            if len(cache) > CubeRuntime.MEMO_CACHE_SIZE:
+                cache.popitem(last=False)
+            return result
+        return wrapper
 
     def debug_print(self, *args):
         print(*args, file=sys.stderr)
 
     def perform_orient(self, *args, **kwargs) -> bool:
-        new_orientation = self.cube.orient(self.orientation, *args, **kwargs)
+        return self._orient_to(self.cube.orient(self.orientation, *args, **kwargs))
+
+    def _orient_to(self, new_orientation: Optional[Orientation]) -> bool:
         if new_orientation is not None:
             actions = Rotate.from_turn_steps(self.orientation.turns_to(new_orientation))
             for action in actions:
                 self.yield_action(action)
             self.orientation = new_orientation
+            self.update_state()
             return True
         return False
 
+    def perform_search(self, depth: int, moves: Tuple[Tuple[Tuple[Any, ...], ...], ...], **patterns) -> bool:
+        actions = self._search(depth, moves, patterns)
+        if actions is None:
+            return False
+        self.perform_actions(actions)
+        return True
+
+    def _search(self, depth: int, moves: Tuple[Tuple[Tuple[Any, ...], ...], ...],
+                patterns: Dict[str, Any]) -> Optional[List[Action]]:
+        formulas = [tuple(map(CubeRuntime._create_action, formula)) for formula in moves]
+        goal = get_goal(self.cube, self.orientation, patterns)
+        return search(self.cube, self.orientation, goal, formulas, depth)
+
+    def checkpoint(self):
+        self.checkpoints.append(Checkpoint(self.orientation, self.orientations_stack.copy(),
+                                           self.suspended_orientation, [], []))
+
+    def rollback(self):
+        if len(self.checkpoints) == 0:
+            raise ValueError("There is no checkpoint to roll back to")
+        checkpoint = self.checkpoints.pop()
+        for entry in reversed(checkpoint.undo_log):
+            if isinstance(entry, list):
+                self._permute_cube(entry)
+            else:
+                self._turn_cube(*entry)
+        self.orientation = checkpoint.orientation
+        self.orientations_stack = checkpoint.orientations_stack
+        self.suspended_orientation = checkpoint.suspended_orientation
+        self.update_state()
+
+    def commit(self):
+        if len(self.checkpoints) == 0:
+            raise ValueError("There is no checkpoint to commit")
+        checkpoint = self.checkpoints.pop()
+        if len(self.checkpoints) > 0:
+            self.checkpoints[-1].undo_log.extend(checkpoint.undo_log)
+            self.checkpoints[-1].actions.extend(checkpoint.actions)
+        else:
+            for action in checkpoint.actions:
+                self.callback(action)
+
     def suspend_rotations(self):
         self.suspended_orientation = self.orientation
 
@@ -97,35 +272,139 @@ class CubeRuntime:
         for action in Rotate.from_turn_steps(turns):
             self.yield_action(action)
         self.orientation = new_orientation
+        self.update_state()
 
     def perform_turn(self, side: Side, amount: int,
                      indices: List[Union[int, type(Ellipsis)]]):
         action = Turn(side, indices, amount)
-        self.orientation = action.perform(self.cube, self.orientation)
+        self.perform_action(action)
+        self.update_state()
         self.yield_action(action)
 
     def perform_rotate(self, side: Side, twice: bool):
         action = Rotate(side, twice)
-        self.orientation = action.perform(self.cube, self.orientation)
+        self.perform_action(action)
+        self.update_state()
         self.yield_action(action)
 
+    @staticmethod
+    def _create_action(move: Tuple[Any, ...]) -> Action:
+        if move[0] == "turn":
+            _, side, amount, indices = move
+            return Turn(side, list(indices), amount)
+        else:
+            _, side, twice = move
+            return Rotate(side, twice)
+
+    def _prepare_repeat(self, moves: Tuple[Tuple[Any, ...], ...]) \
+            -> Tuple[Tuple[Action, ...], int, Optional[List[int]]]:
+        actions = tuple(map(CubeRuntime._create_action, moves))
+        period = 1
+        orientation = self.orientation
+        while True:
+            for action in actions:
+                if isinstance(action, Rotate):
+                    orientation = action.perform(None, orientation)
+            if orientation == self.orientation:
+                break
+            period += 1
+
+        try:
+            permutation = self.cube.get_permutation(actions * period, self.orientation) \
+                if self.cube_size <= CubeRuntime.PERMUTATION_SIZE_LIMIT else None
+        except ValueError:
+            permutation = None
+        return actions, period, permutation
+
+    def perform_repeat(self, times: int, moves: Tuple[Tuple[Any, ...], ...]):
+        key = (moves, self.orientation)
+        if key not in self.repeat_cache:
+            self.repeat_cache[key] = self._prepare_repeat(moves)
+        actions, period, permutation = self.repeat_cache[key]
+
+        if permutation is None or times < period:
+            cycles, remainder = 0, max(times, 0)
+        else:
+            cycles, remainder = divmod(times, period)
+            self._permute_cube(power_permutation(permutation, cycles))
+            if len(self.checkpoints) > 0:
+                self.checkpoints[-1].undo_log.append(power_permutation(permutation, -cycles))
+            for _ in range(cycles * period):
+                for action in actions:
+                    if isinstance(action, Rotate):
+                        self.orientation = action.perform(None, self.orientation)
+                    self.yield_action(action)
+
+        for _ in range(remainder):
+            for action in actions:
+                self.perform_action(action)
+                self.yield_action(action)
+        self.update_state()
+
+    def solve_optimal(self):
+        self.perform_actions(self._solve_optimal())
+
+    def _solve_optimal(self) -> List[Action]:
+        return pocket_cube.get_solver().solve(self.cube, self.orientation)
+
+    def solve(self, max_length: int = two_phase.MAX_LENGTH):
+        self.perform_actions(self._solve(max_length))
+
+    def _solve(self, max_length: int) -> List[Action]:
+        return two_phase.get_solver().solve(self.cube, self.orientation, max_length)
+
+    def find_edge(self, first: Color, second: Color) -> List[Side]:
+        return get_piece_index(self.cube).locate([first, second], self.orientation)
+
+    def find_corner(self, first: Color, second: Color, third: Color) -> List[Side]:
+        return get_piece_index(self.cube).locate([first, second, third], self.orientation)
+
     def perform_exit(self):
         raise TerminateExecutionError()
 
     def get_color(self, side: Side, i: int, j: int):
+        key = (side, i, j)
+        colors_cache = self._get_colors_cache()
+        color = colors_cache.get(key)
+        if color is None:
+            color = self._read_color(side, i, j)
+            colors_cache[key] = color
+        return color
+
+    def _get_view(self, side: Side) -> Orientation:
+        """ Returns the orientation with which the side is seen as the front
+        one. """
         if side == Side.FRONT:
-            local_orientation = self.orientation
+            return self.orientation
         elif side == Side.LEFT:
-            local_orientation = self.orientation.to_left
+            return self.orientation.to_left
         elif side == Side.RIGHT:
-            local_orientation = self.orientation.to_right
+            return self.orientation.to_right
         elif side == Side.BACK:
-            local_orientation = self.orientation.to_left.to_left
+            return self.orientation.to_left.to_left
         elif side == Side.TOP:
-            local_orientation = self.orientation.to_top
+            return self.orientation.to_top
         else:
-            local_orientation = self.orientation.to_bottom
-        return self.cube.get_side(local_orientation).colors[i, j]
+            return self.orientation.to_bottom
+
+    def _read_color(self, side: Side, i: int, j: int) -> Color:
+        return self.cube.get_side(self._get_view(side)).colors[i, j]
+
+    def face_solved(self, side: Side) -> bool:
+        return self.cube.is_side_solved(self._get_view(side))
+
+    def count_color(self, side: Side, color: Color) -> int:
+        return self.cube.count_color(self._get_view(side), color)
+
+    def face_equals(self, side: Side, pattern: Pattern) -> bool:
+        return pattern.match(self.cube.get_side(self._get_view(side)), dict()) is not None
+
+    def layer_solved(self, side: Side, depth: int) -> bool:
+        return self.cube.is_layer_solved(self._get_view(side), depth)
 
     def finished(self):
+        # The cube keeps turns made after checkpoints that are still open, so
+        # they are committed for the output to lead to the final state
+        while len(self.checkpoints) > 0:
+            self.commit()
         self.done_callback()
@@ -0,0 +1,342 @@
+from collections import defaultdict
+from functools import lru_cache
+from itertools import permutations, product
+from typing import Dict, List, Tuple, FrozenSet, Optional, Sequence
+
+from . import zobrist
+from .cube import Cube
+from .orientation import Side, Color, Orientation
+from .sides import CubeSide
+
+CUBIE_SIZES = (2, 3)
+GROUP_SIZE = 4
+
+Coordinates = List[int]
+MoveTables = List[List[int]]
+
+
+@lru_cache(maxsize=None)
+def get_arrangements(slots: int, pieces: int) -> Tuple[List[Tuple[int, ...]], Dict[Tuple[int, ...], int]]:
+    """ Returns all arrangements of `pieces` distinct pieces over `slots` slots
+    and a mapping from an arrangement to its index. """
+    values = list(permutations(range(slots), pieces))
+    return values, {value: index for index, value in enumerate(values)}
+
+
+class PieceKind:
+    """ Pieces with the same number of facelets: corners, edges or centers.
+    Every slot is an ordered tuple of facelet indices. Slots are ordered so
+    that moves map the tuple of one slot to a cyclic shift of another one. """
+
+    def __init__(self, slots: List[Tuple[int, ...]], colors: List[Color]):
+        self.slots: List[Tuple[int, ...]] = slots
+        self.twists: int = len(slots[0])
+        self.slot_by_facelet: Dict[int, int] = {f: s for s, slot in enumerate(slots) for f in slot}
+        self.home_colors: List[Tuple[Color, ...]] = [tuple(colors[f] for f in slot) for slot in slots]
+        self.pieces_by_colors: Dict[FrozenSet[Color], int] = \
+            {frozenset(piece_colors): piece for piece, piece_colors in enumerate(self.home_colors)}
+
+    def map_slots(self, destinations: List[int]) -> Tuple[List[int], List[int]]:
+        """ Returns where every slot is moved by the facelet mapping and how its
+        facelets are shifted. """
+        slot_map, shifts = [], []
+        for slot in self.slots:
+            image = [destinations[f] for f in slot]
+            target = self.slot_by_facelet[image[0]]
+            shift = self.slots[target].index(image[0])
+            slot_map.append(target)
+            shifts.append(shift)
+        return slot_map, shifts
+
+
+class CubieModel:
+    """ Describes a 2x2x2 or a 3x3x3 cube as a set of pieces (cubies). The state
+    is a list of small integer coordinates: the positions of every group of
+    four corners and edges, the orientations of all corners and edges and the
+    arrangement of the centers. Moves are applied to each coordinate as a
+    lookup in a precomputed table. Use `get_model` to get a shared instance. """
+
+    def __init__(self, size: int):
+        if size not in CUBIE_SIZES:
+            raise ValueError(f"Cubie model supports only cubes of sizes {CUBIE_SIZES}")
+        self.shape: Tuple[int, int, int] = (size,) * 3
+        solved = Cube(self.shape)
+        self.positions: List[Tuple[Side, int, int]] = [
+            (side, i, j)
+            for side in Side
+            for i in range(solved.sides[side].rows)
+            for j in range(solved.sides[side].columns)]
+        self.solved_colors: List[Color] = [solved.sides[side].colors[i, j] for side, i, j in self.positions]
+
+        # Facelets of a piece are moved by the same layers. Centers of the
+        # faces are not moved by turning their own faces and form single
+        # facelet pieces.
+        axes = [Orientation(), Orientation().rotate_counterclockwise(), Orientation().to_right]
+        layers = [[self._get_destinations(axis, index, 1, 1) for index in range(1, size + 1)] for axis in axes]
+        pieces: Dict[Tuple[int, ...], List[int]] = defaultdict(list)
+        for position in range(len(self.positions)):
+            signature = tuple(next((index for index, destinations in enumerate(axis_layers)
+                                    if destinations[position] != position), None)
+                              for axis_layers in layers)
+            if None in signature:
+                signature = (position,)
+            pieces[signature].append(position)
+        layer_turns = [destinations for axis_layers in layers for destinations in axis_layers]
+
+        self.kinds: List[PieceKind] = []
+        for twists in (3, 2, 1):
+            facelets = sorted(tuple(sorted(x)) for x in pieces.values() if len(x) == twists)
+            if len(facelets) == 0:
+                continue
+            if twists > 1:
+                facelets = self._order_slots(facelets, layer_turns)
+            self.kinds.append(PieceKind(facelets, self.solved_colors))
+
+        # Coordinate components as (kind, pieces of the group) or (kind, None)
+        # for the orientation of the whole kind.
+        self.components: List[Tuple[PieceKind, Optional[Tuple[int, ...]]]] = []
+        for kind in self.kinds:
+            count = len(kind.slots)
+            group_size = GROUP_SIZE if count % GROUP_SIZE == 0 else count
+            for start in range(0, count, group_size):
+                self.components.append((kind, tuple(range(start, start + group_size))))
+            if kind.twists > 1:
+                self.components.append((kind, None))
+
+        self.solved: Coordinates = self.encode([[(s, 0) for s in range(len(k.slots))] for k in self.kinds])
+        self.tables: List[MoveTables] = []
+        self.destinations: List[List[int]] = []
+        self._moves_by_permutation: Dict[Tuple[int, ...], int] = dict()
+        self._moves: Dict[Tuple[Orientation, int, int, int], int] = dict()
+
+    def _get_destinations(self, orientation: Orientation, index: int, turns: int, width: int) -> List[int]:
+        """ Returns the index of the position where every facelet is moved by
+        turning the layers of the cube. """
+        scratch = Cube(self.shape)
+        for position, (side, i, j) in enumerate(self.positions):
+            scratch.sides[side][i, j].data = position
+        Cube.turn_vertical(scratch, orientation, index, turns, width)
+        destinations = [0] * len(self.positions)
+        for position, (side, i, j) in enumerate(self.positions):
+            destinations[scratch.sides[side][i, j].data] = position
+        return destinations
+
+    @staticmethod
+    def _order_slots(facelets: List[Tuple[int, ...]], moves: List[List[int]]) -> List[Tuple[int, ...]]:
+        """ Orders facelets of every slot as the images of the first slot under
+        the moves, so all slots have the same handedness. """
+        slot_by_facelet = {f: s for s, slot in enumerate(facelets) for f in slot}
+        ordered: List[Optional[Tuple[int, ...]]] = [None] * len(facelets)
+        ordered[0] = facelets[0]
+        queue = [facelets[0]]
+        while len(queue) > 0:
+            slot = queue.pop()
+            for destinations in moves:
+                image = tuple(destinations[f] for f in slot)
+                index = slot_by_facelet[image[0]]
+                if ordered[index] is None:
+                    ordered[index] = image
+                    queue.append(image)
+        return ordered
+
+    def get_move(self, orientation: Orientation, index: int, turns: int, width: int = 1) -> int:
+        """ Returns the identifier of the move that turns the layers the same
+        way as `Cube.turn_vertical` does. Equal moves share the identifier. """
+        key = (orientation, index, turns, width)
+        move = self._moves.get(key)
+        if move is None:
+            destinations = tuple(self._get_destinations(orientation, index, turns, width))
+            move = self._moves_by_permutation.get(destinations)
+            if move is None:
+                move = len(self.tables)
+                self.tables.append(self._build_tables(list(destinations)))
+                self.destinations.append(list(destinations))
+                self._moves_by_permutation[destinations] = move
+            self._moves[key] = move
+        return move
+
+    def _build_tables(self, destinations: List[int]) -> MoveTables:
+        tables: MoveTables = []
+        cache: Dict[Tuple[int, int], List[int]] = dict()
+        for kind_index, kind in enumerate(self.kinds):
+            slot_map, shifts = kind.map_slots(destinations)
+            for component_kind, group in self.components:
+                if component_kind is not kind:
+                    continue
+                if group is None:
+                    tables.append(self._build_orientation_table(kind, slot_map, shifts))
+                    continue
+                key = (kind_index, len(group))
+                if key not in cache:
+                    values, ranks = get_arrangements(len(kind.slots), len(group))
+                    cache[key] = [ranks[tuple(slot_map[s] for s in value)] for value in values]
+                tables.append(cache[key])
+        return tables
+
+    @staticmethod
+    def _build_orientation_table(kind: PieceKind, slot_map: List[int], shifts: List[int]) -> List[int]:
+        count = len(kind.slots)
+        table = []
+        for digits in product(range(kind.twists), repeat=count):
+            result = [0] * count
+            for slot, twist in enumerate(reversed(digits)):
+                result[slot_map[slot]] = (twist + shifts[slot]) % kind.twists
+            table.append(CubieModel._encode_digits(result, kind.twists))
+        return table
+
+    @staticmethod
+    def _encode_digits(digits: Sequence[int], base: int) -> int:
+        value = 0
+        for digit in reversed(digits):
+            value = value * base + digit
+        return value
+
+    def apply(self, coordinates: Coordinates, move: int) -> None:
+        """ Applies the move to the coordinates in place. """
+        for k, table in enumerate(self.tables[move]):
+            coordinates[k] = table[coordinates[k]]
+
+    def encode(self, state: List[List[Tuple[int, int]]]) -> Coordinates:
+        """ Computes coordinates of the state given as a list of pairs (piece,
+        twist) for every slot of every kind. """
+        coordinates = []
+        for kind, group in self.components:
+            slots = state[self.kinds.index(kind)]
+            if group is None:
+                coordinates.append(self._encode_digits([twist for _, twist in slots], kind.twists))
+            else:
+                location = {piece: slot for slot, (piece, _) in enumerate(slots)}
+                ranks = get_arrangements(len(kind.slots), len(group))[1]
+                coordinates.append(ranks[tuple(location[piece] for piece in group)])
+        return coordinates
+
+    def decode(self, coordinates: Coordinates) -> List[List[Tuple[int, int]]]:
+        state = [[(0, 0)] * len(kind.slots) for kind in self.kinds]
+        for (kind, group), value in zip(self.components, coordinates):
+            slots = state[self.kinds.index(kind)]
+            if group is None:
+                for slot in range(len(slots)):
+                    value, twist = divmod(value, kind.twists)
+                    slots[slot] = (slots[slot][0], twist)
+            else:
+                arrangement = get_arrangements(len(kind.slots), len(group))[0][value]
+                for piece, slot in zip(group, arrangement):
+                    slots[slot] = (piece, slots[slot][1])
+        return state
+
+    def read_facelets(self, sides: Dict[Side, CubeSide]) -> Coordinates:
+        """ Computes coordinates of the cube's sides. Raises `ValueError` if
+        the colors do not form a valid set of pieces. """
+        colors = [sides[side].colors[i, j] for side, i, j in self.positions]
+        state = []
+        for kind in self.kinds:
+            slots, seen = [], set()
+            for slot in kind.slots:
+                slot_colors = tuple(colors[f] for f in slot)
+                piece = kind.pieces_by_colors.get(frozenset(slot_colors))
+                if piece is None or piece in seen:
+                    raise ValueError("Cube colors do not form a valid set of pieces")
+                home = kind.home_colors[piece]
+                twist = slot_colors.index(home[0])
+                if any(slot_colors[(k + twist) % kind.twists] != home[k] for k in range(kind.twists)):
+                    raise ValueError("Cube colors do not form a valid set of pieces")
+                seen.add(piece)
+                slots.append((piece, twist))
+            state.append(slots)
+        return self.encode(state)
+
+    def write_facelets(self, sides: Dict[Side, CubeSide], coordinates: Coordinates) -> None:
+        colors: List[Optional[Color]] = [None] * len(self.positions)
+        for kind, slots in zip(self.kinds, self.decode(coordinates)):
+            for slot, (piece, twist) in zip(kind.slots, slots):
+                for k, color in enumerate(kind.home_colors[piece]):
+                    colors[slot[(k + twist) % kind.twists]] = color
+        for (side, i, j), color in zip(self.positions, colors):
+            sides[side].set_color(i, j, color)
+
+
+@lru_cache(maxsize=None)
+def get_model(size: int) -> CubieModel:
+    return CubieModel(size)
+
+
+class CubieCube(Cube[None]):
+    """ Cube of size 2 or 3 whose state is kept as coordinates of a
+    `CubieModel`, so turning layers takes a few table lookups. Sides are
+    filled from the coordinates when they are accessed; coordinates are
+    recomputed from the sides before the next turn if the sides were changed
+    since (see `CubeSide.version`), so the sides can be changed as in a
+    regular cube. Cells cannot store any data. """
+
+    def __init__(self, shape: Tuple[int, int, int]):
+        if len(set(shape)) != 1:
+            raise ValueError("Cubie cubes must have equal dimensions")
+        self.model: CubieModel = get_model(shape[0])
+        self._sides: Dict[Side, CubeSide[None]] = dict()
+        self._coordinates: Optional[Coordinates] = None
+        self._sides_valid: bool = True
+        # Versions of the sides that match the coordinates
+        self._versions: Optional[Tuple[Tuple[CubeSide[None], int], ...]] = None
+        super().__init__(shape)
+        self._coordinates = list(self.model.solved)
+        self._versions = self._get_versions()
+
+    def _get_versions(self) -> Tuple[Tuple[CubeSide[None], int], ...]:
+        return tuple((side, side.version) for side in self._sides.values())
+
+    @property
+    def sides(self) -> Dict[Side, CubeSide[None]]:
+        if not self._sides_valid:
+            self.model.write_facelets(self._sides, self._coordinates)
+            self._sides_valid = True
+            self._versions = self._get_versions()
+        return self._sides
+
+    @sides.setter
+    def sides(self, value: Dict[Side, CubeSide[None]]) -> None:
+        self._sides = value
+
+    @property
+    def coordinates(self) -> Coordinates:
+        """ Current coordinates of the cube. The list must not be modified. """
+        if self._sides_valid and self._versions != self._get_versions():
+            self._coordinates = self.model.read_facelets(self._sides)
+            self._versions = self._get_versions()
+        return self._coordinates
+
+    @staticmethod
+    def from_cube(cube: Cube) -> "CubieCube":
+        result = CubieCube(cube.shape)
+        result._coordinates = result.model.read_facelets(cube.sides)
+        result._sides_valid = False
+        return result
+
+    def to_cube(self) -> Cube:
+        cube = Cube(self.shape)
+        self.model.write_facelets(cube.sides, self.coordinates)
+        return cube
+
+    def apply_move(self, move: int) -> None:
+        """ Applies a move returned by `CubieModel.get_move`. """
+        self.model.apply(self.coordinates, move)
+        self._sides_valid = False
+
+    def turn_vertical(self, orientation: Orientation, index: int, turns: int, width: int = 1) -> None:
+        self.apply_move(self.model.get_move(orientation, index, turns, width))
+        if self.piece_index is not None:
+            self.piece_index.turn(orientation, index, turns, width)
+
+    def get_side_shape(self, orientation: Orientation) -> Tuple[int, int]:
+        return self.shape[0], self.shape[0]
+
+    def set_data(self, orientation: Orientation, i: int, j: int, value: Optional[None]) -> None:
+        raise ValueError("Cubie cubes cannot store data")
+
+    @property
+    def zobrist_hash(self) -> int:
+        """ 64-bit hash of the coordinates. It is computed in constant time,
+        but differs from the hash of a regular cube in the same state. """
+        result = 0
+        for value in self.coordinates:
+            result = zobrist.mix(result ^ value)
+        return result
@@ -1,6 +1,8 @@
+import ast
 from types import CodeType
-from typing import Iterator, Dict, Any
+from typing import Iterator, Dict, Any, Iterable, Optional
 from ..compiler.expression import Expression
+from ..compiler.passes import PassManager, is_variable
 from ..compiler.codeio import CodeStream
 from ..compiler.stack import VariablesPool
 from ..compiler.code_map import CodeMap
@@ -16,16 +18,21 @@ class ITracebackWriter(ABC):
 
 
 class ExecutionContext:
-    def __init__(self, globals: Dict[str, Any]):
+    def __init__(self, globals: Dict[str, Any], disabled_passes: Iterable[str] = ()):
         self.source: CodeType = None
         self.globals: Dict[str, Any] = globals
         self.globals["runtime_function"] = runtime_function
         self.code_map = CodeMap()
+        self.pass_manager = PassManager(disabled_passes)
 
     def compile(self, program: Iterator[Expression]):
         source = self.compile_source(program)
         # print(source)
-        self.source = compile(source, "<string>", "exec")
+        tree = ast.parse(source, "<string>")
+        constants = {name: value for name, value in self.globals.items()
+                     if type(value) in (bool, int, float) and not is_variable(name)}
+        tree = self.pass_manager.run(tree, constants)
+        self.source = compile(tree, "<string>", "exec")
 
     def compile_source(self, program: Iterator[Expression]) -> str:
         stream = CodeStream()
@@ -35,15 +42,18 @@ class ExecutionContext:
             expression.generate(variables, stream, self.code_map)
         return stream.get_contents()
 
-    def execute(self, error: ITracebackWriter) -> bool:
+    def execute(self, error: ITracebackWriter, globals: Optional[Dict[str, Any]] = None) -> bool:
+        """ Runs the compiled program. The program can be run several times
+        with different `globals`, which must define the same names as the
+        ones it was compiled with. """
         if self.source is None:
             raise RuntimeError("Illegal state: program must be compiled first")
         try:
-            exec(self.source, self.globals)
+            exec(self.source, self.globals if globals is None else globals)
             return True
         except TerminateExecutionError:
             return True
         except Exception as e:
-            e = RuntimeError.update_error(None, e)
+            e = RuntimeError.from_traceback(e, self.code_map)
             error.print_traceback(e, self.code_map)
             return False
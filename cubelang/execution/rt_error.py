@@ -1,6 +1,8 @@
 import traceback
 from typing import Optional, NamedTuple, List
 
+from ..compiler.code_map import CodeMap
+
 
 class TerminateExecutionError(Exception):
     pass
@@ -45,3 +47,35 @@ class RuntimeError(Exception):
         else:
             exp.next_name = func_name
         return exp
+
+    @staticmethod
+    def from_traceback(e: Exception, code_map: CodeMap) -> "RuntimeError":
+        """ Creates an error with the stack trace of the compiled program
+        extracted from the exception's traceback. Functions of the program are
+        not wrapped, so the mapping only happens when an error surfaces. """
+        if isinstance(e, RuntimeError) and len(e.stack_entries) > 0:
+            return RuntimeError.update_error(None, e)
+        if not any(isinstance(e, Exp) for Exp in RuntimeError.ACCEPTED_EXCEPTIONS + [RuntimeError]):
+            raise e
+
+        exp = RuntimeError(str(e))
+        next_name = e.next_name if isinstance(e, RuntimeError) else None
+        frames = []
+        tb = e.__traceback__
+        while tb is not None:
+            if tb.tb_frame.f_code.co_filename == "<string>":
+                frames.append(tb)
+            tb = tb.tb_next
+
+        for tb in reversed(frames):
+            code = tb.tb_frame.f_code
+            func_name = None
+            if code.co_name != "<module>":
+                func_name = code_map.get_function_name(code.co_firstlineno - 1)
+            if func_name is None:
+                func_name, next_name = next_name, None
+            inlined = code_map.get_inlined_call(tb.tb_lineno - 1)
+            if inlined is not None:
+                exp.add_stack_entry(*inlined)
+            exp.add_stack_entry(func_name, tb.tb_lineno - 1)
+        return exp
@@ -0,0 +1,89 @@
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+from .cube import Cube
+from .cubie import CUBIE_SIZES, CubieModel, get_model
+from .orientation import Orientation, Side, Color
+
+SlotMaps = List[Tuple[List[int], List[int]]]
+
+
+def _map_slots(model: CubieModel, destinations: List[int]) -> SlotMaps:
+    return [kind.map_slots(destinations) for kind in model.kinds]
+
+
+@lru_cache(maxsize=None)
+def _get_turn_slot_maps(size: int, orientation: Orientation, index: int, turns: int, width: int) -> SlotMaps:
+    model = get_model(size)
+    return _map_slots(model, model._get_destinations(orientation, index, turns, width))
+
+
+@lru_cache(maxsize=None)
+def _get_relative_sides(orientation: Orientation) -> Dict[Side, Side]:
+    views = {Side.FRONT: orientation, Side.BACK: orientation.to_left.to_left,
+             Side.LEFT: orientation.to_left, Side.RIGHT: orientation.to_right,
+             Side.TOP: orientation.to_top, Side.BOTTOM: orientation.to_bottom}
+    return {view.front: side for side, view in views.items()}
+
+
+class PieceIndex:
+    """ Slot and twist of every corner and edge of a cube of size 2 or 3,
+    looked up by the colors of the piece. The index is built from the colors
+    of the cube once and then updated by the turns of the cube (see
+    `get_piece_index`), so locating a piece does not read the cube. """
+
+    def __init__(self, cube: Cube):
+        if cube.shape[0] not in CUBIE_SIZES or len(set(cube.shape)) != 1:
+            raise ValueError(f"Pieces can be located only on cubes of sizes {CUBIE_SIZES}")
+        self.size: int = cube.shape[0]
+        self.model: CubieModel = get_model(self.size)
+        state = self.model.decode(self.model.read_facelets(cube.sides))
+        self.locations: List[List[Tuple[int, int]]] = []
+        for slots in state:
+            locations = [(0, 0)] * len(slots)
+            for slot, (piece, twist) in enumerate(slots):
+                locations[piece] = (slot, twist)
+            self.locations.append(locations)
+
+    def turn(self, orientation: Orientation, index: int, turns: int, width: int) -> None:
+        """ Updates the index after `Cube.turn_vertical` with the same
+        arguments. """
+        self._apply(_get_turn_slot_maps(self.size, orientation, index, turns, width))
+
+    def permute(self, permutation: List[int]) -> None:
+        """ Updates the index after `Cube.apply_permutation`. """
+        destinations = [0] * len(permutation)
+        for position, source in enumerate(permutation):
+            destinations[source] = position
+        self._apply(_map_slots(self.model, destinations))
+
+    def _apply(self, slot_maps: SlotMaps) -> None:
+        for k, (kind, (slot_map, shifts)) in enumerate(zip(self.model.kinds, slot_maps)):
+            self.locations[k] = [(slot_map[slot], (twist + shifts[slot]) % kind.twists)
+                                 for slot, twist in self.locations[k]]
+
+    def locate(self, colors: List[Color], orientation: Orientation) -> List[Side]:
+        """ Returns the sides, as they are seen with the orientation, on which
+        the facelets of the given colors of a piece are located. """
+        kind_index, kind = next(((k, kind) for k, kind in enumerate(self.model.kinds)
+                                 if kind.twists == len(colors)), (None, None))
+        piece = kind.pieces_by_colors.get(frozenset(colors)) if kind is not None else None
+        if piece is None:
+            names = ", ".join(color.name.lower() for color in colors)
+            raise ValueError(f"There is no piece with colors {names}")
+
+        slot, twist = self.locations[kind_index][piece]
+        facelets = kind.slots[slot]
+        views = _get_relative_sides(orientation)
+        home = kind.home_colors[piece]
+        return [views[self.model.positions[facelets[(home.index(color) + twist) % kind.twists]][0]]
+                for color in colors]
+
+
+def get_piece_index(cube: Cube) -> PieceIndex:
+    """ Returns the index of the cube's pieces. It is built on the first call
+    and then kept up to date by turns and permutations of the cube. Changing
+    colors of the cube in other ways requires resetting `Cube.piece_index`. """
+    if cube.piece_index is None:
+        cube.piece_index = PieceIndex(cube)
+    return cube.piece_index
@@ -0,0 +1,131 @@
+from operator import itemgetter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .actions import Action, Rotate
+from .cube import Cube
+from .orientation import Orientation
+from .pattern import Pattern
+
+CACHE_LIMIT = 1 << 20
+
+State = bytes
+Goal = Callable[[State], bool]
+
+
+def get_goal(cube: Cube, orientation: Orientation, patterns: Dict[str, Pattern]) -> Goal:
+    """ Converts patterns of the sides (keyed by the names used by the `orient`
+    statement) into a predicate on the cube's `state_view` that matches them in
+    the given orientation. Letters denote the same colors within a letter
+    and different colors for different letters, as in `Pattern.match`. """
+    scratch = Cube(cube.shape)
+    for index, (face, i, j) in enumerate(scratch._iterate_positions()):
+        face[i, j].data = index
+
+    orientations = {"front": orientation, "top": orientation.to_top, "left": orientation.to_left,
+                    "right": orientation.to_right, "bottom": orientation.to_bottom,
+                    "back": orientation.to_left.to_left}
+    fixed: List[Tuple[int, int]] = []
+    variables: Dict[str, List[int]] = dict()
+    for name, pattern in patterns.items():
+        if pattern is None:
+            continue
+        side = scratch.get_side(orientations[name])
+        if (pattern.rows, pattern.columns) != (side.rows, side.columns):
+            raise ValueError(f"Pattern of size {pattern.rows}x{pattern.columns} does not match "
+                             f"the {name} side of size {side.rows}x{side.columns}")
+        for i, j, cell in pattern._get_items():
+            if isinstance(cell, str):
+                variables.setdefault(cell, []).append(side[i, j].data)
+            else:
+                fixed.append((side[i, j].data, cell.value))
+    groups = list(variables.values())
+
+    def matches(state: State) -> bool:
+        for index, color in fixed:
+            if state[index] != color:
+                return False
+        colors = set()
+        for group in groups:
+            color = state[group[0]]
+            if color in colors:
+                return False
+            for index in group:
+                if state[index] != color:
+                    return False
+            colors.add(color)
+        return True
+    return matches
+
+
+def search(cube: Cube, orientation: Orientation, goal: Goal,
+           moves: Sequence[Sequence[Action]], depth: int) -> Optional[List[Action]]:
+    """ Finds the shortest sequence of at most `depth` moves (each one is a
+    formula) that brings the cube into a state satisfying the goal. The cube
+    is not changed. Returns the actions of the sequence, or None if there is
+    no such sequence.
+
+    The search is an iterative deepening over the cube's colors: every move is
+    precomputed as a permutation of the cells, so applying it is a single copy
+    of a byte string. A move is never followed by a move that undoes it or
+    whose combination with it is another single move (such as two turns of
+    the same face), and moves that commute (such as turns of opposite faces)
+    are only tried in one order. States already searched to a sufficient
+    depth are skipped. """
+    for formula in moves:
+        final = orientation
+        for action in formula:
+            if isinstance(action, Rotate):
+                final = action.perform(None, final)
+        if final != orientation:
+            raise ValueError("Search moves must not change the orientation of the cube")
+
+    start = bytes(cube.state_view())
+    if goal(start):
+        return []
+    permutations = [tuple(cube.get_permutation(formula, orientation)) for formula in moves]
+    appliers = [itemgetter(*permutation) for permutation in permutations]
+    successors = _get_successors(permutations)
+    cache: Dict[Tuple[State, int], int] = dict()
+    path: List[int] = []
+
+    def visit(state: State, previous: int, remaining: int) -> bool:
+        key = (state, previous)
+        if cache.get(key, -1) >= remaining:
+            return False
+        for move in successors[previous]:
+            following = bytes(appliers[move](state))
+            path.append(move)
+            if goal(following) or (remaining > 1 and visit(following, move, remaining - 1)):
+                return True
+            path.pop()
+        if len(cache) >= CACHE_LIMIT:
+            cache.clear()
+        cache[key] = remaining
+        return False
+
+    for limit in range(1, depth + 1):
+        if visit(start, -1, limit):
+            return [action for move in path for action in moves[move]]
+    return None
+
+
+def _get_successors(permutations: List[Tuple[int, ...]]) -> Dict[int, List[int]]:
+    """ Returns the moves that may follow each move (and the start, -1) in a
+    shortest sequence. """
+    identity = tuple(range(len(permutations[0]))) if len(permutations) > 0 else ()
+    singles = set(permutations) | {identity}
+
+    def compose(first: Tuple[int, ...], second: Tuple[int, ...]) -> Tuple[int, ...]:
+        return tuple(first[k] for k in second)
+
+    result = {-1: list(range(len(permutations)))}
+    for a, first in enumerate(permutations):
+        result[a] = []
+        for b, second in enumerate(permutations):
+            combined = compose(first, second)
+            if combined in singles:
+                continue
+            if b < a and combined == compose(second, first):
+                continue
+            result[a].append(b)
+    return result
@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import Tuple, List, Generic, TypeVar, Optional
+from functools import lru_cache
+from typing import Tuple, List, Generic, TypeVar, Optional, Dict, NamedTuple, Union
 
+from . import zobrist
 from .orientation import Color
 
 T = TypeVar("T")
@@ -15,9 +17,58 @@ class Component(Generic[T]):
         return f"Component({self.color}, {self.data})"
 
 
+def _make_slice(start: int, step: int, count: int) -> slice:
+    stop = start + step * count
+    return slice(start, stop if stop >= 0 else None, step)
+
+
+class SideLayout(NamedTuple):
+    """ Describes how the cells of a side seen with some rotation are stored in
+    a flat row-major list. The cell (i, j) is stored at index
+    `row_offsets[i] + column_offsets[j]`; indexing the ranges also validates
+    the coordinates. """
+    rows: int
+    columns: int
+    row_offsets: range
+    column_offsets: range
+
+    def row_slice(self, i: int) -> slice:
+        return _make_slice(self.row_offsets[i] + self.column_offsets[0], self.column_offsets.step, self.columns)
+
+    def column_slice(self, j: int) -> slice:
+        return _make_slice(self.row_offsets[0] + self.column_offsets[j], self.row_offsets.step, self.rows)
+
+
+@lru_cache(maxsize=None)
+def get_layouts(rows: int, columns: int) -> Tuple[SideLayout, ...]:
+    """ Returns layouts of a side stored as a `rows` x `columns` list for each
+    of the four rotations. """
+
+    def transform(rotation: int, i: int, j: int) -> int:
+        if rotation == 1:
+            i, j = j, columns - 1 - i
+        elif rotation == 2:
+            i, j = rows - 1 - i, columns - 1 - j
+        elif rotation == 3:
+            i, j = rows - 1 - j, i
+        return i * columns + j
+
+    result = []
+    for rotation in range(4):
+        view_rows, view_columns = (rows, columns) if rotation % 2 == 0 else (columns, rows)
+        origin = transform(rotation, 0, 0)
+        row_step = transform(rotation, 1, 0) - origin
+        column_step = transform(rotation, 0, 1) - origin
+        result.append(SideLayout(view_rows, view_columns,
+                                 range(origin, origin + row_step * view_rows, row_step),
+                                 range(0, column_step * view_columns, column_step)))
+    return tuple(result)
+
+
 class ICubeSide(ABC, Generic[T]):
     def __init__(self) -> None:
         self.colors = ColorsAccessor(self)
+        self._views: Dict[int, CubeSideView] = dict()
 
     @property
     @abstractmethod
@@ -37,8 +88,21 @@ class ICubeSide(ABC, Generic[T]):
     def __setitem__(self, key: Tuple[int, int], value: Component[T]) -> None:
         pass
 
+    def get_color(self, i: int, j: int) -> Color:
+        return self[i, j].color
+
+    def set_color(self, i: int, j: int, color: Color) -> None:
+        self[i, j].color = color
+
     def create_view(self, rotation: int) -> "CubeSideView":
-        return CubeSideView(self, rotation)
+        """ Returns a view of the side rotated clockwise. Views are created
+        once per rotation and reused. """
+        rotation %= 4
+        view = self._views.get(rotation)
+        if view is None:
+            view = CubeSideView(self, rotation)
+            self._views[rotation] = view
+        return view
 
     def rotate(self, amount: int) -> None:
         amount = amount % 4
@@ -101,65 +165,260 @@ class ColorsAccessor(Generic[T]):
                         for i in range(self.side.rows))
 
     def __getitem__(self, item: Tuple[int, int]) -> Color:
-        return self.side[item].color
+        i, j = item
+        return self.side.get_color(i, j)
 
     def __setitem__(self, key: Tuple[int, int], value: Color) -> None:
-        self.side[key].color = value
+        i, j = key
+        self.side.set_color(i, j, value)
 
 
 class CubeSideView(ICubeSide[T]):
-    def __init__(self, side: ICubeSide, rotation: int) -> None:
+    def __init__(self, side: "CubeSide", rotation: int) -> None:
         super().__init__()
-        self.side: ICubeSide = side
+        self.side: CubeSide = side
         self.rotation: int = rotation % 4
 
     @property
     def rows(self) -> int:
-        return self.side.rows if self.rotation % 2 == 0 else self.side.columns
+        return self.side.layouts[self.rotation].rows
 
     @property
     def columns(self) -> int:
-        return self.side.columns if self.rotation % 2 == 0 else self.side.rows
-
-    def _transform_coord(self, coords: Tuple[int, int]) -> Tuple[int, int]:
-        i, j = coords
-        if self.rotation == 1:
-            return j, self.side.columns - 1 - i
-        elif self.rotation == 2:
-            return self.side.rows - 1 - i, self.side.columns - 1 - j
-        elif self.rotation == 3:
-            return self.side.rows - 1 - j, i
-        else:
-            return i, j
+        return self.side.layouts[self.rotation].columns
+
+    def create_view(self, rotation: int) -> "CubeSideView":
+        return self.side.create_view(self.rotation + rotation)
+
+    def rotate(self, amount: int) -> None:
+        self.side.rotate(amount)
 
     def __getitem__(self, item: Tuple[int, int]) -> Component[T]:
-        i, j = self._transform_coord(item)
-        return self.side[i, j]
+        i, j = item
+        layout = self.side.layouts[self.rotation]
+        return self.side.cells[layout.row_offsets[i] + layout.column_offsets[j]]
 
     def __setitem__(self, key: Tuple[int, int], value: Component[T]) -> None:
-        i, j = self._transform_coord(key)
-        self.side[i, j] = value
+        i, j = key
+        layout = self.side.layouts[self.rotation]
+        self.side.store(layout.row_offsets[i] + layout.column_offsets[j], value)
+
+    def get_color(self, i: int, j: int) -> Color:
+        layout = self.side.layouts[self.rotation]
+        return self.side.get_color_at(layout.row_offsets[i] + layout.column_offsets[j])
+
+    def set_color(self, i: int, j: int, color: Color) -> None:
+        layout = self.side.layouts[self.rotation]
+        self.side.set_color_at(layout.row_offsets[i] + layout.column_offsets[j], color)
+
+    def get_row(self, i: int) -> List[Component[T]]:
+        return self.side.cells[self.side.layouts[self.rotation].row_slice(i)]
+
+    def get_column(self, j: int) -> List[Component[T]]:
+        return self.side.cells[self.side.layouts[self.rotation].column_slice(j)]
+
+    def set_row(self, i: int, values: List[Component[T]]) -> None:
+        self.side.store(self.side.layouts[self.rotation].row_slice(i), values)
+
+    def set_column(self, j: int, values: List[Component[T]]) -> None:
+        self.side.store(self.side.layouts[self.rotation].column_slice(j), values)
 
 
 class CubeSide(ICubeSide[T]):
-    def __init__(self, rows: int, columns: int, default: Color):
+    def __init__(self, rows: int, columns: int, default: Color, seed: int = 0):
         super().__init__()
         self.shape = (rows, columns)
-        self.items: List[List[Component[T]]] = [[Component[T](default, None) for _j in range(columns)]
-                                                for _i in range(rows)]
+        self.seed: int = seed
+        self._hash: Optional[int] = None
+        self._hash_table: Optional[List[int]] = None
+        # Incremented by every change of the side's colors
+        self.version: int = 0
+        self.cells: List[Component[T]] = self._create_cells(rows * columns, default)
+        self._storage_layouts: Tuple[SideLayout, ...] = get_layouts(rows, columns)
+        self._storage_rotation: int = 0
+        self.layouts: Tuple[SideLayout, ...] = self._storage_layouts
+        self._layout: SideLayout = self.layouts[0]
+
+    def _create_cells(self, count: int, default: Color) -> List[Component[T]]:
+        return [Component[T](default, None) for _ in range(count)]
+
+    def rotate(self, amount: int) -> None:
+        """ Rotates the side clockwise in constant time by changing the layout
+        of the stored cells instead of moving them. """
+        amount = amount % 4
+        if amount == 0:
+            return
+        if amount % 2 != 0 and self.rows != self.columns:
+            raise AttributeError("Cannot rotate a side: it would have different shape after rotation")
+        self._storage_rotation = (self._storage_rotation - amount) % 4
+        self.version += 1
+        self.layouts = tuple(self._storage_layouts[(self._storage_rotation + rotation) % 4]
+                             for rotation in range(4))
+        self._layout = self.layouts[0]
+
+    def normalize(self) -> None:
+        """ Moves the cells, so they are stored in the row-major order of
+        the side without any pending rotation. """
+        if self._storage_rotation == 0:
+            return
+        current_hash = None if self._hash is None else self.zobrist_hash
+        rows = [self.get_row(i) for i in range(self.rows)]
+        self.cells[0:len(self.cells)] = self._join_rows(rows)
+        self._hash = current_hash
+        self.shape = (self.rows, self.columns)
+        self._storage_layouts = get_layouts(*self.shape)
+        self._storage_rotation = 0
+        self.layouts = self._storage_layouts
+        self._layout = self.layouts[0]
+
+    @staticmethod
+    def _join_rows(rows: List[List[Component[T]]]) -> List[Component[T]]:
+        return [cell for row in rows for cell in row]
+
+    @property
+    def zobrist_hash(self) -> int:
+        """ Zobrist hash of the side's colors as they are seen without
+        rotation. It is computed on the first access and then updated by every
+        change of the side: writes toggle keys of the changed cells only and
+        rotations are constant-time (see `zobrist.get_key`). """
+        if self._hash is None:
+            self._hash_table = zobrist.get_table(self.seed, *self.shape)
+            self._hash = self._hash_cells(range(len(self.cells)), self.cells[0:len(self.cells)])
+        return zobrist.rotate_left(self._hash, -zobrist.QUARTER_SHIFT * self._storage_rotation)
+
+    def _key(self, index: int, color: Color) -> int:
+        if self._hash_table is not None:
+            return self._hash_table[index * 8 + color.value]
+        return zobrist.get_key(self.seed, self.shape[0], self.shape[1], index, color.value)
+
+    def _hash_cells(self, indices: range, values: Union[bytes, List[Component[T]]]) -> int:
+        if not isinstance(values, (bytes, bytearray, memoryview)):
+            values = [x.color.value for x in values]
+        result = 0
+        table = self._hash_table
+        if table is not None:
+            for index, code in zip(indices, values):
+                result ^= table[index * 8 + code]
+        else:
+            rows, columns = self.shape
+            for index, code in zip(indices, values):
+                result ^= zobrist.get_key(self.seed, rows, columns, index, code)
+        return result
+
+    def store(self, key: Union[int, slice], value: Union[Component[T], List[Component[T]]]) -> None:
+        """ Writes a cell or a slice of cells at the storage index. """
+        self.version += 1
+        if self._hash is None:
+            self.cells[key] = value
+        elif isinstance(key, slice):
+            indices = range(len(self.cells))[key]
+            previous = self.cells[key]
+            self.cells[key] = value
+            self._hash ^= self._hash_cells(indices, previous) ^ self._hash_cells(indices, value)
+        else:
+            previous = self.cells[key]
+            self.cells[key] = value
+            self._hash ^= self._key(key, previous.color) ^ self._key(key, value.color)
 
     def __getitem__(self, item: Tuple[int, int]) -> Component[T]:
         i, j = item
-        return self.items[i][j]
+        return self.cells[self._layout.row_offsets[i] + self._layout.column_offsets[j]]
 
     def __setitem__(self, key: Tuple[int, int], value: Component[T]) -> None:
         i, j = key
-        self.items[i][j] = value
+        self.store(self._layout.row_offsets[i] + self._layout.column_offsets[j], value)
+
+    def get_color(self, i: int, j: int) -> Color:
+        return self.get_color_at(self._layout.row_offsets[i] + self._layout.column_offsets[j])
+
+    def set_color(self, i: int, j: int, color: Color) -> None:
+        self.set_color_at(self._layout.row_offsets[i] + self._layout.column_offsets[j], color)
+
+    def get_color_at(self, index: int) -> Color:
+        return self.cells[index].color
+
+    def set_color_at(self, index: int, color: Color) -> None:
+        self._toggle_color(index, color)
+        self.cells[index].color = color
+
+    def _toggle_color(self, index: int, color: Color) -> None:
+        self.version += 1
+        if self._hash is not None:
+            self._hash ^= self._key(index, self.get_color_at(index)) ^ self._key(index, color)
+
+    def get_row(self, i: int) -> List[Component[T]]:
+        return self.cells[self._layout.row_slice(i)]
+
+    def get_column(self, j: int) -> List[Component[T]]:
+        return self.cells[self._layout.column_slice(j)]
+
+    def set_row(self, i: int, values: List[Component[T]]) -> None:
+        self.store(self._layout.row_slice(i), values)
+
+    def set_column(self, j: int, values: List[Component[T]]) -> None:
+        self.store(self._layout.column_slice(j), values)
 
     @property
     def rows(self) -> int:
-        return self.shape[0]
+        return self._layout.rows
 
     @property
     def columns(self) -> int:
-        return self.shape[1]
+        return self._layout.columns
+
+
+COLORS_BY_CODE: List[Optional[Color]] = [None] * (max(x.value for x in Color) + 1)
+for _color in Color:
+    COLORS_BY_CODE[_color.value] = _color
+
+
+class PackedCells:
+    """ Stores colors of the cells as one byte per cell. Rows and columns are
+    read as `bytes` and single cells as detached components. """
+
+    def __init__(self, buffer: memoryview):
+        self.buffer: memoryview = buffer
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    def __getitem__(self, item: Union[int, slice]) -> Union[Component, bytes]:
+        if isinstance(item, slice):
+            return bytes(self.buffer[item])
+        return Component(COLORS_BY_CODE[self.buffer[item]], None)
+
+    def __setitem__(self, key: Union[int, slice], value: Union[Component, bytes, List[Component]]) -> None:
+        if isinstance(key, slice):
+            if not isinstance(value, (bytes, bytearray, memoryview)):
+                value = bytes(x.color.value for x in value)
+            self.buffer[key] = value
+        else:
+            self.buffer[key] = value.color.value
+
+
+class PackedCubeSide(CubeSide[None]):
+    """ Side which keeps only colors of its cells in a part of a shared byte
+    buffer. Such sides cannot store any data associated with the cells. The
+    buffer is filled with the default color unless `initialize` is false. """
+
+    def __init__(self, rows: int, columns: int, default: Color, buffer: memoryview, seed: int = 0,
+                 initialize: bool = True):
+        self._buffer = buffer
+        self._initialize = initialize
+        super().__init__(rows, columns, default, seed)
+
+    def _create_cells(self, count: int, default: Color) -> PackedCells:
+        if self._initialize:
+            self._buffer[:] = bytes([default.value]) * count
+        return PackedCells(self._buffer)
+
+    @staticmethod
+    def _join_rows(rows: List[bytes]) -> bytes:
+        return b"".join(rows)
+
+    def get_color_at(self, index: int) -> Color:
+        return COLORS_BY_CODE[self._buffer[index]]
+
+    def set_color_at(self, index: int, color: Color) -> None:
+        self._toggle_color(index, color)
+        self._buffer[index] = color.value
@@ -0,0 +1,129 @@
+import os
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple, Sequence, Iterator
+
+from ..actions import Turn
+from ..cube import Cube, STATE_HEADER, STATE_MAGIC, STATE_VERSION
+from ..cubie import CubieModel, CubieCube, get_model, Coordinates
+from ..orientation import Orientation, Side
+from ..symmetry import canonicalize
+
+Rotation = Tuple[List[int], List[int]]
+SOLUTIONS_CACHED = 1024
+
+
+def get_cache_path(name: str) -> str:
+    """ Returns the path of a file or a directory in the user's cache
+    directory where the solvers keep their tables. """
+    cache = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(cache, "cubelang", name)
+
+
+class CubieSolver(ABC):
+    """ Base class for solvers working with coordinates of a `CubieModel`.
+
+    Solvers search in a fixed frame: the state is first rotated as a whole,
+    so that it satisfies `is_normalized`, and the moves found in this frame
+    are converted back to face turns of the actual cube performed with the
+    caller's orientation. Solutions found by `solve_canonical` are kept by
+    the canonical state of the cube under rotations and reflections that
+    keep the color scheme (see `symmetry.canonicalize`), so symmetric states
+    share an entry. """
+
+    def __init__(self, size: int):
+        self.model: CubieModel = get_model(size)
+        turns = list(self._iterate_face_turns(Orientation()))
+        effects = {self.get_effect([move]): move for move in range(len(self.model.tables))}
+        self.face_moves: List[Tuple[int, Side, int]] = [
+            (effects[effect], side, amount) for side, amount, _, effect in turns]
+        self.rotations: List[Rotation] = self._find_rotations()
+        self._turns: Dict[Orientation, Dict[Tuple[int, ...], Turn]] = dict()
+        self.solutions: OrderedDict = OrderedDict()
+
+    def _iterate_face_turns(self, orientation: Orientation) -> Iterator[Tuple[Side, int, Turn, Tuple[int, ...]]]:
+        """ Yields quarter and half turns of every face performed with the
+        orientation together with the coordinates they produce on a solved
+        cube. """
+        for side in Side:
+            for amount in range(1, 4):
+                turn = Turn(side, [1], amount)
+                cube = CubieCube(self.model.shape)
+                turn.perform(cube, orientation)
+                yield side, amount, turn, tuple(cube.coordinates)
+
+    def get_effect(self, moves: Sequence[int]) -> Tuple[int, ...]:
+        """ Returns coordinates of the solved cube after the moves. """
+        coordinates = list(self.model.solved)
+        for move in moves:
+            self.model.apply(coordinates, move)
+        return tuple(coordinates)
+
+    def _find_rotations(self) -> List[Rotation]:
+        """ Returns sequences of moves performing each of 24 rotations of the
+        whole cube together with the sequences of inverse rotations. """
+        size = self.model.shape[0]
+        generators = []
+        for axis in [Orientation(), Orientation().rotate_counterclockwise(), Orientation().to_right]:
+            generators.append((self.model.get_move(axis, 1, 1, size), self.model.get_move(axis, 1, 3, size)))
+
+        result = [([], [])]
+        seen = {tuple(self.model.solved)}
+        for moves, inverse in result:
+            for move, inverse_move in generators:
+                coordinates = self.get_effect(moves + [move])
+                if coordinates not in seen:
+                    seen.add(coordinates)
+                    result.append((moves + [move], [inverse_move] + inverse))
+        return result
+
+    @abstractmethod
+    def is_normalized(self, state: List[List[Tuple[int, int]]]) -> bool:
+        """ Checks whether the decoded state is in the solver's frame. """
+        pass
+
+    def normalize(self, cube: Cube) -> Tuple[List[List[Tuple[int, int]]], Rotation]:
+        """ Rotates the cube's state, so it satisfies `is_normalized`. Returns
+        the decoded state and the rotation. Raises `ValueError` if the cube's
+        colors do not form a valid set of pieces. """
+        if cube.shape != self.model.shape:
+            raise ValueError(f"Only cubes of shape {self.model.shape} can be solved")
+        coordinates: Coordinates = list(cube.coordinates) if isinstance(cube, CubieCube) \
+            else self.model.read_facelets(cube.sides)
+        for rotation in self.rotations:
+            rotated = list(coordinates)
+            for move in rotation[0]:
+                self.model.apply(rotated, move)
+            state = self.model.decode(rotated)
+            if self.is_normalized(state):
+                return state, rotation
+        raise ValueError("The cube cannot be solved")
+
+    def get_turns(self, moves: Sequence[int], rotation: Rotation, orientation: Orientation) -> List[Turn]:
+        """ Converts moves performed on the rotated cube to face turns of the
+        actual cube performed with the orientation. """
+        turns = self._turns.get(orientation)
+        if turns is None:
+            turns = {effect: turn for _, _, turn, effect in self._iterate_face_turns(orientation)}
+            self._turns[orientation] = turns
+        # The same move of the actual cube is the rotation, the move and the
+        # inverse rotation.
+        return [turns[self.get_effect(rotation[0] + [move] + rotation[1])] for move in moves]
+
+    def solve_canonical(self, cube: Cube, orientation: Orientation, solve: Callable[[Cube], List[Turn]],
+                        *options: Any) -> List[Turn]:
+        """ Solves the canonical representative of the cube's state with
+        `solve`, which returns turns performed with the default orientation,
+        and maps the turns back to the cube performed with the orientation.
+        Solutions are cached by the representative and the options. """
+        state, symmetry = canonicalize(cube, mirror=True, scheme=True)
+        key = (state, options)
+        turns = self.solutions.get(key)
+        if turns is None:
+            turns = solve(Cube.from_bytes(STATE_HEADER.pack(STATE_MAGIC, STATE_VERSION, *cube.shape) + state))
+            self.solutions[key] = turns
+            if len(self.solutions) > SOLUTIONS_CACHED:
+                self.solutions.popitem(last=False)
+        else:
+            self.solutions.move_to_end(key)
+        return [turn.from_orientation(Orientation(), orientation) for turn in symmetry.transform_turns(turns)]
@@ -0,0 +1,226 @@
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+from functools import lru_cache
+from multiprocessing import Pool
+from typing import List, Tuple, Optional, Sequence
+
+from .base import CubieSolver, get_cache_path
+from ..actions import Turn
+from ..cube import Cube
+from ..cubie import get_arrangements
+from ..orientation import Orientation
+
+REFERENCE_SLOT = 7
+PERMUTATIONS = 5040
+ORIENTATIONS = 729
+STATES_COUNT = PERMUTATIONS * ORIENTATIONS
+UNKNOWN = 0xFF
+TABLE_NAME = "pocket_cube.dist"
+TABLE_VERSION = 1
+# Written after the distances: magic, version, number of states and SHA-256
+# of the distances
+TABLE_FOOTER = struct.Struct("<4sII32s")
+TABLE_MAGIC = b"CLPD"
+
+ReducedMoves = List[Tuple[List[int], List[int]]]
+
+
+class PocketCubeSolver(CubieSolver):
+    """ Finds optimal (in the half turn metric) solutions for 2x2x2 cubes.
+
+    The corner in `REFERENCE_SLOT` is kept in place: every state is rotated
+    as a whole so that this corner is solved, and only the faces that do not
+    contain it are turned. The remaining 3,674,160 states are indexed by the
+    permutation of the other seven corners and the orientations of six of
+    them. A file with the distance to the solved state of every index is
+    generated on the first use and memory-mapped afterwards; it is generated
+    again if its footer or checksum does not match. A solver may be reused to
+    solve any number of cubes. """
+
+    def __init__(self, path: Optional[str] = None, processes: Optional[int] = None):
+        super().__init__(2)
+        self.moves: List[int] = [move for move, _, _ in self.face_moves if self._keeps_reference(move)]
+        self.reduced_moves = [self._build_reduced_tables(move) for move in self.moves]
+
+        self.path: str = path or get_cache_path(TABLE_NAME)
+        table = load_table(self.path)
+        if table is None:
+            generate_table(self.path, self.reduced_moves, processes)
+            table = load_table(self.path)
+            if table is None:
+                raise ValueError(f"Cannot load the distance table from {self.path}")
+        self.table: mmap.mmap = table
+
+    def _keeps_reference(self, move: int) -> bool:
+        slot_map, shifts = self.model.kinds[0].map_slots(self.model.destinations[move])
+        return slot_map[REFERENCE_SLOT] == REFERENCE_SLOT and shifts[REFERENCE_SLOT] == 0
+
+    def _build_reduced_tables(self, move: int) -> Tuple[List[int], List[int]]:
+        slot_map, shifts = self.model.kinds[0].map_slots(self.model.destinations[move])
+        slots = [slot for slot in range(8) if slot != REFERENCE_SLOT]
+        targets = [slots.index(slot_map[slot]) for slot in slots]
+
+        arrangements, ranks = get_arrangements(7, 7)
+        permutations = []
+        for arrangement in arrangements:
+            result = [0] * 7
+            for k, piece in enumerate(arrangement):
+                result[targets[k]] = piece
+            permutations.append(ranks[tuple(result)])
+
+        orientations = []
+        for index in range(ORIENTATIONS):
+            twists = decode_twists(index)
+            result = [0] * 7
+            for k, twist in enumerate(twists):
+                result[targets[k]] = (twist + shifts[slots[k]]) % 3
+            orientations.append(encode_twists(result))
+        return permutations, orientations
+
+    def get_index(self, state: List[List[Tuple[int, int]]]) -> int:
+        """ Returns the index of the state with the reference corner solved. """
+        corners = state[0]
+        slots = [slot for slot in range(8) if slot != REFERENCE_SLOT]
+        pieces = tuple(slots.index(corners[slot][0]) for slot in slots)
+        twists = [corners[slot][1] for slot in slots]
+        if sum(twists) % 3 != 0:
+            raise ValueError("The cube cannot be solved")
+        return get_arrangements(7, 7)[1][pieces] * ORIENTATIONS + encode_twists(twists)
+
+    def is_normalized(self, state: List[List[Tuple[int, int]]]) -> bool:
+        return state[0][REFERENCE_SLOT] == (REFERENCE_SLOT, 0)
+
+    def solve(self, cube: Cube, orientation: Orientation = Orientation()) -> List[Turn]:
+        """ Returns the shortest sequence of turns (relative to the orientation)
+        that solves the cube. Raises `ValueError` if the cube cannot be
+        solved. """
+        return self.solve_canonical(cube, orientation, self._solve)
+
+    def _solve(self, cube: Cube) -> List[Turn]:
+        state, rotation = self.normalize(cube)
+        index = self.get_index(state)
+        distance = self.table[index]
+        path = []
+        while distance > 0:
+            permutation, twists = divmod(index, ORIENTATIONS)
+            for move, (permutations, orientations) in zip(self.moves, self.reduced_moves):
+                following = permutations[permutation] * ORIENTATIONS + orientations[twists]
+                if self.table[following] == distance - 1:
+                    path.append(move)
+                    index, distance = following, distance - 1
+                    break
+            else:
+                raise ValueError("The distance table is corrupted")
+        return self.get_turns(path, rotation, Orientation())
+
+
+def encode_twists(twists: Sequence[int]) -> int:
+    """ Encodes orientations of the first six of seven corners. """
+    value = 0
+    for twist in reversed(twists[:6]):
+        value = value * 3 + twist
+    return value
+
+
+def decode_twists(value: int) -> List[int]:
+    twists = []
+    for _ in range(6):
+        value, twist = divmod(value, 3)
+        twists.append(twist)
+    twists.append(-sum(twists) % 3)
+    return twists
+
+
+_worker_table: Optional[mmap.mmap] = None
+_worker_moves: ReducedMoves = []
+
+
+def _init_worker(path: str, moves: ReducedMoves) -> None:
+    global _worker_table, _worker_moves
+    with open(path, "rb") as file:
+        _worker_table = mmap.mmap(file.fileno(), STATES_COUNT, access=mmap.ACCESS_READ)
+    _worker_moves = moves
+
+
+def _expand(frontier: array) -> array:
+    """ Returns unvisited neighbours of the states, possibly repeated. """
+    table, result = _worker_table, array("I")
+    for index in frontier:
+        permutation, twists = divmod(index, ORIENTATIONS)
+        for permutations, orientations in _worker_moves:
+            following = permutations[permutation] * ORIENTATIONS + orientations[twists]
+            if table[following] == UNKNOWN:
+                result.append(following)
+    return result
+
+
+def load_table(path: str) -> Optional[mmap.mmap]:
+    """ Maps the distances stored in the file. Returns None if the file is
+    missing or its footer or checksum does not match. """
+    try:
+        if os.path.getsize(path) != STATES_COUNT + TABLE_FOOTER.size:
+            return None
+        with open(path, "rb") as file:
+            table = mmap.mmap(file.fileno(), STATES_COUNT, access=mmap.ACCESS_READ)
+            file.seek(STATES_COUNT)
+            footer = TABLE_FOOTER.unpack(file.read(TABLE_FOOTER.size))
+    except (OSError, ValueError, struct.error):
+        return None
+    if footer != (TABLE_MAGIC, TABLE_VERSION, STATES_COUNT, hashlib.sha256(table).digest()):
+        table.close()
+        return None
+    return table
+
+
+def generate_table(path: str, moves: ReducedMoves, processes: Optional[int] = None) -> None:
+    """ Computes distances of all states with a breadth-first search. Every
+    level is split between the worker processes, which read the states found
+    so far from the memory-mapped file. The file ends with `TABLE_FOOTER` and
+    is replaced atomically. """
+    processes = processes or os.cpu_count() or 1
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w+b") as file:
+        file.truncate(STATES_COUNT)
+        table = mmap.mmap(file.fileno(), STATES_COUNT)
+    table[:] = bytes([UNKNOWN]) * STATES_COUNT
+    solved = 0
+    table[solved] = 0
+
+    pool = Pool(processes, _init_worker, (temp_path, moves)) if processes > 1 else None
+    if pool is None:
+        _init_worker(temp_path, moves)
+    try:
+        frontier, depth = array("I", [solved]), 0
+        while len(frontier) > 0:
+            if pool is None:
+                results = [_expand(frontier)]
+            else:
+                size = len(frontier) // (processes * 4) + 1
+                results = pool.map(_expand, [frontier[i:i + size] for i in range(0, len(frontier), size)])
+            depth += 1
+            frontier = array("I")
+            for result in results:
+                for index in result:
+                    if table[index] == UNKNOWN:
+                        table[index] = depth
+                        frontier.append(index)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    table.flush()
+    checksum = hashlib.sha256(table).digest()
+    table.close()
+    with open(temp_path, "ab") as file:
+        file.write(TABLE_FOOTER.pack(TABLE_MAGIC, TABLE_VERSION, STATES_COUNT, checksum))
+    os.replace(temp_path, path)
+
+
+@lru_cache(maxsize=None)
+def get_solver() -> PocketCubeSolver:
+    """ Returns a shared solver using the table in the default location. """
+    return PocketCubeSolver()
@@ -0,0 +1,449 @@
+import hashlib
+import json
+import mmap
+import os
+from array import array
+from functools import lru_cache
+from itertools import combinations
+from multiprocessing import Pool
+from typing import List, Tuple, Dict, Optional, Sequence, Union
+
+from .base import CubieSolver, get_cache_path
+from ..actions import Turn
+from ..cube import Cube
+from ..cubie import get_arrangements
+from ..orientation import Orientation, Side
+
+TABLES_VERSION = 1
+TABLES_DIRECTORY = "two_phase"
+MANIFEST_NAME = "manifest.json"
+MAX_LENGTH = 24
+EXTRA_DEPTHS = 1
+
+TWISTS = 3 ** 7
+FLIPS = 2 ** 11
+SLICES = 495
+SLICE_PERMUTATIONS = 24
+PERMUTATIONS = 40320
+MOVES_COUNT = 18
+UNKNOWN = 0xFF
+
+SLICE_COMBINATIONS = list(combinations(range(12), 4))
+SLICE_RANKS = {value: index for index, value in enumerate(SLICE_COMBINATIONS)}
+SOLVED_SLICE = SLICE_RANKS[(8, 9, 10, 11)]
+
+# Slot mapping and orientation changes of corners and edges for each move.
+CubieMove = Tuple[List[int], List[int], List[int], List[int]]
+
+
+def encode_twist(co: Sequence[int]) -> int:
+    value = 0
+    for twist in reversed(co[:7]):
+        value = value * 3 + twist
+    return value
+
+
+def decode_twist(value: int) -> List[int]:
+    co = []
+    for _ in range(7):
+        value, twist = divmod(value, 3)
+        co.append(twist)
+    co.append(-sum(co) % 3)
+    return co
+
+
+def encode_flip(eo: Sequence[int]) -> int:
+    value = 0
+    for flip in reversed(eo[:11]):
+        value = value * 2 + flip
+    return value
+
+
+def decode_flip(value: int) -> List[int]:
+    eo = []
+    for _ in range(11):
+        value, flip = divmod(value, 2)
+        eo.append(flip)
+    eo.append(sum(eo) % 2)
+    return eo
+
+
+def encode_slice(ep: Sequence[int]) -> int:
+    """ Encodes positions and the order of the slice edges (8 to 11). The
+    positions alone are `encode_slice(ep) // SLICE_PERMUTATIONS`. """
+    positions = tuple(slot for slot, piece in enumerate(ep) if piece >= 8)
+    order = tuple(ep[slot] - 8 for slot in positions)
+    return SLICE_RANKS[positions] * SLICE_PERMUTATIONS + get_arrangements(4, 4)[1][order]
+
+
+def decode_slice(value: int) -> List[int]:
+    positions, order = divmod(value, SLICE_PERMUTATIONS)
+    ep = [-1] * 12
+    for slot, piece in zip(SLICE_COMBINATIONS[positions], get_arrangements(4, 4)[0][order]):
+        ep[slot] = piece + 8
+    return ep
+
+
+def _apply(values: Sequence[int], slot_map: Sequence[int]) -> List[int]:
+    result = [0] * len(values)
+    for slot, value in enumerate(values):
+        result[slot_map[slot]] = value
+    return result
+
+
+def _build_move_table(name: str, moves: List[CubieMove]) -> array:
+    table = array("H")
+    if name == "twist":
+        for value in range(TWISTS):
+            co = decode_twist(value)
+            for slot_map, deltas, _, _ in moves:
+                table.append(encode_twist(_apply([(t + d) % 3 for t, d in zip(co, deltas)], slot_map)))
+    elif name == "flip":
+        for value in range(FLIPS):
+            eo = decode_flip(value)
+            for _, _, slot_map, deltas in moves:
+                table.append(encode_flip(_apply([(f + d) % 2 for f, d in zip(eo, deltas)], slot_map)))
+    elif name == "slice":
+        for value in range(SLICES * SLICE_PERMUTATIONS):
+            ep = decode_slice(value)
+            for _, _, slot_map, _ in moves:
+                table.append(encode_slice(_apply(ep, slot_map)))
+    elif name == "corners":
+        arrangements, ranks = get_arrangements(8, 8)
+        for cp in arrangements:
+            for slot_map, _, _, _ in moves:
+                table.append(ranks[tuple(_apply(cp, slot_map))])
+    elif name == "edges":
+        arrangements, ranks = get_arrangements(8, 8)
+        for ep in arrangements:
+            for _, _, slot_map, _ in moves:
+                table.append(ranks[tuple(_apply(list(ep) + [8, 9, 10, 11], slot_map)[:8])])
+    return table
+
+
+def _build_pruning_table(name: str, first: array, second: array, moves_count: int) -> bytes:
+    """ Computes the distances to the goal of all pairs of coordinates with a
+    breadth-first search. The second coordinate of the phase 1 tables is the
+    slice coordinate, whose positions part is used. """
+    if name.startswith("phase1"):
+        size = SLICES
+        second_moves = [second[value * SLICE_PERMUTATIONS * moves_count + m] // SLICE_PERMUTATIONS
+                        for value in range(SLICES) for m in range(moves_count)]
+        goal = SOLVED_SLICE
+    else:
+        size = SLICE_PERMUTATIONS
+        second_moves = second
+        goal = 0
+    count = len(first) // moves_count * size
+    table = bytearray([UNKNOWN]) * count
+    table[goal] = 0
+    frontier, depth = [goal], 0
+    while len(frontier) > 0:
+        depth += 1
+        following = []
+        for index in frontier:
+            a, b = divmod(index, size)
+            a, b = a * moves_count, b * moves_count
+            for m in range(moves_count):
+                neighbour = first[a + m] * size + second_moves[b + m]
+                if table[neighbour] == UNKNOWN:
+                    table[neighbour] = depth
+                    following.append(neighbour)
+        frontier = following
+    return bytes(table)
+
+
+def _generate(task: Tuple) -> Tuple[str, bytes]:
+    if task[0] == "move":
+        _, name, moves = task
+        return name, _build_move_table(name, moves).tobytes()
+    _, name, first, second, moves_count = task
+    return name, _build_pruning_table(name, array("H", first), array("H", second), moves_count)
+
+
+MOVE_TABLES = ["twist", "flip", "slice", "corners", "edges"]
+PRUNING_TABLES = {
+    "phase1_twist": ("twist", "slice"),
+    "phase1_flip": ("flip", "slice"),
+    "phase2_corners": ("corners", "slice_permutation"),
+    "phase2_edges": ("edges", "slice_permutation")
+}
+PHASE2_TABLES = {"corners", "edges", "slice_permutation"}
+
+
+def generate_tables(directory: str, moves: List[CubieMove], phase2_moves: List[CubieMove],
+                    processes: Optional[int] = None) -> None:
+    """ Builds move and pruning tables, writes them to the directory and saves
+    their SHA-256 checksums to the manifest. Independent tables are built by
+    separate worker processes. """
+    processes = processes or os.cpu_count() or 1
+    pool = Pool(processes) if processes > 1 else None
+    run = pool.map if pool is not None else lambda f, tasks: list(map(f, tasks))
+    try:
+        tasks = [("move", name, phase2_moves if name in PHASE2_TABLES else moves) for name in MOVE_TABLES]
+        tables: Dict[str, bytes] = dict(run(_generate, tasks))
+        tables["slice_permutation"] = _build_slice_permutation_table(phase2_moves).tobytes()
+
+        tasks = []
+        for name, (first, second) in PRUNING_TABLES.items():
+            moves_count = len(phase2_moves) if name.startswith("phase2") else len(moves)
+            tasks.append(("pruning", name, tables[first], tables[second], moves_count))
+        tables.update(run(_generate, tasks))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    os.makedirs(directory, exist_ok=True)
+    checksums = dict()
+    for name, content in tables.items():
+        temp_path = os.path.join(directory, f"{name}.{os.getpid()}.tmp")
+        with open(temp_path, "wb") as file:
+            file.write(content)
+        os.replace(temp_path, os.path.join(directory, name))
+        checksums[name] = hashlib.sha256(content).hexdigest()
+    manifest = {"version": TABLES_VERSION, "tables": checksums}
+    temp_path = os.path.join(directory, f"{MANIFEST_NAME}.{os.getpid()}.tmp")
+    with open(temp_path, "w") as file:
+        json.dump(manifest, file)
+    os.replace(temp_path, os.path.join(directory, MANIFEST_NAME))
+
+
+def _build_slice_permutation_table(moves: List[CubieMove]) -> array:
+    arrangements, ranks = get_arrangements(4, 4)
+    table = array("H")
+    for order in arrangements:
+        ep = list(range(8)) + [piece + 8 for piece in order]
+        for _, _, slot_map, _ in moves:
+            table.append(ranks[tuple(x - 8 for x in _apply(ep, slot_map)[8:])])
+    return table
+
+
+class TwoPhaseSolver(CubieSolver):
+    """ Finds short solutions for 3x3x3 cubes with Kociemba's two-phase
+    algorithm.
+
+    Phase 1 brings the cube into the subgroup generated by U, D, R2, L2, F2
+    and B2: all corners and edges are oriented and the edges of the middle
+    horizontal slice are in that slice. Phase 2 solves the cube using only
+    these moves. Both phases are iterative deepening searches over small
+    coordinates with move tables and pruning tables. The tables are generated
+    once, stored in a directory with their checksums, and memory-mapped when
+    the first cube is solved. """
+
+    def __init__(self, directory: Optional[str] = None, processes: Optional[int] = None):
+        super().__init__(3)
+        self.directory: str = directory or get_cache_path(TABLES_DIRECTORY)
+        self.processes: Optional[int] = processes
+        corners, edges = self.model.kinds[0], self.model.kinds[1]
+
+        def reference(slot: Tuple[int, ...], sides: Tuple[Side, ...]) -> Optional[int]:
+            return next((k for k, f in enumerate(slot) if self.model.positions[f][0] in sides), None)
+
+        vertical = (Side.TOP, Side.BOTTOM)
+        self.corner_references: List[int] = [reference(slot, vertical) for slot in corners.slots]
+        self.edge_references: List[int] = []
+        for slot in edges.slots:
+            index = reference(slot, vertical)
+            self.edge_references.append(index if index is not None else reference(slot, (Side.FRONT, Side.BACK)))
+        # Edges of the top and bottom layers are numbered first, edges of the
+        # middle slice take numbers 8 to 11.
+        self.edge_slots: List[int] = sorted(range(len(edges.slots)),
+                                            key=lambda s: self.model.positions[edges.slots[s][0]][0] not in vertical
+                                            and self.model.positions[edges.slots[s][1]][0] not in vertical)
+        self.edge_numbers: Dict[int, int] = {slot: number for number, slot in enumerate(self.edge_slots)}
+
+        self.moves: List[CubieMove] = [self._get_cubie_move(move) for move, _, _ in self.face_moves]
+        self.faces: List[int] = [list(Side).index(side) for _, side, _ in self.face_moves]
+        self.phase2_moves: List[int] = [k for k, (_, side, amount) in enumerate(self.face_moves)
+                                        if side in vertical or amount == 2]
+        self._tables: Optional[Dict[str, Union[memoryview, mmap.mmap]]] = None
+
+    def _get_cubie_move(self, move: int) -> CubieMove:
+        destinations = self.model.destinations[move]
+        corners, edges = self.model.kinds[0], self.model.kinds[1]
+        corner_map, corner_shifts = corners.map_slots(destinations)
+        corner_deltas = [(self.corner_references[s] + corner_shifts[s] - self.corner_references[corner_map[s]]) % 3
+                         for s in range(8)]
+        edge_map, edge_shifts = edges.map_slots(destinations)
+        edge_targets, edge_deltas = [], []
+        for slot in self.edge_slots:
+            target = edge_map[slot]
+            edge_targets.append(self.edge_numbers[target])
+            edge_deltas.append((self.edge_references[slot] + edge_shifts[slot] - self.edge_references[target]) % 2)
+        return corner_map, corner_deltas, edge_targets, edge_deltas
+
+    @property
+    def tables(self) -> Dict[str, Union[memoryview, mmap.mmap]]:
+        """ Move and pruning tables. They are generated if they are missing or
+        their checksums do not match the manifest. """
+        if self._tables is None:
+            self._tables = self._load_tables()
+            if self._tables is None:
+                generate_tables(self.directory, self.moves, [self.moves[k] for k in self.phase2_moves],
+                                self.processes)
+                self._tables = self._load_tables()
+                if self._tables is None:
+                    raise ValueError(f"Cannot load two-phase tables from {self.directory}")
+        return self._tables
+
+    def _load_tables(self) -> Optional[Dict[str, Union[memoryview, mmap.mmap]]]:
+        try:
+            with open(os.path.join(self.directory, MANIFEST_NAME)) as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("version") != TABLES_VERSION:
+            return None
+
+        result = dict()
+        for name, checksum in manifest["tables"].items():
+            try:
+                with open(os.path.join(self.directory, name), "rb") as file:
+                    content = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                return None
+            if hashlib.sha256(content).hexdigest() != checksum:
+                return None
+            result[name] = content if name in PRUNING_TABLES else memoryview(content).cast("H")
+        return result
+
+    def is_normalized(self, state: List[List[Tuple[int, int]]]) -> bool:
+        return all(piece == slot for slot, (piece, _) in enumerate(state[2]))
+
+    def get_cubies(self, state: List[List[Tuple[int, int]]]) -> Tuple[List[int], List[int], List[int], List[int]]:
+        """ Converts the normalized state to permutations and orientations of
+        corners and edges. Raises `ValueError` if the cube cannot be solved. """
+        cp = [piece for piece, _ in state[0]]
+        co = [(self.corner_references[piece] + twist - self.corner_references[slot]) % 3
+              for slot, (piece, twist) in enumerate(state[0])]
+        ep, eo = [], []
+        for slot in self.edge_slots:
+            piece, twist = state[1][slot]
+            ep.append(self.edge_numbers[piece])
+            eo.append((self.edge_references[piece] + twist - self.edge_references[slot]) % 2)
+        if sum(co) % 3 != 0 or sum(eo) % 2 != 0 or _parity(cp) != _parity(ep):
+            raise ValueError("The cube cannot be solved")
+        return cp, co, ep, eo
+
+    def solve(self, cube: Cube, orientation: Orientation = Orientation(),
+              max_length: int = MAX_LENGTH) -> List[Turn]:
+        """ Returns a sequence of at most `max_length` turns (relative to the
+        orientation) that solves the cube. Raises `ValueError` if the cube
+        cannot be solved or if no such sequence is found. """
+        return self.solve_canonical(cube, orientation, lambda image: self._solve(image, max_length), max_length)
+
+    def _solve(self, cube: Cube, max_length: int) -> List[Turn]:
+        state, rotation = self.normalize(cube)
+        cp, co, ep, eo = self.get_cubies(state)
+        moves = self._search(cp, co, ep, eo, max_length)
+        if moves is None:
+            raise ValueError(f"Cannot find a solution shorter than {max_length + 1} turns")
+        return self.get_turns([self.face_moves[k][0] for k in moves], rotation, Orientation())
+
+    def _search(self, cp: List[int], co: List[int], ep: List[int], eo: List[int],
+                max_length: int) -> Optional[List[int]]:
+        tables = self.tables
+        twist_moves, flip_moves, slice_moves = tables["twist"], tables["flip"], tables["slice"]
+        twist_pruning, flip_pruning = tables["phase1_twist"], tables["phase1_flip"]
+        faces, phase2_moves = self.faces, set(self.phase2_moves)
+        path: List[int] = []
+        best: List[Optional[List[int]]] = [None]
+
+        def phase1(twist: int, flip: int, slice_value: int, depth: int) -> None:
+            if depth == 0:
+                if len(path) > 0 and path[-1] in phase2_moves:
+                    return
+                limit = len(best[0]) - 1 if best[0] is not None else max_length
+                solution = self._phase2(cp, ep, path, limit - len(path))
+                if solution is not None:
+                    best[0] = solution
+                return
+            previous = faces[path[-1]] if len(path) > 0 else -1
+            for m in range(MOVES_COUNT):
+                face = faces[m]
+                if face == previous or (face // 2 == previous // 2 and face < previous):
+                    continue
+                new_twist = twist_moves[twist * MOVES_COUNT + m]
+                new_flip = flip_moves[flip * MOVES_COUNT + m]
+                new_slice = slice_moves[slice_value * MOVES_COUNT + m]
+                positions = new_slice // SLICE_PERMUTATIONS
+                distance = max(twist_pruning[new_twist * SLICES + positions],
+                               flip_pruning[new_flip * SLICES + positions])
+                if distance >= depth:
+                    continue
+                path.append(m)
+                phase1(new_twist, new_flip, new_slice, depth - 1)
+                path.pop()
+
+        # After the first solution is found, a few longer phase 1 sequences
+        # are tried as well, since they may lead to a shorter phase 2.
+        twist, flip, slice_value = encode_twist(co), encode_flip(eo), encode_slice(ep)
+        positions = slice_value // SLICE_PERMUTATIONS
+        depth = max(twist_pruning[twist * SLICES + positions], flip_pruning[flip * SLICES + positions])
+        last_depth = max_length
+        while depth <= last_depth and (best[0] is None or depth < len(best[0])):
+            phase1(twist, flip, slice_value, depth)
+            if best[0] is not None:
+                last_depth = min(last_depth, depth + EXTRA_DEPTHS)
+            depth += 1
+        return best[0]
+
+    def _phase2(self, cp: List[int], ep: List[int], phase1: List[int], max_length: int) -> Optional[List[int]]:
+        for m in phase1:
+            corner_map, _, edge_map, _ = self.moves[m]
+            cp, ep = _apply(cp, corner_map), _apply(ep, edge_map)
+
+        tables = self.tables
+        corner_moves, edge_moves = tables["corners"], tables["edges"]
+        slice_moves = tables["slice_permutation"]
+        corner_pruning, edge_pruning = tables["phase2_corners"], tables["phase2_edges"]
+        moves, faces = self.phase2_moves, self.faces
+        count = len(moves)
+        path: List[int] = []
+
+        def search(corners: int, edges: int, slice_value: int, depth: int) -> bool:
+            if depth == 0:
+                return corners == 0 and edges == 0 and slice_value == 0
+            previous = faces[path[-1]] if len(path) > 0 else faces[phase1[-1]] if len(phase1) > 0 else -1
+            for j, m in enumerate(moves):
+                face = faces[m]
+                if face == previous or (face // 2 == previous // 2 and face < previous):
+                    continue
+                new_corners = corner_moves[corners * count + j]
+                new_edges = edge_moves[edges * count + j]
+                new_slice = slice_moves[slice_value * count + j]
+                distance = max(corner_pruning[new_corners * SLICE_PERMUTATIONS + new_slice],
+                               edge_pruning[new_edges * SLICE_PERMUTATIONS + new_slice])
+                if distance >= depth:
+                    continue
+                path.append(m)
+                if search(new_corners, new_edges, new_slice, depth - 1):
+                    return True
+                path.pop()
+            return False
+
+        ranks = get_arrangements(8, 8)[1]
+        corners, edges = ranks[tuple(cp)], ranks[tuple(ep[:8])]
+        slice_value = get_arrangements(4, 4)[1][tuple(x - 8 for x in ep[8:])]
+        start = max(corner_pruning[corners * SLICE_PERMUTATIONS + slice_value],
+                    edge_pruning[edges * SLICE_PERMUTATIONS + slice_value])
+        for depth in range(start, max_length + 1):
+            if search(corners, edges, slice_value, depth):
+                return phase1 + path
+        return None
+
+
+def _parity(permutation: Sequence[int]) -> int:
+    result = 0
+    for i in range(len(permutation)):
+        for j in range(i + 1, len(permutation)):
+            if permutation[i] > permutation[j]:
+                result ^= 1
+    return result
+
+
+@lru_cache(maxsize=None)
+def get_solver() -> TwoPhaseSolver:
+    """ Returns a shared solver using the tables in the default location. """
+    return TwoPhaseSolver()
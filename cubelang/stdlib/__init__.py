@@ -1,4 +1,4 @@
-from typing import Dict, Any, List, Callable
+from typing import Dict, Any, List, Callable, Set
 
 from ..compiler.types import Type, Function, Bool
 from ..compiler.stack import Stack
@@ -9,8 +9,12 @@ class Library:
     def __init__(self):
         self.global_values: Dict[str, Type] = dict()
         self.exec_globals: Dict[str, Any] = dict()
+        self.impure_functions: Set[str] = set()
 
-    def add_function(self, name: str, function: Callable, arguments: List[Type], return_type: Type):
+    def add_function(self, name: str, function: Callable, arguments: List[Type], return_type: Type,
+                     pure: bool = True):
+        if not pure:
+            self.impure_functions.add(name)
         if name in self.global_values:
             function = self.global_values[name]
             assert isinstance(function, Function)
@@ -36,7 +40,7 @@ class Library:
 
     def initialize_stack(self, stack: Stack):
         for name, value_type in self.global_values.items():
-            stack.add_global(name, value_type)
+            stack.add_global(name, value_type, name not in self.impure_functions)
 
 
 stdlib = Library()
@@ -1,12 +1,18 @@
 from . import stdlib
-from ..compiler.types import Integer, List, Set, T, Void, Bool
+from ..compiler.types import Integer, List, Set, Map, Queue, T, K, V, Void, Bool
+from collections import deque
 import typing
 
-CollectionType = typing.Union[typing.Set, typing.List]
+CollectionType = typing.Union[typing.Set, typing.List, typing.Deque, typing.Dict]
+SequenceType = typing.Union[typing.List, typing.Deque]
+
+stdlib.exec_globals["deque"] = deque
 
 
 # Set functions
 
+@stdlib.function([Map(K, V)], Integer)
+@stdlib.function([Queue(T)], Integer)
 @stdlib.function([Set(T)], Integer)
 @stdlib.function([List(T)], Integer)
 def size(collection: CollectionType):
@@ -31,6 +37,7 @@ def remove(collection: typing.Set, value) -> bool:
         return False
 
 
+@stdlib.function([Queue(T), T], Bool)
 @stdlib.function([Set(T), T], Bool)
 @stdlib.function([List(T), T], Bool)
 def contains(collection: CollectionType, value) -> bool:
@@ -38,6 +45,8 @@ def contains(collection: CollectionType, value) -> bool:
     return value in collection
 
 
+@stdlib.function([Map(K, V)], Void)
+@stdlib.function([Queue(T)], Void)
 @stdlib.function([Set(T), T], Void)
 @stdlib.function([List(T), T], Void)
 def clear(collection: CollectionType) -> None:
@@ -52,14 +61,19 @@ def set_of(*args):
 
 # List functions
 
+@stdlib.function([Queue(T), T], Void)
 @stdlib.function([List(T), T], Void)
-def add_first(collection: typing.List, value) -> None:
+def add_first(collection: SequenceType, value) -> None:
     """ Adds an elements to the begining of a list. Its index will be 0. """
-    collection.insert(0, value)
+    if isinstance(collection, deque):
+        collection.appendleft(value)
+    else:
+        collection.insert(0, value)
 
 
+@stdlib.function([Queue(T), T], Void)
 @stdlib.function([List(T), T], Void)
-def add_last(collection: typing.List, value) -> None:
+def add_last(collection: SequenceType, value) -> None:
     """ Adds an element to the end of a list. Its index will be one less
     than the size of a list. """
     collection.append(value)
@@ -73,16 +87,20 @@ def add_at(collection: typing.List, index: int, value) -> None:
     collection.insert(index, value)
 
 
+@stdlib.function([Queue(T)], T)
 @stdlib.function([List(T)], T)
-def remove_first(collection: typing.List):
+def remove_first(collection: SequenceType):
     """ Removes and returns the first element of a list. """
     if len(collection) == 0:
         raise ValueError("The list is empty. There is notthing to remove")
+    if isinstance(collection, deque):
+        return collection.popleft()
     return collection.pop(0)
 
 
+@stdlib.function([Queue(T)], T)
 @stdlib.function([List(T)], T)
-def remove_last(collection: typing.List):
+def remove_last(collection: SequenceType):
     """ Removes and returns the last element of a list. """
     if len(collection) == 0:
         raise ValueError("The list is empty. There is notthing to remove")
@@ -119,3 +137,64 @@ def index_of(array: list, value) -> int:
 @stdlib.function([T, ...], List(T))
 def list_of(*args):
     return list(args)
+
+
+# Queue functions
+
+@stdlib.function([Queue(T)], T)
+def first(collection: typing.Deque):
+    """ Returns the first element of a queue without removing it. """
+    if len(collection) == 0:
+        raise ValueError("The queue is empty")
+    return collection[0]
+
+
+@stdlib.function([Queue(T)], T)
+def last(collection: typing.Deque):
+    """ Returns the last element of a queue without removing it. """
+    if len(collection) == 0:
+        raise ValueError("The queue is empty")
+    return collection[-1]
+
+
+@stdlib.function([T, ...], Queue(T))
+def queue_of(*args):
+    return deque(args)
+
+
+# Map functions
+
+@stdlib.function([Map(K, V), K], V)
+def get(collection: typing.Dict, key):
+    """ Returns the value associated with the key. """
+    if key not in collection:
+        raise ValueError("The key is not present in the map")
+    return collection[key]
+
+
+@stdlib.function([Map(K, V), K, V], Void)
+def put(collection: typing.Dict, key, value) -> None:
+    """ Associates the value with the key, replacing the previous value. """
+    collection[key] = value
+
+
+@stdlib.function([Map(K, V), K], Bool)
+def has_key(collection: typing.Dict, key) -> bool:
+    """ Returns true if a value is associated with the key, false otherwise. """
+    return key in collection
+
+
+@stdlib.function([Map(K, V), K], Bool)
+def remove_key(collection: typing.Dict, key) -> bool:
+    """ Removes the key and its value from the map. Returns true if the key
+    were present, false otherwise. """
+    if key not in collection:
+        return False
+    del collection[key]
+    return True
+
+
+@stdlib.function([Map(K, V)], List(K))
+def keys(collection: typing.Dict) -> typing.List:
+    """ Returns a list of the keys in the order they were added. """
+    return list(collection)
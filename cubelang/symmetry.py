@@ -0,0 +1,151 @@
+from functools import lru_cache
+from operator import itemgetter
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+
+from .actions import Turn, TurningType
+from .cube import Cube, INITIAL_COLORS
+from .orientation import Orientation, Side, Color
+
+
+COLORS = list(Color)
+
+
+def _get_table(colors: Dict[Color, Color]) -> bytes:
+    return bytes.maketrans(bytes(color.value for color in colors),
+                           bytes(color.value for color in colors.values()))
+
+
+def _get_views(orientation: Orientation) -> Dict[Side, Orientation]:
+    return {Side.FRONT: orientation, Side.BACK: orientation.to_left.to_left,
+            Side.LEFT: orientation.to_left, Side.RIGHT: orientation.to_right,
+            Side.TOP: orientation.to_top, Side.BOTTOM: orientation.to_bottom}
+
+
+class Symmetry(NamedTuple):
+    """ Transformation of a cube's state: the cube is looked at with the
+    orientation, then optionally reflected left to right, then its colors are
+    renamed. """
+    orientation: Orientation
+    mirrored: bool
+    colors: Dict[Color, Color]
+
+    def transform_turns(self, turns: Sequence[Turn]) -> List[Turn]:
+        """ Converts turns that are performed on the transformed state into
+        turns that have the same effect on the original state. Both are
+        performed with the default orientation. """
+        result = []
+        for turn in turns:
+            if self.mirrored:
+                if turn.type == TurningType.VERTICAL:
+                    turn = Turn(turn.type, Turn.opposite_side(turn.indices), turn.turns)
+                else:
+                    turn = Turn(turn.type, turn.indices, 4 - turn.turns)
+            result.append(turn.from_orientation(self.orientation))
+        return result
+
+
+class Symmetries:
+    """ Precomputed cell index maps of the symmetries of cubes of a given
+    shape: the 24 rotations that keep the shape and, optionally, their
+    combinations with a reflection. The maps of all symmetries are joined
+    into a single lookup, so the images of a state under every symmetry are
+    computed by one call. Use `get_symmetries` to get a shared instance. """
+
+    def __init__(self, shape: Tuple[int, int, int], mirror: bool = False):
+        self.shape: Tuple[int, int, int] = shape
+        scratch = Cube(shape)
+        positions = list(scratch._iterate_positions())
+        for index, (face, i, j) in enumerate(positions):
+            face[i, j].data = index
+        self.size: int = len(positions)
+
+        identity = _get_views(Orientation())
+        self.symmetries: List[Tuple[Orientation, bool]] = []
+        maps: List[List[int]] = []
+        for orientation in Orientation().iterate_rotations():
+            views = _get_views(orientation)
+            if any(scratch.get_side_shape(views[side]) != scratch.get_side_shape(identity[side])
+                   for side in Side):
+                continue
+            rotation = [0] * self.size
+            for side in Side:
+                origin, target = scratch.get_side(identity[side]), scratch.get_side(views[side])
+                for i in range(origin.rows):
+                    for j in range(origin.columns):
+                        rotation[origin[i, j].data] = target[i, j].data
+            self.symmetries.append((orientation, False))
+            maps.append(rotation)
+
+        if mirror:
+            # Reflection swaps the left and the right sides and reverses the
+            # columns of every side as it is seen from the front.
+            swapped = {Side.LEFT: Side.RIGHT, Side.RIGHT: Side.LEFT}
+            reflection = [0] * self.size
+            for side in Side:
+                origin = scratch.get_side(identity[side])
+                target = scratch.get_side(identity[swapped.get(side, side)])
+                for i in range(origin.rows):
+                    for j in range(origin.columns):
+                        reflection[origin[i, j].data] = target[i, origin.columns - 1 - j].data
+            for k in range(len(maps)):
+                self.symmetries.append((self.symmetries[k][0], True))
+                maps.append([maps[k][index] for index in reflection])
+
+        self.maps: List[List[int]] = maps
+        self._lookup = itemgetter(*(index for indices in maps for index in indices))
+
+        # Renaming of colors for every symmetry that maps the solved cube to
+        # itself, so images of states keep the initial color scheme
+        solved = bytes(Cube(shape).state_view())
+        sides = [side for side in Side for _ in range(scratch.sides[side].rows * scratch.sides[side].columns)]
+        self.schemes: List[Dict[Color, Color]] = []
+        for indices in maps:
+            self.schemes.append({Color(solved[index]): INITIAL_COLORS[side] for index, side in zip(indices, sides)})
+        self._scheme_tables: List[bytes] = [_get_table(colors) for colors in self.schemes]
+
+    def apply(self, state: bytes, symmetry: Symmetry) -> bytes:
+        """ Returns the image of the state (in the format of
+        `Cube.state_view`) under the symmetry. """
+        indices = self.maps[self.symmetries.index((symmetry.orientation, symmetry.mirrored))]
+        return bytes(itemgetter(*indices)(state)).translate(_get_table(symmetry.colors))
+
+    def canonicalize(self, state: bytes, recolor: bool = False, scheme: bool = False) -> Tuple[bytes, Symmetry]:
+        """ Returns the smallest image of the state under the symmetries and
+        the symmetry producing it. With `recolor`, colors of every image are
+        renamed in the order of their first occurrence, so states differing
+        only by the color scheme have the same canonical representative. With
+        `scheme`, colors are renamed by `schemes` instead, so a cube with the
+        initial color scheme is mapped to a cube that can be reached from the
+        solved one by the same turns, only transformed by the symmetry. """
+        images = bytes(self._lookup(state))
+        best, best_index, best_colors = None, 0, None
+        for index in range(len(self.symmetries)):
+            image = images[index * self.size:(index + 1) * self.size]
+            colors = None
+            if scheme and not recolor:
+                colors = self.schemes[index]
+                image = image.translate(self._scheme_tables[index])
+            elif recolor:
+                present = sorted((image.find(color.value), color) for color in Color if color.value in image)
+                colors = {color: COLORS[k] for k, (_, color) in enumerate(present)}
+                image = image.translate(_get_table(colors))
+            if best is None or image < best:
+                best, best_index, best_colors = image, index, colors
+        orientation, mirrored = self.symmetries[best_index]
+        if best_colors is None:
+            best_colors = {color: color for color in Color}
+        return best, Symmetry(orientation, mirrored, best_colors)
+
+
+@lru_cache(maxsize=None)
+def get_symmetries(shape: Tuple[int, int, int], mirror: bool = False) -> Symmetries:
+    return Symmetries(shape, mirror)
+
+
+def canonicalize(cube: Cube, mirror: bool = False, recolor: bool = False,
+                 scheme: bool = False) -> Tuple[bytes, Symmetry]:
+    """ Returns the canonical representative of the cube's state (in the
+    format of `Cube.state_view`) under rotations of the whole cube and,
+    optionally, reflections and renaming of colors, together with the
+    symmetry mapping the state to it. """
+    return get_symmetries(cube.shape, mirror).canonicalize(bytes(cube.state_view()), recolor, scheme)
@@ -0,0 +1,86 @@
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+MASK = (1 << 64) - 1
+TABLE_SIZE_LIMIT = 64 * 64
+QUARTER_SHIFT = 16
+
+
+def rotate_left(value: int, amount: int) -> int:
+    amount %= 64
+    return ((value << amount) | (value >> (64 - amount))) & MASK
+
+
+def mix(value: int) -> int:
+    """ SplitMix64 finalizer: maps an integer to a well-distributed 64-bit
+    value. """
+    value = (value + 0x9E3779B97F4A7C15) & MASK
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK
+    return value ^ (value >> 31)
+
+
+def _rotated_index(rows: int, columns: int, index: int) -> int:
+    """ Returns the index that the cell moves to when a side stored in the
+    row-major order is rotated (clockwise by a quarter if the side is square,
+    by a half otherwise). """
+    i, j = divmod(index, columns)
+    if rows == columns:
+        return j * columns + columns - 1 - i
+    return (rows - 1 - i) * columns + columns - 1 - j
+
+
+def _locate(rows: int, columns: int, index: int) -> Tuple[int, int, int]:
+    """ Finds the smallest index of the cell's orbit under rotations. Returns
+    it, the number of rotations that move it to the given index and the size
+    of the orbit. """
+    orbit = [index]
+    while True:
+        following = _rotated_index(rows, columns, orbit[-1])
+        if following == index:
+            break
+        orbit.append(following)
+    start = orbit.index(min(orbit))
+    return orbit[start], (len(orbit) - start) % len(orbit), len(orbit)
+
+
+def _make_key(seed: int, step: int, representative: int, rotations: int, orbit_size: int, code: int) -> int:
+    value = mix((seed << 40) ^ (representative << 3) ^ code)
+    if orbit_size == 1:
+        pattern = value & ((1 << step) - 1)
+        value = 0
+        for _ in range(64 // step):
+            value = (value << step) | pattern
+    return rotate_left(value, step * rotations)
+
+
+def get_key(seed: int, rows: int, columns: int, index: int, code: int) -> int:
+    """ Returns the key of the cell at the index with the color code.
+
+    Keys are chosen so that rotating a side rotates the bits of its hash: the
+    key of a cell moved by `_rotated_index` equals the key of the original
+    cell rotated by 16 bits per quarter turn. Therefore, the hash of a side
+    is updated in constant time when the side is rotated.
+
+    The price is weaker collision resistance than that of independent keys:
+    the key of a center cell repeats a 16-bit pattern, and the keys of one
+    cell in different colors differ by values that are the same for the
+    whole orbit, so color changes within an orbit only reach a small
+    subspace of the hash. The hash must not be used as an exact key of a
+    state: users have to verify the hits. """
+    step = QUARTER_SHIFT if rows == columns else 2 * QUARTER_SHIFT
+    return _make_key(seed, step, *_locate(rows, columns, index), code)
+
+
+@lru_cache(maxsize=None)
+def get_table(seed: int, rows: int, columns: int) -> Optional[List[int]]:
+    """ Returns all keys of a side, indexed by `index * 8 + code`, or None if
+    the side is too large to keep the table. """
+    if rows * columns > TABLE_SIZE_LIMIT:
+        return None
+    step = QUARTER_SHIFT if rows == columns else 2 * QUARTER_SHIFT
+    table = []
+    for index in range(rows * columns):
+        location = _locate(rows, columns, index)
+        table.extend(_make_key(seed, step, *location, code) for code in range(8))
+    return table
@@ -13,7 +13,7 @@ setup(
     name='CubeLang',
     version=metadata["version"],
     packages=["cubelang", "cubelang.cli", "cubelang.compiler", "cubelang.execution", 
-              "cubelang.postprocessing", "cubelang.stdlib"],
+              "cubelang.postprocessing", "cubelang.solvers", "cubelang.stdlib"],
     url='https://github.com/poletaevvlad/CubeLang',
     license='MIT',
     author=metadata["version"],
@@ -1,5 +1,6 @@
 from cubelang.actions import Action
 from cubelang.cube import Cube
+from cubelang.cubie import CubieCube
 from cubelang.orientation import Orientation, Side, Color
 from cubelang.cli.cube_builder import apply_side, CubeBuilder
 from pytest import raises
@@ -54,6 +55,21 @@ class TestBuilder:
         assert orientation.top == Side.TOP
         assert orientation.front == Side.FRONT
 
+    def test_create_packed(self, tmp_path):
+        builder = CubeBuilder((5, 5, 5), packed=True)
+        cube, _ = builder.get()
+        assert cube.packed
+        assert len(cube.buffer) == 6 * 5 * 5
+
+        cube, _ = CubeBuilder((3, 3, 3), path=str(tmp_path / "cube")).get()
+        assert cube.packed
+        assert (tmp_path / "cube").stat().st_size == 6 * 3 * 3
+
+    def test_create_cubie(self):
+        cube, _ = CubeBuilder((3, 3, 3), cubie=True).get()
+        assert isinstance(cube, CubieCube)
+        assert cube == Cube((3, 3, 3))
+
     @mock.patch("cubelang.cli.cube_builder.apply_side")
     @pytest.mark.parametrize("side, exp_orientation", [
         (Side.FRONT, Orientation(Side.FRONT, Side.TOP)),
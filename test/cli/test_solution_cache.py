@@ -0,0 +1,57 @@
+from cubelang.cli.solution_cache import SolutionCache, CacheStatistics
+from cubelang.cube import Cube
+from cubelang.orientation import Orientation
+from cubelang.parser import parse_actions
+
+
+def scramble(formula: str, shape=(3, 3, 3)) -> Cube:
+    cube = Cube(shape)
+    orientation = Orientation()
+    for action in parse_actions(formula):
+        orientation = action.perform(cube, orientation)
+    return cube
+
+
+def test_keys():
+    key = SolutionCache.get_key("R U", scramble("R"), ["optimize"])
+    assert SolutionCache.get_key("R U", scramble("R"), ["optimize"]) == key
+    assert SolutionCache.get_key("R U'", scramble("R"), ["optimize"]) != key
+    assert SolutionCache.get_key("R U", scramble("L"), ["optimize"]) != key
+    assert SolutionCache.get_key("R U", scramble("R"), []) != key
+    assert SolutionCache.get_key("R U", scramble(""), []) != SolutionCache.get_key("R U", scramble("", (2, 2, 2)), [])
+
+
+def test_hits_and_misses(tmp_path):
+    cache = SolutionCache(str(tmp_path / "cache.db"))
+    key = SolutionCache.get_key("R U", scramble("R"), [])
+    assert cache.get(key) is None
+    cache.put(key, "RU")
+    assert cache.get(key) == "RU"
+    assert cache.get(SolutionCache.get_key("R U", scramble("L"), [])) is None
+    assert cache.statistics == CacheStatistics(1, 2, 1)
+    cache.close()
+
+
+def test_eviction(tmp_path):
+    cache = SolutionCache(str(tmp_path / "cache.db"), 2)
+    keys = [SolutionCache.get_key(formula, Cube((3, 3, 3)), []) for formula in ["R", "L", "U"]]
+    cache.put(keys[0], "R")
+    cache.put(keys[1], "L")
+    assert cache.get(keys[0]) == "R"
+    cache.put(keys[2], "U")
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == "R"
+    assert cache.get(keys[2]) == "U"
+    assert cache.statistics.entries == 2
+    cache.close()
+
+
+def test_shared_file(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first, second = SolutionCache(path), SolutionCache(path)
+    key = SolutionCache.get_key("R", Cube((3, 3, 3)), [])
+    first.put(key, "R")
+    assert second.get(key) == "R"
+    assert first.statistics == CacheStatistics(1, 0, 1)
+    first.close()
+    second.close()
@@ -1,6 +1,6 @@
 from cubelang.compiler.expression import VariablesPool, Expression, ConditionExpression, WhileLoopExpression, \
     RepeatLoopExpression, DoWhileLoopExpression, ForLoopExpression, CubeTurningExpression, CubeRotationExpression, \
-    FunctionDeclarationExpression
+    FunctionDeclarationExpression, InlineCallExpression
 from cubelang.compiler.types import Integer, Real, Bool, Void, Set, List
 from cubelang.compiler.codeio import CodeStream
 from cubelang.compiler.code_map import CodeMap
@@ -219,36 +219,83 @@ class TestFunctionDeclaration:
         expression = FunctionDeclarationExpression(0, "func_name", "func", Integer, ["x", "y", "z"],
                                                    [Expression(0, Void, "a"), Expression(0, Void, "b")])
         stream = CodeStream()
-        expression.generate(VariablesPool(), stream, CodeMap(), None)
-        assert stream.get_contents() == "@runtime_function(\"func\")\n" \
-                                        "def func_name(x, y, z):\n" \
+        code_map = CodeMap()
+        expression.generate(VariablesPool(), stream, code_map, None)
+        assert stream.get_contents() == "def func_name(x, y, z):\n" \
                                         "    a\n    b\n" \
                                         "    return 0\n"
+        assert code_map.get_function_name(0) == "func"
 
     def test_no_arguments(self):
         expression = FunctionDeclarationExpression(0, "func2", "func2", List(Integer), [],
                                                    [Expression(0, Void, "a")])
         stream = CodeStream()
         expression.generate(VariablesPool(), stream, CodeMap(), None)
-        assert stream.get_contents() == "@runtime_function(\"func2\")\n" \
-                                        "def func2():\n    a\n    return list()\n"
+        assert stream.get_contents() == "def func2():\n    a\n    return list()\n"
 
     def test_no_return(self):
         expression = FunctionDeclarationExpression(0, "func3", "func3", Void, [],
                                                    [Expression(0, Void, "a")])
         stream = CodeStream()
         expression.generate(VariablesPool(), stream, CodeMap(), None)
-        assert stream.get_contents() == "@runtime_function(\"func3\")\ndef func3():\n    a\n"
+        assert stream.get_contents() == "def func3():\n    a\n"
 
     def test_no_body(self):
         expression = FunctionDeclarationExpression(0, "func2", "func2", List(Integer), [], [])
         stream = CodeStream()
         expression.generate(VariablesPool(), stream, CodeMap(), None)
-        assert stream.get_contents() == "@runtime_function(\"func2\")\n" \
-                                        "def func2():\n    return list()\n"
+        assert stream.get_contents() == "def func2():\n    return list()\n"
 
     def test_no_body_no_return(self):
         expression = FunctionDeclarationExpression(0, "func2", "func2", Void, [], [])
         stream = CodeStream()
         expression.generate(VariablesPool(), stream, CodeMap(), None)
-        assert stream.get_contents() == "@runtime_function(\"func2\")\ndef func2():\n    pass\n"
+        assert stream.get_contents() == "def func2():\n    pass\n"
+
+
+class TestInlineCall:
+    def test_statement(self):
+        expression = InlineCallExpression(0, Void, [Expression(0, Void, "a"), Expression(0, Void, "b")], None)
+        stream = CodeStream()
+        expression.generate(VariablesPool(), stream, CodeMap(), None)
+        assert stream.get_contents() == "a\nb\n"
+
+    def test_empty(self):
+        expression = InlineCallExpression(0, Void, [], None)
+        stream = CodeStream()
+        expression.generate(VariablesPool(), stream, CodeMap(), None)
+        assert stream.get_contents() == "pass\n"
+
+    def test_value(self):
+        call = InlineCallExpression(0, Integer, [Expression(0, Void, "a")], Expression(0, Integer, "b"))
+        expression = Expression.merge(Integer, ["x = ", 0, " + 1"], call)
+        stream = CodeStream()
+        expression.generate(VariablesPool(), stream, CodeMap(), None)
+        assert stream.get_contents() == "a\ntmp_0 = b\nx = tmp_0 + 1\n"
+
+
+class TestConstantRepeatLoop:
+    def test_constant_moves(self):
+        turn = CubeTurningExpression(0, "left", 2)
+        turn.indices = [Expression(0, Integer, "1"), Expression(0, Void, "..."), Expression(0, Integer, "-2")]
+        expr = RepeatLoopExpression(0, Expression(0, Integer, "10"),
+                                    [turn, CubeRotationExpression(0, "top", True)])
+        stream = CodeStream()
+        expr.generate(VariablesPool(), stream, CodeMap(), None)
+        assert stream.get_contents() == "cube_repeat(10, ((\"turn\", left, 2, (1, ..., -2,)), " \
+                                        "(\"rotate\", top, True),))\n"
+
+    def test_variable_index(self):
+        turn = CubeTurningExpression(0, "left", 1)
+        turn.indices = [Expression(0, Integer, "a")]
+        expr = RepeatLoopExpression(0, Expression(0, Integer, "2"), [turn])
+        assert expr.get_constant_moves() is None
+
+    def test_variable_times(self):
+        expr = RepeatLoopExpression(0, Expression(0, Integer, "a"), [CubeTurningExpression(0, "left", 1)])
+        assert expr.get_constant_moves() is None
+
+    def test_other_actions(self):
+        expr = RepeatLoopExpression(0, Expression(0, Integer, "2"),
+                                    [CubeTurningExpression(0, "left", 1), Expression(0, Void, "a")])
+        assert expr.get_constant_moves() is None
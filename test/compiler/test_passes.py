@@ -0,0 +1,99 @@
+import ast
+from typing import List
+
+import pytest
+
+from cubelang.compiler.passes import PassManager, PASS_NAMES
+
+
+def optimize(source: str, passes: List[str], constants=None) -> str:
+    manager = PassManager(set(PASS_NAMES).difference(passes))
+    tree = manager.run(ast.parse(source), constants or dict())
+    return ast.dump(tree)
+
+
+def expected(source: str) -> str:
+    return ast.dump(ast.parse(source))
+
+
+@pytest.mark.parametrize("source, result", [
+    ("print(2 * 3 + 1)", "print(7)"),
+    ("print(true and x)", "print(x)"),
+    ("print(false and x)", "print(False)"),
+    ("var_0 = 2\nprint(var_0 * 4)", "var_0 = 2\nprint(8)"),
+    ("var_0 = 2\nvar_0 = 3\nprint(var_0)", "var_0 = 2\nvar_0 = 3\nprint(var_0)"),
+    ("print(1 // 0)", "print(1 // 0)"),
+    ("print(2 ** 3)", "print(2 ** 3)"),
+    ("def var_0(var_1):\n    var_2 = 1\n    return var_1 + var_2",
+     "def var_0(var_1):\n    var_2 = 1\n    return var_1 + 1")
+])
+def test_constant_propagation(source: str, result: str):
+    assert optimize(source, ["constant-propagation"], {"true": True, "false": False}) == expected(result)
+
+
+@pytest.mark.parametrize("source, result", [
+    ("if False:\n    print(1)\nelse:\n    print(2)", "print(2)"),
+    ("while False:\n    print(1)\nprint(2)", "print(2)"),
+    ("while x:\n    break\n    print(1)", "while x:\n    break"),
+    ("var_0 = 1\nvar_1 = 2\nprint(var_1)", "var_1 = 2\nprint(var_1)"),
+    ("var_0 = f()\nprint(1)", "var_0 = f()\nprint(1)"),
+    ("def var_0():\n    print(1)\nprint(2)", "print(2)"),
+    ("def var_0():\n    var_1 = 2\n    return 1\nprint(var_0())", "def var_0():\n    return 1\nprint(var_0())"),
+    ("if x:\n    var_0 = 1\nprint(2)", "if x:\n    pass\nprint(2)")
+])
+def test_dead_code_elimination(source: str, result: str):
+    assert optimize(source, ["dead-code-elimination"]) == expected(result)
+
+
+@pytest.mark.parametrize("source, result", [
+    ("if cube_get_color(front, 1, 1) == cube_get_color(front, 1, 1):\n    print(1)",
+     "opt_0 = cube_get_color(front, 1, 1)\nif opt_0 == opt_0:\n    print(1)"),
+    ("var_0 = cube_get_color(front, 1, 1)\nvar_1 = cube_get_color(front, 1, 1)",
+     "opt_0 = cube_get_color(front, 1, 1)\nvar_0 = opt_0\nvar_1 = opt_0"),
+    ("var_0 = cube_get_color(front, 1, 1)\ncube_turn(front, 1, [1])\nvar_1 = cube_get_color(front, 1, 1)",
+     "var_0 = cube_get_color(front, 1, 1)\ncube_turn(front, 1, [1])\nvar_1 = cube_get_color(front, 1, 1)"),
+    ("var_0 = x and cube_get_color(front, 1, 1)\nvar_1 = cube_get_color(front, 1, 1)",
+     "var_0 = x and cube_get_color(front, 1, 1)\nvar_1 = cube_get_color(front, 1, 1)"),
+    ("var_0 = cube_get_color(front, var_1, 1)\nvar_2 = cube_get_color(front, var_1, 1)",
+     "var_0 = cube_get_color(front, var_1, 1)\nvar_2 = cube_get_color(front, var_1, 1)")
+])
+def test_common_subexpression_elimination(source: str, result: str):
+    assert optimize(source, ["common-subexpression-elimination"]) == expected(result)
+
+
+@pytest.mark.parametrize("source, result", [
+    ("while var_0 < var_1 * 2:\n    var_0 = var_0 + 1",
+     "opt_0 = var_1 * 2\nwhile var_0 < opt_0:\n    var_0 = var_0 + 1"),
+    ("for var_0 in x:\n    var_1 = var_1 + var_2 * var_3",
+     "opt_0 = var_2 * var_3\nfor var_0 in x:\n    var_1 = var_1 + opt_0"),
+    ("for var_0 in x:\n    var_1 = var_1 + var_0 * var_3",
+     "for var_0 in x:\n    var_1 = var_1 + var_0 * var_3"),
+    ("for var_0 in x:\n    var_1 = size(var_2)",
+     "for var_0 in x:\n    var_1 = size(var_2)"),
+    ("while var_0 < size(var_2):\n    var_0 = var_0 + 1",
+     "opt_0 = size(var_2)\nwhile var_0 < opt_0:\n    var_0 = var_0 + 1"),
+    ("while var_0 < size(var_2):\n    var_0 = var_0 + 1\n    print(var_0)",
+     "while var_0 < size(var_2):\n    var_0 = var_0 + 1\n    print(var_0)"),
+    ("while var_0[0] < 5:\n    var_0[0] = var_0[0] + 1",
+     "while var_0[0] < 5:\n    var_0[0] = var_0[0] + 1"),
+    ("while var_0[0] < 5:\n    add_first(var_0, 1)",
+     "while var_0[0] < 5:\n    add_first(var_0, 1)"),
+    ("while var_1 < var_0[0] * 2:\n    var_2[0] = 1\n    var_1 = var_1 + 1",
+     "while var_1 < var_0[0] * 2:\n    var_2[0] = 1\n    var_1 = var_1 + 1"),
+    ("while var_1 < var_0[0] * 2:\n    var_1 = var_1 + 1",
+     "opt_0 = var_0[0] * 2\nwhile var_1 < opt_0:\n    var_1 = var_1 + 1")
+])
+def test_loop_invariant_hoisting(source: str, result: str):
+    assert optimize(source, ["loop-invariant-hoisting"]) == expected(result)
+
+
+def test_statistics():
+    manager = PassManager(["loop-invariant-hoisting"])
+    manager.run(ast.parse("print(1 + 2)"), dict())
+    assert [x.name for x in manager.statistics] == PASS_NAMES[:-1]
+    assert manager.statistics[0].changes == 1
+
+
+def test_unknown_pass():
+    with pytest.raises(ValueError):
+        PassManager(["unknown"])
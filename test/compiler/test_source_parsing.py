@@ -10,7 +10,7 @@ from cubelang.compiler.stack import Stack
 from cubelang.compiler.errors import ValueTypeError, UnresolvedReferenceError, \
     FunctionArgumentsError, CompileTimeError
 from cubelang.compiler.types import Integer, Real, Type, Bool, List, Set, Void, \
-    Function, Color, Side, Pattern
+    Function, Color, Side, Pattern, Map, Queue
 import typing
 
 
@@ -142,11 +142,18 @@ def test_undefined_variable():
     (tr("type_pattern"), Pattern),
     (tr("type_list", tr("type_bool")), List(Bool)),
     (tr("type_set", tr("type_real")), Set(Real)),
+    (tr("type_queue", tr("type_side")), Queue(Side)),
+    (tr("type_map", tr("type_color"), tr("type_list", tr("type_int"))), Map(Color, List(Integer))),
 ])
 def test_type_handle(tree: lark.Tree, expected: Type):
     assert parser.handle(tree, Stack()) == expected
 
 
+def test_map_collection_key():
+    with pytest.raises(CompileTimeError):
+        parser.handle(tr("type_map", tr("type_set", tr("type_int")), tr("type_int")), Stack())
+
+
 class TestVariableDeclaration:
     def test_var_declaration(self):
         tree = tr("var_decl", "a", "b", "c", tr("type_int"))
@@ -710,6 +717,49 @@ class TestOrientParameters:
             parser.handle(tree, self.create_stack())
 
 
+class TestSearchParameters:
+    @staticmethod
+    def create_stack():
+        stack = TestOrientParameters.create_stack()
+        stack.add_global("n", Integer)
+        return stack
+
+    def test_valid(self):
+        tree = tr("search_params",
+                  tr("orient_params", "front", tr("variable", "a")),
+                  tr("variable", "n"),
+                  tr("search_moves",
+                     tr("cube_instruction", tr("cube_right"), tr("cube_opposite", tr("cube_top"))),
+                     tr("cube_instruction", tr("cube_rotate_top"))))
+        expr = parser.handle(tree, self.create_stack())
+
+        assert "".join(expr.expression) == \
+            "cube_search(n, (((\"turn\", right, 1, (1, )), (\"turn\", top, 3, (1, )), ), " \
+            "((\"rotate\", top, False), ), ), front=a)"
+        assert expr.type == Bool
+
+    def test_keeping(self):
+        tree = tr("search_params",
+                  tr("orient_params", "front", tr("variable", "a"), "keeping", tr("variable", "c")),
+                  tr("variable", "n"),
+                  tr("search_moves", tr("cube_instruction", tr("cube_right"))))
+        with pytest.raises(CompileTimeError):
+            parser.handle(tree, self.create_stack())
+
+    def test_invalid_depth_type(self):
+        tree = tr("search_params",
+                  tr("orient_params", "front", tr("variable", "a")),
+                  tr("variable", "c"),
+                  tr("search_moves", tr("cube_instruction", tr("cube_right"))))
+        with pytest.raises(ValueTypeError):
+            parser.handle(tree, self.create_stack())
+
+
+def memo(tree: lark.Tree) -> lark.Tree:
+    tree.children.insert(0, lark.Token("MEMO", "memo"))
+    return tree
+
+
 class TestFunctionDeclaration:
     def test_default(self):
         tree = tr("func_decl", "func_name",
@@ -769,6 +819,48 @@ class TestFunctionDeclaration:
         assert expression.return_type == Void
         assert stack.get_variable("func_name").type == Function(([], Void))
 
+    def test_memo(self):
+        tree = memo(tr("func_decl", "func_name",
+                  tr("argument", "a", tr("type_int")),
+                  tr("type_bool"),
+                  tr("clause", tr("func_call", "pure", tr("variable", "a")))))
+        stack = Stack()
+        stack.add_global("pure", Function(([Integer], Bool)))
+        expression = parser.handle(tree, stack)
+        assert isinstance(expression, FunctionDeclarationExpression)
+        assert expression.memo
+        assert expression.symbol_name == "func_name"
+        assert stack.get_variable("func_name").inline is None
+
+    @pytest.mark.parametrize("statement", [
+        tr("cube_instruction", tr("cube_right")),
+        tr("if_expression", tr("orient_params", "front", tr("variable", "a")), tr("clause")),
+        tr("func_call", "impure", tr("variable", "a"))
+    ])
+    def test_memo_not_pure(self, statement):
+        tree = memo(tr("func_decl", "func_name",
+                  tr("argument", "a", tr("type_int")),
+                  tr("clause", statement)))
+        stack = Stack()
+        stack.add_global("impure", Function(([Integer], Void)), False)
+        with pytest.raises(CompileTimeError):
+            parser.handle(tree, stack)
+
+    def test_memo_shadowed_impure(self):
+        stack = Stack()
+        stack.add_global("solve", Function(([], Void)), False)
+        parser.handle(tr("func_decl", "solve", tr("clause")), stack)
+        tree = memo(tr("func_decl", "func_name", tr("clause", tr("func_call", "solve"))))
+        with pytest.raises(CompileTimeError):
+            parser.handle(tree, stack)
+
+    def test_memo_collection(self):
+        tree = memo(tr("func_decl", "func_name",
+                  tr("argument", "a", tr("type_list", tr("type_int"))),
+                  tr("clause")))
+        with pytest.raises(CompileTimeError):
+            parser.handle(tree, Stack())
+
 
 class TestReturnStatement:
     def test_return(self):
@@ -31,3 +31,29 @@ def test_frames():
     assert stack.get_variable("b").type == Real
     assert stack.get_variable("c") is None
     assert stack.add_variable("c", List(Integer)) == 2
+
+
+def test_deep_frames():
+    stack = Stack()
+    stack.add_global("a", Bool)
+    for depth in range(100):
+        stack.add_frame()
+        assert stack.add_variable("a", Integer) == depth
+    assert stack.get_variable("a").number == 99
+
+    for depth in range(99, -1, -1):
+        assert stack.get_variable("a").number == depth
+        stack.pop_frame()
+    assert stack.get_variable("a").number == -1
+
+
+def test_redeclaration():
+    stack = Stack()
+    stack.add_frame()
+    assert stack.add_variable("a", Integer) == 0
+    assert stack.add_variable("a", Real) == 1
+    assert stack.get_variable("a").type == Real
+
+    stack.pop_frame()
+    assert stack.get_variable("a") is None
+    assert stack.add_variable("b", Integer) == 1
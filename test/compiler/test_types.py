@@ -2,7 +2,7 @@ import typing
 
 import pytest
 from cubelang.compiler.types import Type, Integer, Real, Bool, List, Set, Function, Void, type_annotation_to_type, T, \
-    Color, Side
+    Color, Side, Map, Queue, K, V
 
 
 @pytest.mark.parametrize("type_object, representation", [
@@ -24,6 +24,8 @@ def test_repr(type_object: Type, representation: str):
     (Bool, "bool"),
     (Void, "void"),
     (List(Set(Integer)), "list of set of int"),
+    (Map(Color, List(Integer)), "map of color to list of int"),
+    (Queue(Side), "queue of side"),
     (Set(Bool), "set of bool")
 ])
 def test_repr(type_object: Type, string: str):
@@ -61,7 +63,13 @@ def test_hash_simple(a: Type, b: Type):
     (Integer, Integer, {}),
     (List(T), List(Integer), {"T": Integer}),
     (List(T), Set(Integer), None),
-    (List(Set(T)), List(Set(List(Integer))), {"T": List(Integer)})
+    (List(Set(T)), List(Set(List(Integer))), {"T": List(Integer)}),
+    (Map(K, V), Map(Color, Integer), {"K": Color, "V": Integer}),
+    (Map(T, T), Map(Color, Color), {"T": Color}),
+    (Map(T, T), Map(Color, Integer), None),
+    (Map(K, V), List(Integer), None),
+    (Queue(T), Queue(Color), {"T": Color}),
+    (Queue(T), List(Color), None)
 ])
 def test_generic_args(a: Type, b: Type, result):
     actual = a.get_generic_vars(b)
@@ -123,14 +131,35 @@ def test_variadic_expansion(arguments, amount, expected):
     (int, Integer), (float, Real), (bool, Bool), (None, Void),
     (typing.List[int], List(Integer)),
     (typing.Set[float], Set(Real)),
-    (typing.List[typing.Set[int]], List(Set(Integer)))
+    (typing.List[typing.Set[int]], List(Set(Integer))),
+    (typing.Dict[int, typing.List[bool]], Map(Integer, List(Bool))),
+    (typing.Deque[int], Queue(Integer))
 ])
 def test_from_annotation(annotation: typing.Any, val_type: Type):
     assert type_annotation_to_type(annotation) == val_type
 
 
 @pytest.mark.parametrize("type, value", [
-    (Integer, "0"), (Real, "0.0"), (Bool, "False"), (List(Bool), "list()"), (Set(Integer), "set()")
+    (Integer, "0"), (Real, "0.0"), (Bool, "False"), (List(Bool), "list()"), (Set(Integer), "set()"),
+    (Map(Integer, Bool), "dict()"), (Queue(Integer), "deque()")
 ])
 def test_default(type: Type, value: str):
     assert type.default_value() == value
+
+
+def test_interning():
+    assert List(Set(Integer)) is List(Set(Integer))
+    assert List(Integer) is not Set(Integer)
+    assert List(T).substitute_generic({"T": Bool}) is List(Bool)
+    assert Map(K, V).substitute_generic({"K": Color, "V": Integer}) is Map(Color, Integer)
+    assert Map(Color, Integer) is not Map(Integer, Color)
+
+
+def test_resolution_cache():
+    func = Function(([Integer, Integer], Integer), ([List(T)], T))
+    assert func.takes_arguments([List(Color)]) is Color
+    assert func.takes_arguments([List(Color)]) is Color
+    assert func.takes_arguments([Real, Integer]) is None
+
+    func.prepend_overload([Real, Integer], Bool)
+    assert func.takes_arguments([Real, Integer]) is Bool
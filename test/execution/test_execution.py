@@ -1,10 +1,13 @@
 import math
 from unittest.mock import MagicMock
 
+import pytest
+
 from cubelang.compiler.code_map import CodeMap
 from cubelang.compiler.parser import parser
+from cubelang.compiler.passes import PASS_NAMES
 from cubelang.compiler.stack import Stack
-from cubelang.compiler.types import Integer, Function, Void, Real
+from cubelang.compiler.types import Integer, Function, Void, Real, Bool
 from cubelang.execution.executor import ExecutionContext, ITracebackWriter
 from cubelang.execution.rt_error import RuntimeError
 from cubelang.stdlib import stdlib
@@ -208,7 +211,183 @@ def test_exception():
 
     error: RuntimeError = writer.print_traceback.call_args_list[0][0][0]
     assert str(error) == "~~error~~"
-    assert tuple(error.stack_entries[0]) == ("f", 2)
-    assert tuple(error.stack_entries[1]) == (None, 3)
-    assert context.code_map[2] == 2
-    assert context.code_map[3] == 5
+    assert tuple(error.stack_entries[0]) == ("f", 1)
+    assert tuple(error.stack_entries[1]) == (None, 2)
+    assert context.code_map[1] == 2
+    assert context.code_map[2] == 5
+
+
+def test_inlining():
+    code = """
+        func f(x: int, y: int): int
+            let z: int = x * y
+            return z + x
+        end
+
+        func g(x: int)
+            print(x * 3)
+            throw()
+        end
+
+        let x: int = 3
+        print(f(x, x + 1))
+        g(5)
+    """
+
+    stack = Stack()
+    stack.add_global("print", Function(([Integer], Void)))
+    stack.add_global("throw", Function(([], Void)))
+    expressions = list(parser.parse(code, stack))
+
+    def throw_function():
+        raise ValueError("~~error~~")
+
+    writer = MockTracebackWriter()
+    writer.print_traceback = MagicMock()
+
+    print_fn = MagicMock()
+    context = ExecutionContext({"print": print_fn, "throw": throw_function})
+    source = context.compile_source(expressions)
+    assert source.count("var_0(") == 1 and source.count("var_1(") == 1
+    context.compile(expressions)
+    context.execute(writer)
+
+    assert [x[0][0] for x in print_fn.call_args_list] == [15, 15]
+    error: RuntimeError = writer.print_traceback.call_args_list[0][0][0]
+    assert error.stack_entries[0].function_name == "g"
+    assert context.code_map[error.stack_entries[0].line_number] == 8
+    assert context.code_map[error.stack_entries[1].line_number] == 13
+
+
+@pytest.mark.parametrize("disabled_passes", [[], PASS_NAMES])
+def test_optimization_passes(disabled_passes):
+    code = """
+        let n: int = 4
+        let total: int = 0
+        let i: int = 0
+        while i < n * n do
+            if false then
+                print(-1)
+            end
+            total = total + i * a
+            i = i + 1
+        end
+        print(total)
+        let unused: int = total
+        throw()
+    """
+
+    stack = Stack()
+    stack.add_global("a", Integer)
+    stack.add_global("false", Bool)
+    stack.add_global("print", Function(([Integer], Void)))
+    stack.add_global("throw", Function(([], Void)))
+    expressions = list(parser.parse(code, stack))
+
+    def throw_function():
+        raise ValueError("~~error~~")
+
+    writer = MockTracebackWriter()
+    writer.print_traceback = MagicMock()
+
+    print_fn = MagicMock()
+    context = ExecutionContext({"a": 2, "false": False, "print": print_fn, "throw": throw_function},
+                               disabled_passes)
+    context.compile(expressions)
+    context.execute(writer)
+
+    assert [x[0][0] for x in print_fn.call_args_list] == [240]
+    error: RuntimeError = writer.print_traceback.call_args_list[0][0][0]
+    assert context.code_map[error.stack_entries[0].line_number] == 13
+
+
+@pytest.mark.parametrize("disabled_passes", [[], PASS_NAMES])
+def test_loop_over_changing_list(disabled_passes):
+    code = """
+        let a: list of int = new_list(1, 0)
+        while a[0] < 5 do
+            a[0] = a[0] + 1
+        end
+        print(a[0])
+        let b: list of int = list_of(3)
+        while b[0] != 0 do
+            add_first(b, 0)
+        end
+        print(size(b))
+    """
+
+    stack = Stack()
+    stdlib.initialize_stack(stack)
+    stack.add_global("print", Function(([Integer], Void)))
+    expressions = list(parser.parse(code, stack))
+
+    print_fn = MagicMock()
+    context = ExecutionContext({**stdlib.exec_globals, "print": print_fn}, disabled_passes)
+    context.compile(expressions)
+    context.execute(MockTracebackWriter())
+    assert [x[0][0] for x in print_fn.call_args_list] == [5, 2]
+
+
+def test_inlined_short_circuit():
+    code = """
+        func f(x: int): boolean
+            print(x)
+            return true
+        end
+
+        let a: boolean = false
+        if a and f(1) then
+            print(10)
+        end
+        if a or f(2) then
+            print(20)
+        end
+        a = true
+        if a and f(3) then
+            print(30)
+        end
+        if a or f(4) then
+            print(40)
+        end
+    """
+
+    stack = Stack()
+    stdlib.initialize_stack(stack)
+    stack.add_global("print", Function(([Integer], Void)))
+    expressions = list(parser.parse(code, stack))
+
+    print_fn = MagicMock()
+    context = ExecutionContext({**stdlib.exec_globals, "print": print_fn})
+    source = context.compile_source(expressions)
+    assert source.count("var_0(") == 1
+    context.compile(expressions)
+    context.execute(MockTracebackWriter())
+    assert [x[0][0] for x in print_fn.call_args_list] == [2, 20, 3, 30, 40]
+
+
+def test_nested_inlined_arguments():
+    code = """
+        func g(x: int): int
+            return x * 10
+        end
+
+        func f(a: int, b: int): int
+            return a + b
+        end
+
+        print(f(1, g(2)))
+        print(f(g(3), f(4, g(5))))
+    """
+
+    stack = Stack()
+    stdlib.initialize_stack(stack)
+    stack.add_global("print", Function(([Integer], Void)))
+    expressions = list(parser.parse(code, stack))
+
+    print_fn = MagicMock()
+    context = ExecutionContext({**stdlib.exec_globals, "print": print_fn})
+    source = context.compile_source(expressions)
+    assert source.count("var_0(") == source.count("var_1(") == 1
+    context.compile(expressions)
+    context.execute(MockTracebackWriter())
+    assert [x[0][0] for x in print_fn.call_args_list] == [21, 84]
@@ -0,0 +1,123 @@
+import copy
+import shutil
+from unittest.mock import patch
+
+import pytest
+
+from cubelang.cube import Cube
+from cubelang.cube_runtime import CubeRuntime
+from cubelang.cubie import CubieCube
+from cubelang.orientation import Orientation, Side, Color
+from cubelang.parser import parse_actions
+from cubelang.solvers.pocket_cube import PocketCubeSolver, STATES_COUNT, UNKNOWN, load_table
+
+
+@pytest.fixture(scope="module")
+def solver(tmp_path_factory) -> PocketCubeSolver:
+    return PocketCubeSolver(str(tmp_path_factory.mktemp("tables") / "pocket_cube.dist"), processes=2)
+
+
+def is_solved(cube: Cube) -> bool:
+    return all(len({side.colors[i, j] for i in range(2) for j in range(2)}) == 1
+               for side in cube.sides.values())
+
+
+def test_table(solver: PocketCubeSolver) -> None:
+    distances = solver.table[:]
+    assert len(distances) == STATES_COUNT
+    assert max(distances) == 11
+    assert distances.count(11) == 2644 and distances.count(UNKNOWN) == 0
+
+
+@pytest.mark.parametrize("scramble, length", [
+    ("", 0),
+    ("R", 1),
+    ("R U' F2", 3),
+    ("L D B' X R2 U F' Z L", 7),
+    ("R U R' U' R' F R2 U' R' U' R U R' F'", 11)
+])
+def test_solve(solver: PocketCubeSolver, scramble: str, length: int) -> None:
+    cube = Cube((2, 2, 2))
+    orientation = Orientation()
+    for action in parse_actions(scramble):
+        orientation = action.perform(cube, orientation)
+
+    solution = solver.solve(cube, orientation)
+    assert len(solution) <= length
+    for action in solution:
+        orientation = action.perform(cube, orientation)
+    assert is_solved(cube)
+
+
+def test_symmetric_states(solver: PocketCubeSolver) -> None:
+    solver.solutions.clear()
+    for scramble, orientation in [("R U F' D2", Orientation()), ("Y R U F' D2", Orientation(Side.LEFT, Side.BOTTOM)),
+                                  ("X Z' R U F' D2", Orientation().to_top), ("L' U' F D2", Orientation())]:
+        cube = Cube((2, 2, 2))
+        actions_orientation = Orientation()
+        for action in parse_actions(scramble):
+            actions_orientation = action.perform(cube, actions_orientation)
+        for action in solver.solve(cube, orientation):
+            orientation = action.perform(cube, orientation)
+        assert is_solved(cube)
+    assert len(solver.solutions) == 1
+
+
+def test_solve_cubie(solver: PocketCubeSolver) -> None:
+    cube = CubieCube((2, 2, 2))
+    for action in parse_actions("F R' U2 B"):
+        action.perform(cube, Orientation(Side.LEFT, Side.BOTTOM))
+    for action in solver.solve(cube, Orientation(Side.LEFT, Side.BOTTOM)):
+        action.perform(cube, Orientation(Side.LEFT, Side.BOTTOM))
+    assert is_solved(cube)
+
+
+def test_unsolvable(solver: PocketCubeSolver) -> None:
+    with pytest.raises(ValueError):
+        solver.solve(Cube((3, 3, 3)))
+
+    cube = Cube((2, 2, 2))
+    front = cube.get_side(Orientation())
+    top = cube.get_side(Orientation().to_top)
+    left = cube.get_side(Orientation().to_left)
+    front.colors[0, 0], top.colors[1, 0], left.colors[0, 1] = Color.YELLOW, Color.BLUE, Color.RED
+    with pytest.raises(ValueError):
+        solver.solve(cube)
+
+
+def test_checksum(solver: PocketCubeSolver, tmp_path) -> None:
+    path = tmp_path / "pocket_cube.dist"
+    shutil.copy(solver.path, path)
+    with open(path, "r+b") as file:
+        file.write(b"\x01")
+    assert load_table(str(path)) is None
+
+    def generate(*_) -> None:
+        shutil.copy(solver.path, path)
+
+    with patch("cubelang.solvers.pocket_cube.generate_table", side_effect=generate) as generate_table:
+        corrupted = PocketCubeSolver(str(path))
+    generate_table.assert_called_once()
+    assert corrupted.table[:] == solver.table[:]
+
+
+def test_corrupted_table(solver: PocketCubeSolver) -> None:
+    corrupted = copy.copy(solver)
+    corrupted.table = bytearray(solver.table[:])
+    corrupted.table[0] = UNKNOWN
+    cube = Cube((2, 2, 2))
+    for action in parse_actions("R U"):
+        action.perform(cube, Orientation())
+    with pytest.raises(ValueError):
+        corrupted.solve(cube)
+
+
+def test_runtime(solver: PocketCubeSolver) -> None:
+    actions = []
+    runtime = CubeRuntime(Cube((2, 2, 2)), Orientation(), actions.append, lambda: None)
+    runtime.perform_turn(Side.RIGHT, 1, [1])
+    runtime.perform_turn(Side.TOP, 1, [1])
+    with patch("cubelang.solvers.pocket_cube.get_solver", return_value=solver):
+        runtime.solve_optimal()
+    assert len(actions) == 4
+    assert is_solved(runtime.cube)
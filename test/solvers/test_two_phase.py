@@ -0,0 +1,112 @@
+import os
+import shutil
+from unittest.mock import patch
+
+import pytest
+
+from cubelang.cube import Cube
+from cubelang.cube_runtime import CubeRuntime
+from cubelang.cubie import CubieCube
+from cubelang.orientation import Orientation, Side, Color
+from cubelang.parser import parse_actions
+from cubelang.solvers.two_phase import TwoPhaseSolver, MAX_LENGTH
+
+
+@pytest.fixture(scope="module")
+def solver(tmp_path_factory) -> TwoPhaseSolver:
+    return TwoPhaseSolver(str(tmp_path_factory.mktemp("two_phase")), processes=2)
+
+
+def is_solved(cube: Cube) -> bool:
+    return all(len({side.colors[i, j] for i in range(3) for j in range(3)}) == 1
+               for side in cube.sides.values())
+
+
+@pytest.mark.parametrize("scramble, length", [
+    ("", 0),
+    ("R", 1),
+    ("R U' F2", 3),
+    ("L D B' X R2 U F' Z L", MAX_LENGTH),
+    ("R U R' U' R' F R2 U' R' U' R U R' F'", MAX_LENGTH),
+    ("D2 F' R2 U' L2 B2 D' L F2 U B' R' D L2 F R2 B U2 L' D2 R' F U' B2", MAX_LENGTH)
+])
+def test_solve(solver: TwoPhaseSolver, scramble: str, length: int) -> None:
+    cube = Cube((3, 3, 3))
+    orientation = Orientation()
+    for action in parse_actions(scramble):
+        orientation = action.perform(cube, orientation)
+
+    solution = solver.solve(cube, orientation)
+    assert len(solution) <= length
+    for action in solution:
+        orientation = action.perform(cube, orientation)
+    assert is_solved(cube)
+
+
+def test_solve_cubie(solver: TwoPhaseSolver) -> None:
+    cube = CubieCube((3, 3, 3))
+    for action in parse_actions("F R' U2 B L2 D"):
+        action.perform(cube, Orientation(Side.LEFT, Side.BOTTOM))
+    for action in solver.solve(cube, Orientation(Side.LEFT, Side.BOTTOM)):
+        action.perform(cube, Orientation(Side.LEFT, Side.BOTTOM))
+    assert is_solved(cube)
+
+
+def test_unsolvable(solver: TwoPhaseSolver) -> None:
+    with pytest.raises(ValueError):
+        solver.solve(Cube((2, 2, 2)))
+
+    cube = Cube((3, 3, 3))
+    front = cube.get_side(Orientation())
+    top = cube.get_side(Orientation().to_top)
+    front.colors[0, 1], top.colors[2, 1] = Color.WHITE, Color.RED
+    with pytest.raises(ValueError):
+        solver.solve(cube)
+
+    cube = Cube((3, 3, 3))
+    for action in parse_actions("R U R' U'"):
+        action.perform(cube, Orientation())
+    with pytest.raises(ValueError):
+        solver.solve(cube, max_length=2)
+
+
+def test_symmetric_states(solver: TwoPhaseSolver) -> None:
+    solver.solutions.clear()
+    for rotation, orientation in [("", Orientation()), ("Y", Orientation(Side.LEFT, Side.BOTTOM)),
+                                  ("X Z'", Orientation().to_top)]:
+        cube = Cube((3, 3, 3))
+        actions_orientation = Orientation()
+        for action in parse_actions(f"{rotation} R U F' D2 L B'"):
+            actions_orientation = action.perform(cube, actions_orientation)
+        for action in solver.solve(cube, orientation):
+            orientation = action.perform(cube, orientation)
+        assert is_solved(cube)
+    assert len(solver.solutions) == 1
+
+
+def test_checksums(solver: TwoPhaseSolver, tmp_path) -> None:
+    solver.tables
+    directory = tmp_path / "tables"
+    shutil.copytree(solver.directory, directory)
+    with open(directory / "phase1_flip", "r+b") as file:
+        file.write(b"\xFE")
+
+    def generate(*_) -> None:
+        shutil.copy(os.path.join(solver.directory, "phase1_flip"), directory)
+
+    corrupted = TwoPhaseSolver(str(directory))
+    assert corrupted._load_tables() is None
+    with patch("cubelang.solvers.two_phase.generate_tables", side_effect=generate) as generate_tables:
+        assert len(corrupted.tables) == len(solver.tables)
+    generate_tables.assert_called_once()
+
+
+def test_runtime(solver: TwoPhaseSolver) -> None:
+    actions = []
+    runtime = CubeRuntime(Cube((3, 3, 3)), Orientation(), actions.append, lambda: None)
+    runtime.perform_turn(Side.RIGHT, 1, [1])
+    runtime.perform_turn(Side.TOP, 1, [1])
+    with patch("cubelang.solvers.two_phase.get_solver", return_value=solver):
+        runtime.solve()
+    assert len(actions) == 4
+    assert is_solved(runtime.cube)
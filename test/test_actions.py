@@ -1,11 +1,9 @@
-from collections import namedtuple
-
 from cubelang.cube import Cube
 from cubelang.orientation import Side, Orientation
 from cubelang.actions import Rotate, Turn, TurningType
 
 import pytest
-from typing import List
+from typing import List, Tuple
 from unittest.mock import MagicMock
 
 
@@ -57,39 +55,40 @@ def test_from_turn_steps():
 
 
 class CubeMock(object):
-    SideMock = namedtuple("SideMock", ["columns", "rows"])
-
     def __init__(self):
         self.turn_slice = None
         self.turn_vertical = None
         self.turn_horizontal = None
 
-    def get_side(self, _orientation):
-        return CubeMock.SideMock(3, 3)
+    def get_side_shape(self, _orientation):
+        return 3, 3
 
 
-@pytest.mark.parametrize("side, func, out_sides, out_amount", [
-    (Side.FRONT, "turn_slice", [1, 2], 1),
-    (Side.BACK, "turn_slice", [2, 3], 3),
-    (Side.RIGHT, "turn_vertical", [2, 3], 1),
-    (Side.LEFT, "turn_vertical", [1, 2], 3),
-    (Side.TOP, "turn_horizontal", [1, 2], 3),
-    (Side.BOTTOM, "turn_horizontal", [2, 3], 1)
+@pytest.mark.parametrize("side, func, indices, out_blocks, out_amount", [
+    (Side.FRONT, "turn_slice", [1, 2], [(1, 2)], 1),
+    (Side.BACK, "turn_slice", [1, 2], [(2, 2)], 3),
+    (Side.RIGHT, "turn_vertical", [1, 2], [(2, 2)], 1),
+    (Side.LEFT, "turn_vertical", [1, 2], [(1, 2)], 3),
+    (Side.TOP, "turn_horizontal", [1, 2], [(1, 2)], 3),
+    (Side.BOTTOM, "turn_horizontal", [1, 2], [(2, 2)], 1),
+    (Side.LEFT, "turn_vertical", [1, 3], [(1, 1), (3, 1)], 3),
+    (Side.LEFT, "turn_vertical", [1, ...], [(1, 3)], 3)
 ])
-def test_turning_vertical(side: Side, func: str, out_sides: List[int], out_amount: int) -> None:
+def test_turning_vertical(side: Side, func: str, indices: List[int],
+                          out_blocks: List[Tuple[int, int]], out_amount: int) -> None:
     cube: Cube = CubeMock()
     mock = MagicMock()
     setattr(cube, func, mock)
 
     orientation = Orientation()
-    action = Turn(side, [1, 2], 1)
+    action = Turn(side, indices, 1)
     assert action.perform(cube, orientation) == orientation
-    assert len(mock.call_args_list) == len(out_sides)
-    print(mock.call_args_list[0])
-    for args, side in zip(mock.call_args_list, out_sides):
-        arg_orientation, arg_index, arg_turn = tuple(args)[0]
+    assert len(mock.call_args_list) == len(out_blocks)
+    for args, (start, width) in zip(mock.call_args_list, out_blocks):
+        arg_orientation, arg_index, arg_turn, arg_width = tuple(args)[0]
         assert arg_orientation == orientation
-        assert arg_index == side
+        assert arg_index == start
+        assert arg_width == width
         assert arg_turn == out_amount
 
 
@@ -0,0 +1,250 @@
+from typing import List, Optional, Tuple
+from unittest.mock import patch
+
+import pytest
+
+from cubelang.actions import Action, Turn
+from cubelang.arena import SharedCubeArena, PENDING, SUCCEEDED, FAILED
+from cubelang.batch import CubeBatch, run_batch, run_shared_batch
+from cubelang.compiler import Stack, parser
+from cubelang.cube import Cube
+from cubelang.cube_runtime import CubeRuntime
+from cubelang.execution import ExecutionContext
+from cubelang.execution.executor import ITracebackWriter
+from cubelang.orientation import Color, Orientation, Side
+from cubelang.parser import parse_actions
+from cubelang.stdlib import stdlib
+
+PROGRAM = """
+    let count: int
+    while front[0, 0] != front[1, 1] and count < 6 do
+        R U R' U'
+        count = count + 1
+    end
+    if top[0, 1] == top[1, 1] then
+        repeat 3 times
+            F
+        end
+    else
+        L2
+    end
+    orient top: {-W-/WWW/-W-} then
+        Y
+    end
+"""
+
+
+class RecordingTracebackWriter(ITracebackWriter):
+    def print_traceback(self, error, code_map) -> None:
+        self.error = error
+
+
+def perform(formula: str, shape=(3, 3, 3)) -> Cube:
+    cube = Cube(shape)
+    orientation = Orientation()
+    for action in parse_actions(formula):
+        orientation = action.perform(cube, orientation)
+    return cube
+
+
+def run_single(source: str, cube: Cube) -> Tuple[List[Action], Optional[Exception]]:
+    actions: List[Action] = []
+    runtime = CubeRuntime(cube, Orientation(), actions.append, lambda: None)
+    stack = Stack()
+    stdlib.initialize_stack(stack)
+    runtime.functions.initialize_stack(stack)
+    context = ExecutionContext({**stdlib.exec_globals, **runtime.functions.exec_globals})
+    context.compile(parser.parse(source, stack))
+    writer = RecordingTracebackWriter()
+    context.execute(writer)
+    return actions, getattr(writer, "error", None)
+
+
+def check_individual_runs(source: str, scrambles: List[str], result, batch: CubeBatch) -> None:
+    for row, scramble in enumerate(scrambles):
+        cube = perform(scramble)
+        actions, error = run_single(source, cube)
+        assert list(map(str, result.actions[row])) == list(map(str, actions))
+        assert (result.errors[row] is None) == (error is None)
+        assert batch.cubes[row] == cube
+
+
+def test_same_as_individual_runs():
+    scrambles = ["", "R", "F U", "R", "", "D' L2 B", "F U"]
+    batch = CubeBatch([perform(scramble) for scramble in scrambles])
+    result = run_batch(PROGRAM, batch)
+    assert result.runs <= 4
+    check_individual_runs(PROGRAM, scrambles, result, batch)
+    assert result.actions[1] is not result.actions[3]
+
+
+def test_straight_line_program():
+    source = """
+        R U R' U'
+        repeat 5 times
+            F2 L
+        end
+        checkpoint()
+        D B
+        rollback()
+        Y R2
+    """
+    scrambles = ["", "R", "F U", "D' L2 B", "L' B2"]
+    batch = CubeBatch([perform(scramble) for scramble in scrambles])
+    result = run_batch(source, batch)
+    assert result.runs == 1
+    check_individual_runs(source, scrambles, result, batch)
+    assert all(orientation == Orientation().to_right for orientation in batch.orientations)
+
+
+def test_divergent_reads():
+    source = """
+        R U
+        if front[0, 0] == red then
+            F
+        end
+        L
+        let n: int = count_color(top, yellow)
+        repeat n times
+            D
+        end
+        orient top: {-W-/---/---} then
+            B
+        end
+    """
+    scrambles = ["", "U", "F", "", "L' D", "U", "R2 B"]
+    batch = CubeBatch([perform(scramble) for scramble in scrambles])
+    result = run_batch(source, batch)
+    assert result.runs < len(set(scrambles))
+    check_individual_runs(source, scrambles, result, batch)
+
+
+class FakeSolver:
+    def solve(self, cube: Cube, orientation: Orientation) -> List[Turn]:
+        if cube.get_side(orientation).colors[0, 0] != Color.RED:
+            raise ValueError("The cube cannot be solved")
+        return [Turn(Side.TOP, [1], 1)]
+
+
+def test_failing_reads():
+    source = """
+        solve_optimal()
+        R
+    """
+    scrambles = ["L", "", "U", "L", ""]
+    batch = CubeBatch([perform(scramble) for scramble in scrambles])
+    with patch("cubelang.solvers.pocket_cube.get_solver", return_value=FakeSolver()):
+        result = run_batch(source, batch)
+        assert result.runs == 2
+        check_individual_runs(source, scrambles, result, batch)
+    assert [error is not None for error in result.errors] == [True, False, True, True, False]
+    assert list(map(str, result.actions[1])) == ["U", "R"]
+
+
+def test_orientations():
+    source = """
+        R
+        if front[1, 1] == red then
+            U
+        end
+    """
+    orientations = [Orientation(), Orientation().to_right, Orientation(), Orientation().to_top]
+    batch = CubeBatch([perform("") for _ in orientations], orientations)
+    result = run_batch(source, batch)
+    assert result.runs == 3
+    assert [list(map(str, actions)) for actions in result.actions] == [["R", "U"], ["R"], ["R", "U"], ["R"]]
+
+
+def test_runtime_errors():
+    source = """
+        if front[0, 0] == front[0, 1] then
+            R
+        else
+            let a: list of int
+            a[2] = 1
+        end
+    """
+    result = run_batch(source, CubeBatch([perform(""), perform("R"), perform("L")]))
+    assert result.errors[0] is None and list(map(str, result.actions[0])) == ["R"]
+    assert result.errors[1] is None
+    assert result.errors[2] is not None
+
+
+def test_batch_validation():
+    with pytest.raises(ValueError):
+        CubeBatch([])
+    with pytest.raises(ValueError):
+        CubeBatch([Cube((3, 3, 3)), Cube((2, 2, 2))])
+    with pytest.raises(ValueError):
+        CubeBatch([Cube((3, 3, 3))], [Orientation(), Orientation()])
+
+
+@pytest.fixture
+def arena():
+    arena = SharedCubeArena((3, 3, 3), 4)
+    yield arena
+    arena.close()
+    arena.unlink()
+
+
+def test_rows(arena):
+    arena.store(1, perform("R U"))
+    cube = arena.cube(1)
+    assert cube == perform("R U")
+    Turn(Side.FRONT, [1], 1).perform(cube, Orientation())
+    cube.state_view()
+    del cube
+    assert arena.cube(1) == perform("R U F")
+    assert arena.cube(0) != perform("")
+
+    other = SharedCubeArena((3, 3, 3), 4, arena.name)
+    cube = other.cube(1)
+    assert cube == perform("R U F")
+    del cube
+    other.close()
+
+    with pytest.raises(ValueError):
+        arena.store(0, Cube((2, 2, 2)))
+    with pytest.raises(IndexError):
+        arena.cube(4)
+
+
+def test_buffer_cube():
+    state = bytearray(perform("R U").state_view())
+    cube = Cube((3, 3, 3), buffer=memoryview(state))
+    assert cube == perform("R U")
+    Turn(Side.TOP, [1], 3).perform(cube, Orientation())
+    cube.state_view()
+    assert bytes(state) == bytes(perform("R").state_view())
+    with pytest.raises(ValueError):
+        Cube((2, 2, 2), buffer=memoryview(state))
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_shared_batch(arena, processes):
+    scrambles = ["", "R", "F U", "D' L2 B"]
+    for row, scramble in enumerate(scrambles):
+        arena.store(row, perform(scramble))
+    run_shared_batch(PROGRAM, arena, processes=processes)
+
+    for row, scramble in enumerate(scrambles):
+        cube = perform(scramble)
+        actions, _ = run_single(PROGRAM, cube)
+        assert arena.status[row] == SUCCEEDED
+        assert arena.moves[row] == sum(isinstance(action, Turn) for action in actions)
+        assert arena.hashes[row] == cube.state_hash()
+
+
+def test_shared_batch_rows(arena):
+    source = """
+        if front[0, 0] != front[0, 1] then
+            let a: list of int
+            a[2] = 1
+        end
+        R
+    """
+    for row, scramble in enumerate(["", "L", "", ""]):
+        arena.store(row, perform(scramble))
+    run_shared_batch(source, arena, [0, 1, 2], processes=1)
+    assert list(arena.status) == [SUCCEEDED, FAILED, SUCCEEDED, PENDING]
+    assert list(arena.moves) == [1, 0, 1, 0]
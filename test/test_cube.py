@@ -1,6 +1,6 @@
 from typing import List
 
-from cubelang.cube import Cube, shift_list
+from cubelang.cube import Cube, shift_list, power_permutation, STATE_HEADER
 from cubelang.sides import CubeSide, CubeSideView, ICubeSide
 from cubelang.orientation import Orientation, Side, Color
 from cubelang.parser import parse_actions
@@ -20,6 +20,29 @@ def test_shift_list_2() -> None:
     assert shift_list(lst, 2) == [3, 4, 5, 1, 2]
 
 
+@pytest.mark.parametrize("power", range(8))
+def test_power_permutation(power: int) -> None:
+    permutation = [2, 0, 1, 4, 3, 5]
+    expected = list(range(6))
+    for _ in range(power):
+        expected = [expected[i] for i in permutation]
+    assert power_permutation(permutation, power) == expected
+
+
+def test_apply_permutation() -> None:
+    actions = list(parse_actions("RUR'U'"))
+    expected = Cube((3, 3, 3))
+    for action in actions * 3:
+        action.perform(expected, Orientation())
+
+    cube = Cube((3, 3, 3))
+    permutation = cube.get_permutation(actions, Orientation())
+    cube.apply_permutation(power_permutation(permutation, 3))
+    for side in Side:
+        orientation = Orientation.regular(side)
+        assert side_to_string(cube.get_side(orientation)) == side_to_string(expected.get_side(orientation))
+
+
 def test_get_side():
     orientation: Orientation = Orientation(Side.LEFT, Side.TOP)
     orientation.get_side_rotation = MagicMock()
@@ -204,6 +227,192 @@ def test_data_rotation(sample_cube: Cube) -> None:
     assert get_side(orientation.to_top) == "None None b/None None a/None None None"
 
 
+@pytest.mark.parametrize("function, index, width, turns", [
+    ("turn_vertical", 1, 3, 1),
+    ("turn_vertical", 2, 3, 3),
+    ("turn_horizontal", 3, 3, 2),
+    ("turn_slice", 1, 5, 1),
+    ("turn_slice", 4, 2, 3)
+])
+def test_block_turn(function: str, index: int, width: int, turns: int) -> None:
+    orientation = Orientation(Side.RIGHT, Side.BACK)
+    expected = Cube((5, 5, 5))
+    actual = Cube((5, 5, 5))
+    for cube in [expected, actual]:
+        for position, (face, i, j) in enumerate(cube._iterate_positions()):
+            face[i, j].data = position
+
+    for layer in range(index, index + width):
+        getattr(expected, function)(orientation, layer, turns)
+    getattr(actual, function)(orientation, index, turns, width)
+    assert [face[i, j].data for face, i, j in expected._iterate_positions()] == \
+           [face[i, j].data for face, i, j in actual._iterate_positions()]
+
+
+def test_block_turn_too_wide() -> None:
+    with pytest.raises(ValueError):
+        Cube((3, 3, 3)).turn_vertical(Orientation(), 2, 1, 3)
+
+
+def test_packed_cube() -> None:
+    actions = parse_actions("R U2 F' L[2:3] Y B D' X' R[1,4] Z2 U'")
+    expected, actual = Cube((4, 4, 4)), Cube((4, 4, 4), packed=True)
+    assert actual.packed and not expected.packed
+    for cube in [expected, actual]:
+        orientation = Orientation()
+        for action in actions:
+            orientation = action.perform(cube, orientation)
+        cube.get_side(Orientation(Side.TOP, Side.BACK)).colors[0, 1] = Color.BLUE
+
+    for side in Side:
+        orientation = Orientation.regular(side)
+        assert side_to_string(expected.get_side(orientation)) == side_to_string(actual.get_side(orientation))
+    with pytest.raises(ValueError):
+        actual.set_data(Orientation(), 0, 0, "a")
+
+
+def test_packed_footprint() -> None:
+    size = 2000
+    cube = Cube((size, size, size), packed=True)
+    assert len(cube.buffer) == 6 * size * size
+    orientation = Orientation()
+    for action in parse_actions("R L[1:1000] U' F2 B[2]"):
+        orientation = action.perform(cube, orientation)
+    state = bytes(cube.buffer)
+    assert all(state.count(color.value) == size * size for color in Color)
+
+
+def test_packed_mmap(tmp_path) -> None:
+    path = tmp_path / "cube"
+    cube = Cube((3, 3, 3), path=str(path))
+    parse_actions("R")[0].perform(cube, Orientation())
+    cube.buffer.obj.flush()
+    content = path.read_bytes()
+    assert len(content) == 54
+    assert content == bytes(cube.buffer)
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_state_bytes(packed: bool) -> None:
+    cube = Cube((3, 4, 2), packed=packed)
+    orientation = Orientation()
+    for action in parse_actions("U2 D2 Y2 X2 U2"):
+        orientation = action.perform(cube, orientation)
+
+    data = cube.to_bytes()
+    assert len(data) == STATE_HEADER.size + 2 * (3 * 2 + 4 * 2 + 3 * 4)
+    for restored in [Cube.from_bytes(data), Cube.from_bytes(data, packed=True)]:
+        assert restored == cube
+        assert restored.shape == (3, 4, 2)
+        assert restored.state_hash() == cube.state_hash()
+        assert restored.to_bytes() == data
+    assert Cube((3, 4, 2)) != cube
+    assert Cube((3, 4, 2)).state_hash() != cube.state_hash()
+
+
+def test_state_view_shared() -> None:
+    cube = Cube((3, 3, 3), packed=True)
+    view = cube.state_view()
+    assert view.readonly and view.obj is cube.buffer.obj
+    cube.get_side(Orientation()).colors[0, 0] = Color.BLUE
+    assert view[0] == Color.BLUE.value
+
+
+@pytest.mark.parametrize("data", [
+    b"XX" + bytes(13), Cube((2, 2, 2)).to_bytes()[:-1], Cube((2, 2, 2)).to_bytes()[:-1] + bytes(1)
+])
+def test_state_bytes_invalid(data: bytes) -> None:
+    with pytest.raises(ValueError):
+        Cube.from_bytes(data)
+
+
+@pytest.mark.parametrize("shape, packed", [
+    ((3, 3, 3), False), ((3, 3, 3), True), ((4, 4, 4), False), ((2, 3, 4), False), ((2, 3, 4), True)
+])
+def test_zobrist_hash(shape, packed: bool) -> None:
+    cube = Cube(shape, packed=packed)
+    initial = cube.zobrist_hash
+    orientation = Orientation()
+    for action in parse_actions("U2 D X2 F R' Y' B2 L"):
+        try:
+            orientation = action.perform(cube, orientation)
+        except (ValueError, AttributeError, IndexError):
+            pass
+        assert cube.zobrist_hash == Cube.from_bytes(cube.to_bytes()).zobrist_hash
+    assert cube.zobrist_hash != initial
+
+    cube.state_view()
+    assert cube.zobrist_hash == Cube.from_bytes(cube.to_bytes()).zobrist_hash
+
+
+def test_zobrist_hash_inverse() -> None:
+    cube = Cube((3, 3, 3))
+    initial = cube.zobrist_hash
+    for action in parse_actions("R U R' U'"):
+        action.perform(cube, Orientation())
+    assert cube.zobrist_hash != initial
+    for action in parse_actions("U R U' R'"):
+        action.perform(cube, Orientation())
+    assert cube.zobrist_hash == initial
+
+    cube.get_side(Orientation()).colors[1, 1] = Color.BLUE
+    assert cube.zobrist_hash != initial
+    cube.get_side(Orientation()).colors[1, 1] = Color.RED
+    assert cube.zobrist_hash == initial
+
+
+@pytest.mark.parametrize("shape, packed", [((3, 3, 3), False), ((3, 3, 3), True), ((2, 3, 4), True)])
+def test_side_queries(shape, packed: bool) -> None:
+    def colors(orientation: Orientation) -> List[Color]:
+        side = cube.get_side(orientation)
+        return [side.colors[i, j] for i in range(side.rows) for j in range(side.columns)]
+
+    cube = Cube(shape, packed=packed)
+    orientation = Orientation()
+    for formula in ["", "R2", "U2 F2", "L2 D2 R2 B2"]:
+        for action in parse_actions(formula):
+            try:
+                orientation = action.perform(cube, orientation)
+            except (ValueError, AttributeError, IndexError):
+                pass
+        for view in orientation.iterate_rotations():
+            assert cube.is_side_solved(view) == (len(set(colors(view))) == 1)
+            for color in Color:
+                assert cube.count_color(view, color) == colors(view).count(color)
+
+
+def test_layer_solved() -> None:
+    cube = Cube((3, 3, 3))
+    for action in parse_actions("R"):
+        action.perform(cube, Orientation())
+    left, bottom = Orientation().to_left, Orientation().to_bottom
+    assert not cube.is_layer_solved(bottom, 1)
+    assert not cube.is_layer_solved(bottom, 2)
+    assert cube.is_layer_solved(left, 1)
+    assert cube.is_layer_solved(left, 2)
+    assert not cube.is_layer_solved(left, -1)
+    for action in parse_actions("R'"):
+        action.perform(cube, Orientation())
+    assert all(cube.is_layer_solved(bottom, depth) for depth in [1, 2, 3, -1])
+    with pytest.raises(ValueError):
+        cube.is_layer_solved(bottom, 4)
+
+
+@pytest.mark.parametrize("size", [2, 4])
+def test_layer_solved_even(size: int) -> None:
+    cube = Cube((size, size, size))
+    for action in parse_actions("B"):
+        action.perform(cube, Orientation())
+    front = Orientation()
+    assert all(cube.is_layer_solved(front, depth) for depth in range(1, size))
+    assert not cube.is_layer_solved(front, -1)
+    assert not cube.is_layer_solved(front.to_left.to_left, 1)
+    assert cube.get_side_color(Side.RIGHT) == Color.GREEN
+    for action in parse_actions("B'"):
+        action.perform(cube, Orientation())
+    assert cube.is_layer_solved(front, -1)
+
+
 def test_iterate() -> None:
     def orient_to_str(side: Side, i: int, j: int) -> str:
         return f"{side.name[0].upper()}{i}:{j}"
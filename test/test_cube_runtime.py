@@ -1,5 +1,5 @@
 from typing import Callable
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, PropertyMock
 from unittest.mock import patch
 
 import pytest
@@ -7,7 +7,8 @@ import pytest
 from cubelang.actions import Action, Turn, TurningType
 from cubelang.cube import Cube
 from cubelang.cube_runtime import CubeRuntime
-from cubelang.orientation import Side, Orientation
+from cubelang.orientation import Side, Orientation, Color
+from cubelang.pattern import Pattern
 
 
 def test_runtime_globals():
@@ -52,6 +53,39 @@ def test_get_color(side, orientation):
         mock_method.assert_called_once_with(orientation)
 
 
+def test_colors_cache():
+    runtime = CubeRuntime(Cube((3, 3, 3)), Orientation(), lambda action: None, lambda: None)
+    with patch.object(CubeRuntime, "_read_color", wraps=runtime._read_color) as read_color:
+        assert runtime.get_color(Side.FRONT, 0, 2) == runtime.get_color(Side.FRONT, 0, 2) == Color.RED
+        assert read_color.call_count == 1
+
+        version = runtime.state_version
+        runtime.perform_turn(Side.RIGHT, 1, [1])
+        assert runtime.state_version > version
+        assert runtime.get_color(Side.FRONT, 0, 2) == Color.WHITE
+        assert read_color.call_count == 2
+
+        runtime.perform_rotate(Side.TOP, False)
+        assert runtime.get_color(Side.FRONT, 0, 2) == Color.GREEN
+        runtime.push_orientation()
+        runtime.perform_rotate(Side.TOP, False)
+        runtime.pop_orientation()
+        assert runtime.get_color(Side.FRONT, 0, 2) == Color.GREEN
+        assert read_color.call_count == 3
+
+        runtime.perform_turn(Side.FRONT, 1, [1])
+        runtime.perform_turn(Side.FRONT, 3, [1])
+        assert runtime.get_color(Side.FRONT, 0, 2) == Color.GREEN
+        assert read_color.call_count == 3
+
+        cached_states = len(runtime.states_cache)
+        runtime.perform_turn(Side.LEFT, 1, [1])
+        runtime.perform_turn(Side.LEFT, 1, [1])
+        assert len(runtime.states_cache) == cached_states
+        runtime.get_color(Side.FRONT, 0, 0)
+        assert len(runtime.states_cache) == cached_states + 1
+
+
 def test_state_stack():
     actions = []
     runtime = CubeRuntime(Cube((2, 2, 2)), Orientation(), actions.append, lambda: None)
@@ -79,3 +113,149 @@ def test_suspend_rotations():
     runtime.resume_rotations()
 
     assert "FYFRBY'" == "".join(map(str, actions))
+
+
+@pytest.mark.parametrize("times, suspend", [(0, False), (1, False), (7, False), (13, False), (13, True)])
+def test_repeat(times, suspend):
+    moves = (("turn", Side.RIGHT, 1, (1,)), ("rotate", Side.TOP, False),
+             ("turn", Side.TOP, 3, (1, ..., 2)))
+
+    expected_actions = []
+    expected = CubeRuntime(Cube((3, 3, 3)), Orientation(), expected_actions.append, lambda: None)
+    actual_actions = []
+    actual = CubeRuntime(Cube((3, 3, 3)), Orientation(), actual_actions.append, lambda: None)
+    if suspend:
+        expected.suspend_rotations()
+        actual.suspend_rotations()
+
+    for _ in range(times):
+        expected.perform_turn(Side.RIGHT, 1, [1])
+        expected.perform_rotate(Side.TOP, False)
+        expected.perform_turn(Side.TOP, 3, [1, ..., 2])
+    actual.perform_repeat(times, moves)
+
+    assert list(map(str, actual_actions)) == list(map(str, expected_actions))
+    assert actual.orientation == expected.orientation
+    for side in CubeRuntime.SIDE_NAMES.values():
+        for i in range(3):
+            for j in range(3):
+                assert actual.get_color(side, i, j) == expected.get_color(side, i, j)
+
+
+def test_checkpoint_rollback():
+    actions = []
+    runtime = CubeRuntime(Cube((3, 3, 3)), Orientation(), actions.append, lambda: None)
+    runtime.perform_turn(Side.RIGHT, 1, [1])
+    state = runtime.cube.to_bytes()
+
+    runtime.checkpoint()
+    runtime.perform_turn(Side.TOP, 1, [1, ..., 2])
+    runtime.push_orientation()
+    runtime.perform_rotate(Side.FRONT, False)
+    runtime.checkpoint()
+    runtime.perform_turn(Side.LEFT, 3, [1])
+    runtime.perform_repeat(13, (("turn", Side.FRONT, 1, (1,)), ("rotate", Side.TOP, False)))
+    runtime.commit()
+    runtime.perform_turn(Side.BACK, 2, [2])
+    runtime.rollback()
+
+    assert list(map(str, actions)) == ["R"]
+    assert runtime.cube.to_bytes() == state
+    assert runtime.orientation == Orientation()
+    assert len(runtime.orientations_stack) == 0
+    assert runtime.get_color(Side.FRONT, 0, 2) == Color.WHITE
+    with pytest.raises(ValueError):
+        runtime.rollback()
+
+
+def test_checkpoint_commit():
+    expected_actions = []
+    expected = CubeRuntime(Cube((3, 3, 3)), Orientation(), expected_actions.append, lambda: None)
+    actual_actions = []
+    actual = CubeRuntime(Cube((3, 3, 3)), Orientation(), actual_actions.append, lambda: None)
+
+    actual.checkpoint()
+    for runtime in [expected, actual]:
+        runtime.perform_turn(Side.RIGHT, 1, [1])
+        runtime.suspend_rotations()
+        runtime.perform_rotate(Side.TOP, False)
+        runtime.perform_turn(Side.FRONT, 3, [1])
+    actual.checkpoint()
+    actual.perform_turn(Side.TOP, 1, [1])
+    actual.rollback()
+    assert list(map(str, actual_actions)) == []
+    actual.commit()
+
+    assert list(map(str, actual_actions)) == list(map(str, expected_actions)) == ["R", "R'"]
+    assert actual.cube.to_bytes() == expected.cube.to_bytes()
+    with pytest.raises(ValueError):
+        actual.commit()
+
+
+def test_checkpoint_open_at_finish():
+    actions = []
+    runtime = CubeRuntime(Cube((3, 3, 3)), Orientation(), actions.append, lambda: None)
+    runtime.perform_turn(Side.RIGHT, 1, [1])
+    runtime.checkpoint()
+    runtime.perform_turn(Side.TOP, 1, [1])
+    runtime.checkpoint()
+    runtime.perform_turn(Side.FRONT, 3, [1])
+    assert list(map(str, actions)) == ["R"]
+
+    runtime.finished()
+    assert list(map(str, actions)) == ["R", "U", "F'"]
+    assert len(runtime.checkpoints) == 0
+
+
+def test_memoize():
+    runtime = CubeRuntime(Cube((3, 3, 3)), Orientation(), lambda action: None, lambda: None)
+    function = MagicMock(side_effect=lambda side: runtime.get_color(side, 0, 0))
+    memoized = runtime.memoize(function)
+
+    assert memoized(Side.FRONT) == Color.RED
+    assert memoized(Side.FRONT) == Color.RED
+    assert function.call_count == 1
+    runtime.perform_turn(Side.TOP, 1, [1])
+    assert memoized(Side.FRONT) == Color.GREEN
+    assert function.call_count == 2
+    runtime.perform_turn(Side.TOP, 3, [1])
+    assert memoized(Side.FRONT) == Color.RED
+    assert function.call_count == 2
+    runtime.perform_rotate(Side.TOP, False)
+    memoized(Side.FRONT)
+    assert function.call_count == 3
+    assert runtime.functions.impure_functions.issuperset({"print", "solve", "rollback"})
+
+
+
+def test_zobrist_collisions():
+    with patch.object(Cube, "zobrist_hash", new_callable=PropertyMock, return_value=0):
+        runtime = CubeRuntime(Cube((3, 3, 3)), Orientation(), lambda action: None, lambda: None)
+        memoized = runtime.memoize(lambda side: runtime.get_color(side, 0, 0))
+        assert runtime.get_color(Side.FRONT, 0, 0) == memoized(Side.FRONT) == Color.RED
+        runtime.perform_turn(Side.TOP, 1, [1])
+        assert runtime.get_color(Side.FRONT, 0, 0) == memoized(Side.FRONT) == Color.GREEN
+        runtime.perform_turn(Side.TOP, 3, [1])
+        assert runtime.get_color(Side.FRONT, 0, 0) == memoized(Side.FRONT) == Color.RED
+
+def test_find_pieces():
+    runtime = CubeRuntime(Cube((3, 3, 3)), Orientation(), lambda action: None, lambda: None)
+    runtime.perform_turn(Side.RIGHT, 1, [1])
+    runtime.perform_rotate(Side.TOP, False)
+    assert runtime.find_corner(Color.RED, Color.YELLOW, Color.GREEN) == [Side.TOP, Side.RIGHT, Side.FRONT]
+    assert runtime.find_edge(Color.WHITE, Color.GREEN) == [Side.LEFT, Side.FRONT]
+    assert "find_edge" not in runtime.functions.impure_functions
+
+
+def test_face_queries():
+    runtime = CubeRuntime(Cube((3, 3, 3)), Orientation(), lambda action: None, lambda: None)
+    runtime.perform_turn(Side.RIGHT, 1, [1])
+    runtime.perform_rotate(Side.TOP, False)
+    assert runtime.face_solved(Side.FRONT)
+    assert not runtime.face_solved(Side.LEFT)
+    assert runtime.count_color(Side.TOP, Color.RED) == 3
+    assert runtime.face_equals(Side.TOP, Pattern([["a", "a", "a"], ["a", "a", "a"], ["b", None, Color.RED]]))
+    assert not runtime.face_equals(Side.TOP, Pattern([["a", "a", "a"], ["a", "a", "a"], ["a", "a", "a"]]))
+    assert runtime.layer_solved(Side.BACK, 1)
+    assert runtime.layer_solved(Side.BACK, 2)
+    assert not runtime.layer_solved(Side.FRONT, 1)
@@ -0,0 +1,87 @@
+from cubelang.cube import Cube
+from cubelang.cubie import CubieCube, get_model
+from cubelang.orientation import Orientation, Side, Color
+from cubelang.parser import parse_actions
+
+import pytest
+
+
+@pytest.mark.parametrize("size, formula", [
+    (2, "R U F' L2 D B' Y R[1,2] U2[1:] X' F R"),
+    (3, "R U F' L2 D B' Y R[2] U[2] F'[2] Z L[1,2] D[1:] B[2,3] X R2")
+])
+def test_turns(size: int, formula: str) -> None:
+    cube = Cube((size,) * 3)
+    cubie = CubieCube((size,) * 3)
+    cube_orientation = cubie_orientation = Orientation()
+    for action in parse_actions(formula):
+        cube_orientation = action.perform(cube, cube_orientation)
+        cubie_orientation = action.perform(cubie, cubie_orientation)
+        assert cubie == cube
+
+
+@pytest.mark.parametrize("size", [2, 3])
+def test_conversion(size: int) -> None:
+    cube = Cube((size,) * 3)
+    orientation = Orientation()
+    for action in parse_actions("R U' F2 D L' B Y R U"):
+        orientation = action.perform(cube, orientation)
+
+    cubie = CubieCube.from_cube(cube)
+    assert cubie.coordinates != get_model(size).solved
+    assert cubie.to_cube() == cube
+    assert CubieCube.from_cube(cubie.to_cube()).coordinates == cubie.coordinates
+
+
+def test_inverse_moves() -> None:
+    cubie = CubieCube((3, 3, 3))
+    model = cubie.model
+    move = model.get_move(Orientation(), 1, 1)
+    assert model.get_move(Orientation(), 1, 1) == move
+    for _ in range(4):
+        cubie.apply_move(move)
+    assert cubie.coordinates == model.solved
+
+    cubie.apply_move(move)
+    cubie.apply_move(model.get_move(Orientation(), 1, 3))
+    assert cubie.coordinates == model.solved
+
+
+def test_side_changes() -> None:
+    cubie = CubieCube((3, 3, 3))
+    for action in parse_actions("R U"):
+        action.perform(cubie, Orientation())
+    front = cubie.get_side(Orientation())
+    front.colors[0, 0], front.colors[1, 0] = front.colors[1, 0], front.colors[0, 0]
+    with pytest.raises(ValueError):
+        parse_actions("R")[0].perform(cubie, Orientation())
+
+
+def test_reads_keep_coordinates() -> None:
+    cube = Cube((3, 3, 3))
+    cubie = CubieCube((3, 3, 3))
+    for action in parse_actions("R U F' L2 D"):
+        action.perform(cube, Orientation())
+        action.perform(cubie, Orientation())
+        coordinates = cubie.coordinates
+        assert cubie.get_side(Orientation().to_top).colors[0, 2] == cube.get_side(Orientation().to_top).colors[0, 2]
+        assert cubie.is_side_solved(Orientation()) == cube.is_side_solved(Orientation())
+        assert cubie.coordinates is coordinates
+    assert cubie == cube
+
+    front = cubie.get_side(Orientation())
+    front.colors[0, 0], front.colors[0, 2] = front.colors[0, 2], front.colors[0, 0]
+    front.colors[0, 0], front.colors[0, 2] = front.colors[0, 2], front.colors[0, 0]
+    assert cubie.coordinates is not coordinates
+    assert cubie.coordinates == coordinates
+
+
+@pytest.mark.parametrize("shape", [(4, 4, 4), (3, 3, 2)])
+def test_unsupported_shape(shape) -> None:
+    with pytest.raises(ValueError):
+        CubieCube(shape)
+
+
+def test_no_data() -> None:
+    with pytest.raises(ValueError):
+        CubieCube((2, 2, 2)).set_data(Orientation(), 0, 0, 1)
@@ -70,3 +70,228 @@ def test_orient():
     executor.execute(MockTracebackWriter())
     cube_runtime.finished()
     out_fn.assert_called_once_with(orientation.Color.WHITE)
+
+
+def test_search():
+    code = """
+        R U'
+        search front: {RRR/RRR/RRR}, top: {YYY/YYY/YYY} depth 3 using R, R', U, U' then
+            out(1)
+        end
+        search top: {xxx/xxx/xxx} depth 2 using R then
+            out(2)
+        else
+            out(3)
+        end
+    """
+
+    out_fn = MagicMock()
+    actions = []
+    stack = Stack()
+    cube_runtime = CubeRuntime(Cube((3, 3, 3)), Orientation(), actions.append, lambda: None)
+    cube_runtime.functions.initialize_stack(stack)
+    stdlib.initialize_stack(stack)
+    stack.add_global("out", Function(([Integer], Void)))
+
+    globals = {"out": out_fn, **stdlib.exec_globals, **cube_runtime.functions.exec_globals}
+
+    executor = ExecutionContext(globals)
+    executor.compile(parser.parse(code, stack))
+    executor.execute(MockTracebackWriter())
+    cube_runtime.finished()
+    assert [call.args for call in out_fn.call_args_list] == [(1,), (2,)]
+    assert list(map(str, actions)) == ["R", "U'", "U", "R'"]
+
+
+def test_memo():
+    code = """
+        memo func count(c: color): int
+            let n: int = 0
+            for i in list_of(0, 1, 2) do
+                if front[0, i] == c then n = n + 1 end
+            end
+            return n
+        end
+        out(count(red))
+        U
+        out(count(red))
+        out(count(red))
+        U'
+        out(count(red))
+    """
+
+    out_fn = MagicMock()
+    stack = Stack()
+    cube_runtime = CubeRuntime(Cube((3, 3, 3)), Orientation(), lambda action: None, lambda: None)
+    cube_runtime.functions.initialize_stack(stack)
+    stdlib.initialize_stack(stack)
+    stack.add_global("out", Function(([Integer], Void)))
+
+    globals = {"out": out_fn, **stdlib.exec_globals, **cube_runtime.functions.exec_globals}
+
+    executor = ExecutionContext(globals)
+    executor.compile(parser.parse(code, stack))
+    executor.execute(MockTracebackWriter())
+    assert [call.args for call in out_fn.call_args_list] == [(3,), (0,), (0,), (3,)]
+
+
+def test_memo_traceback():
+    code = """
+        memo func f(i: int): color
+            return front[0, i]
+        end
+
+        out(f(7))
+    """
+
+    stack = Stack()
+    cube_runtime = CubeRuntime(Cube((3, 3, 3)), Orientation(), lambda action: None, lambda: None)
+    cube_runtime.functions.initialize_stack(stack)
+    stdlib.initialize_stack(stack)
+    stack.add_global("out", Function(([Color], Void)))
+
+    globals = {"out": MagicMock(), **stdlib.exec_globals, **cube_runtime.functions.exec_globals}
+
+    writer = MockTracebackWriter()
+    writer.print_traceback = MagicMock()
+    executor = ExecutionContext(globals)
+    executor.compile(parser.parse(code, stack))
+    executor.execute(writer)
+
+    error = writer.print_traceback.call_args_list[0][0][0]
+    assert [entry[0] for entry in error.stack_entries] == ["f", None]
+    assert executor.code_map[error.stack_entries[0][1]] == 2
+    assert executor.code_map[error.stack_entries[1][1]] == 5
+
+
+def test_map():
+    code = """
+        let counts: map of color to int
+        let c: color
+        for i in list_of(0, 1, 2) do
+            for j in list_of(0, 1, 2) do
+                c = top[i, j]
+                if has_key(counts, c) then
+                    put(counts, c, get(counts, c) + 1)
+                else
+                    put(counts, c, 1)
+                end
+            end
+        end
+        for c in counts do
+            out(get(counts, c))
+        end
+        out(size(keys(counts)))
+        remove_key(counts, top[1, 1])
+        remove_key(counts, top[1, 1])
+        out(size(counts))
+    """
+
+    out_fn = MagicMock()
+    stack = Stack()
+    cube_runtime = CubeRuntime(Cube((3, 3, 3)), Orientation(), lambda action: None, lambda: None)
+    cube_runtime.functions.initialize_stack(stack)
+    stdlib.initialize_stack(stack)
+    stack.add_global("out", Function(([Integer], Void)))
+
+    globals = {"out": out_fn, **stdlib.exec_globals, **cube_runtime.functions.exec_globals}
+
+    executor = ExecutionContext(globals)
+    executor.compile(parser.parse(code, stack))
+    executor.execute(MockTracebackWriter())
+    assert [call.args for call in out_fn.call_args_list] == [(9,), (1,), (0,)]
+
+
+def test_contextual_keywords():
+    code = """
+        let map: map of int to int
+        let queue: queue of int = queue_of(1, 2)
+        let to: int = 5
+        put(map, to, size(queue))
+        for to in keys(map) do
+            out(to)
+        end
+        out(get(map, 5))
+    """
+
+    out_fn = MagicMock()
+    stack = Stack()
+    cube_runtime = CubeRuntime(Cube((3, 3, 3)), Orientation(), lambda action: None, lambda: None)
+    cube_runtime.functions.initialize_stack(stack)
+    stdlib.initialize_stack(stack)
+    stack.add_global("out", Function(([Integer], Void)))
+
+    globals = {"out": out_fn, **stdlib.exec_globals, **cube_runtime.functions.exec_globals}
+
+    executor = ExecutionContext(globals)
+    executor.compile(parser.parse(code, stack))
+    executor.execute(MockTracebackWriter())
+    assert [call.args for call in out_fn.call_args_list] == [(5,), (2,)]
+
+
+def test_queue():
+    code = """
+        let pending: queue of int = queue_of(1)
+        let visited: set of int
+        let n: int
+        while size(pending) > 0 do
+            n = remove_first(pending)
+            if contains(visited, n) == false and n < 20 then
+                add(visited, n)
+                add_last(pending, n * 2)
+                add_last(pending, n * 3)
+            end
+        end
+        out(size(visited))
+        add_first(pending, 5)
+        add_last(pending, 6)
+        out(first(pending))
+        out(last(pending))
+        for n in pending do
+            out(n)
+        end
+    """
+
+    out_fn = MagicMock()
+    stack = Stack()
+    cube_runtime = CubeRuntime(Cube((3, 3, 3)), Orientation(), lambda action: None, lambda: None)
+    cube_runtime.functions.initialize_stack(stack)
+    stdlib.initialize_stack(stack)
+    stack.add_global("out", Function(([Integer], Void)))
+
+    globals = {"out": out_fn, **stdlib.exec_globals, **cube_runtime.functions.exec_globals}
+
+    executor = ExecutionContext(globals)
+    executor.compile(parser.parse(code, stack))
+    executor.execute(MockTracebackWriter())
+    assert [call.args for call in out_fn.call_args_list] == [(10,), (5,), (6,), (5,), (6,)]
+
+
+def test_exit_with_checkpoint():
+    code = """
+        R
+        checkpoint()
+        U F
+        exit()
+        L
+    """
+
+    actions = []
+    stack = Stack()
+    cube_runtime = CubeRuntime(Cube((3, 3, 3)), Orientation(), actions.append, lambda: None)
+    cube_runtime.functions.initialize_stack(stack)
+    stdlib.initialize_stack(stack)
+
+    globals = {**stdlib.exec_globals, **cube_runtime.functions.exec_globals}
+
+    executor = ExecutionContext(globals)
+    executor.compile(parser.parse(code, stack))
+    assert executor.execute(MockTracebackWriter())
+    cube_runtime.finished()
+
+    cube = Cube((3, 3, 3))
+    orientation = Orientation()
+    for action in actions:
+        orientation = action.perform(cube, orientation)
+    assert list(map(str, actions)) == ["R", "U", "F"]
+    assert cube == cube_runtime.cube
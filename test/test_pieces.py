@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from cubelang.actions import Turn
+from cubelang.cube import Cube
+from cubelang.cubie import CubieCube
+from cubelang.orientation import Orientation, Side, Color
+from cubelang.parser import parse_actions
+from cubelang.pieces import PieceIndex, get_piece_index
+
+
+def test_solved():
+    index = get_piece_index(Cube((3, 3, 3)))
+    assert index.locate([Color.RED, Color.YELLOW, Color.GREEN], Orientation()) == \
+        [Side.FRONT, Side.TOP, Side.RIGHT]
+    assert index.locate([Color.WHITE, Color.BLUE], Orientation()) == [Side.BOTTOM, Side.LEFT]
+    assert index.locate([Color.WHITE, Color.BLUE], Orientation(Side.LEFT, Side.TOP)) == \
+        [Side.BOTTOM, Side.FRONT]
+
+
+def test_turn():
+    cube = Cube((3, 3, 3))
+    index = get_piece_index(cube)
+    for action in parse_actions("R U'"):
+        action.perform(cube, Orientation())
+    assert index.locate([Color.RED, Color.YELLOW, Color.GREEN], Orientation()) == \
+        [Side.TOP, Side.LEFT, Side.BACK]
+    assert index.locate([Color.YELLOW, Color.RED], Orientation()) == [Side.TOP, Side.RIGHT]
+
+
+@pytest.mark.parametrize("cube", [Cube((2, 2, 2)), Cube((3, 3, 3)), CubieCube((3, 3, 3))])
+def test_incremental(cube):
+    random.seed(0)
+    index = get_piece_index(cube)
+    orientation = Orientation()
+    for _ in range(100):
+        turn = Turn(random.choice(list(Side)), [random.choice([1, cube.shape[0]])], random.randint(1, 3))
+        turn.perform(cube, orientation)
+        orientation = random.choice(list(Orientation().iterate_rotations()))
+    cube.apply_permutation(cube.get_permutation(parse_actions("R U F' L2"), Orientation()))
+
+    rebuilt = PieceIndex(cube)
+    assert index.locations == rebuilt.locations
+    assert index is get_piece_index(cube)
+
+
+def test_errors():
+    with pytest.raises(ValueError):
+        get_piece_index(Cube((4, 4, 4)))
+    with pytest.raises(ValueError):
+        get_piece_index(Cube((2, 2, 2))).locate([Color.RED, Color.YELLOW], Orientation())
+    with pytest.raises(ValueError):
+        get_piece_index(Cube((3, 3, 3))).locate([Color.RED, Color.ORANGE], Orientation())
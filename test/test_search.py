@@ -0,0 +1,67 @@
+import pytest
+
+from cubelang.actions import Turn, Rotate
+from cubelang.cube import Cube
+from cubelang.orientation import Orientation, Side, Color
+from cubelang.parser import parse_actions
+from cubelang.pattern import Pattern
+from cubelang.search import get_goal, search
+
+SOLVED = {"front": Pattern([[Color.RED] * 3] * 3), "top": Pattern([[Color.YELLOW] * 3] * 3),
+          "left": Pattern([[Color.BLUE] * 3] * 3), "right": Pattern([[Color.GREEN] * 3] * 3),
+          "bottom": Pattern([[Color.WHITE] * 3] * 3), "back": Pattern([[Color.ORANGE] * 3] * 3)}
+FACE_TURNS = [[Turn(side, [1], amount)] for side in Side for amount in range(1, 4)]
+
+
+def scramble(formula: str) -> Cube:
+    cube = Cube((3, 3, 3))
+    orientation = Orientation()
+    for action in parse_actions(formula):
+        orientation = action.perform(cube, orientation)
+    return cube
+
+
+@pytest.mark.parametrize("formula, length", [
+    ("", 0),
+    ("R", 1),
+    ("R U'", 2),
+    ("F2 L D'", 3),
+    ("R L", 2),
+    ("R U F' L2 D", 5)
+])
+def test_shortest(formula: str, length: int):
+    cube = scramble(formula)
+    state = cube.to_bytes()
+    result = search(cube, Orientation(), get_goal(cube, Orientation(), SOLVED), FACE_TURNS, 5)
+    assert cube.to_bytes() == state
+    assert len(result) == length
+
+    orientation = Orientation()
+    for action in result:
+        orientation = action.perform(cube, orientation)
+    assert cube == Cube((3, 3, 3))
+
+
+def test_formulas():
+    cube = scramble("R U R' U' R U R' U'")
+    moves = [list(parse_actions("R U R' U'")), list(parse_actions("U R U' R'"))]
+    result = search(cube, Orientation(), get_goal(cube, Orientation(), SOLVED), moves, 3)
+    assert list(map(str, result)) == ["U", "R", "U'", "R'"] * 2
+    assert search(cube, Orientation(), get_goal(cube, Orientation(), SOLVED), moves[:1], 3) is None
+
+
+def test_variables():
+    cube = scramble("R")
+    orientation = Orientation(Side.RIGHT, Side.TOP)
+    goal = get_goal(cube, orientation, {"top": Pattern([["a"] * 3] * 3), "left": Pattern([["b"] * 3] * 3)})
+    result = search(cube, orientation, goal, [[Turn(Side.FRONT, [1], 1)]], 4)
+    assert list(map(str, result)) == ["F", "F", "F"]
+
+
+def test_invalid_moves():
+    cube = Cube((3, 3, 3))
+    goal = get_goal(cube, Orientation(), {"front": Pattern([["a"] * 3] * 3)})
+    with pytest.raises(ValueError):
+        search(cube, Orientation(), goal, [[Rotate(Side.TOP, False)]], 1)
+    with pytest.raises(ValueError):
+        get_goal(cube, Orientation(), {"front": Pattern([["a"] * 2] * 2)})
@@ -91,3 +91,34 @@ def test_set_column():
     side.set_column(1, list(map(lambda c: Component[None](c, None),
                                 [Color.BLUE, Color.RED, Color.GREEN, Color.YELLOW])))
     assert side_to_string(side) == "YBBG/RRYR/OGBY/GYRW"
+
+
+def test_views_cache():
+    side = create_side(3, 2, "RO/GB/YW")
+    view = side.create_view(1)
+    assert view is side.create_view(5)
+    assert view.create_view(1) is side.create_view(2)
+    assert side_to_string(view.create_view(3)) == "RO/GB/YW"
+
+
+@pytest.mark.parametrize("rotation", [0, 1, 2, 3])
+def test_view_rows_columns(rotation: int):
+    side = create_side(3, 2, "RO/GB/YW")
+    view = side.create_view(rotation)
+    for i in range(view.rows):
+        assert view.get_row(i) == [view[i, j] for j in range(view.columns)]
+    for j in range(view.columns):
+        assert view.get_column(j) == [view[i, j] for i in range(view.rows)]
+
+    column = list(reversed(view.get_column(0)))
+    view.set_column(0, column)
+    assert [view[i, 0] for i in range(view.rows)] == column
+
+
+@pytest.mark.parametrize("rotation, i, j", [
+    (0, 0, 2), (0, 3, 0), (1, 0, 3), (1, 2, 0)
+])
+def test_view_out_of_range(rotation: int, i: int, j: int):
+    view = create_side(3, 2, "RO/GB/YW").create_view(rotation)
+    with pytest.raises(IndexError):
+        _ = view[i, j]
@@ -0,0 +1,84 @@
+import pytest
+
+from cubelang.actions import Turn
+from cubelang.cube import Cube
+from cubelang.orientation import Orientation, Side, Color
+from cubelang.parser import parse_actions
+from cubelang.symmetry import canonicalize, get_symmetries, Symmetry
+
+IDENTITY_COLORS = {color: color for color in Color}
+
+
+def perform(formula: str, shape=(3, 3, 3)) -> Cube:
+    cube = Cube(shape)
+    orientation = Orientation()
+    for action in parse_actions(formula):
+        orientation = action.perform(cube, orientation)
+    return cube
+
+
+@pytest.mark.parametrize("shape, mirror, count", [
+    ((3, 3, 3), False, 24),
+    ((2, 2, 2), True, 48),
+    ((3, 3, 2), False, 8),
+    ((2, 3, 4), True, 4)
+])
+def test_symmetries_count(shape, mirror, count):
+    symmetries = get_symmetries(shape, mirror)
+    assert len(symmetries.symmetries) == count
+    assert symmetries.maps[0] == list(range(symmetries.size))
+
+
+@pytest.mark.parametrize("mirror", [False, True])
+def test_transform_turns(mirror):
+    symmetries = get_symmetries((3, 3, 3), mirror)
+    cube = perform("R U2 F' L D")
+    state = bytes(cube.state_view())
+    turns = [Turn(side, [1], amount) for side in Side for amount in range(1, 4)]
+
+    for orientation, mirrored in symmetries.symmetries:
+        symmetry = Symmetry(orientation, mirrored, IDENTITY_COLORS)
+        image = Cube.from_bytes(cube.to_bytes()[:-len(state)] + symmetries.apply(state, symmetry))
+        original = perform("R U2 F' L D")
+        for turn in turns:
+            turn.perform(image, Orientation())
+        for turn in symmetry.transform_turns(turns):
+            turn.perform(original, Orientation())
+        assert symmetries.apply(bytes(original.state_view()), symmetry) == bytes(image.state_view())
+
+
+@pytest.mark.parametrize("first, second, mirror, recolor, equal", [
+    ("", "", False, False, True),
+    ("R U", "F U", False, False, False),
+    ("R U", "F U", False, True, True),
+    ("R U", "Y R U Y'", False, False, False),
+    ("R U", "Y R U Y'", False, True, True),
+    ("R U", "L' U'", False, True, False),
+    ("R U", "L' U'", True, True, True),
+    ("R U F", "R U F'", True, True, False)
+])
+def test_canonicalize(first, second, mirror, recolor, equal):
+    first_state, _ = canonicalize(perform(first), mirror, recolor)
+    second_state, _ = canonicalize(perform(second), mirror, recolor)
+    assert (first_state == second_state) == equal
+
+
+def test_canonical_symmetry():
+    cube = perform("R U F' D2")
+    state, symmetry = canonicalize(cube, True, True)
+    assert get_symmetries(cube.shape, True).apply(bytes(cube.state_view()), symmetry) == state
+    assert state == min(canonicalize(perform(f"{rotation} R U F' D2"), True, True)[0]
+                        for rotation in ["", "X", "Y2", "Z'"])
+
+
+def test_scheme():
+    symmetries = get_symmetries((2, 2, 2), True)
+    solved = bytes(Cube((2, 2, 2)).state_view())
+    for (orientation, mirrored), colors in zip(symmetries.symmetries, symmetries.schemes):
+        assert symmetries.apply(solved, Symmetry(orientation, mirrored, colors)) == solved
+
+    first, symmetry = canonicalize(perform("R U F'"), True, scheme=True)
+    assert canonicalize(perform("Y R U F'"), True, scheme=True)[0] == first
+    assert canonicalize(perform("L' U' F"), True, scheme=True)[0] == first
+    assert canonicalize(perform("L' U' F"), False, scheme=True)[0] != first
+    assert symmetry.colors in get_symmetries((3, 3, 3), True).schemes